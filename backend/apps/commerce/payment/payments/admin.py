@@ -1,7 +1,7 @@
 # Import Django's admin module for creating admin interfaces
 from django.contrib import admin
 # Import our models that we want to manage in admin
-from .models import Order, OrderItem, Payment
+from .models import Order, OrderItem, Payment, StripeOutbox, WebhookEvent
 
 # Inline admin for OrderItems - this shows order items inside the Order view
 # TabularInline displays items in a table format
@@ -76,4 +76,21 @@ class PaymentAdmin(admin.ModelAdmin):
         'stripe_payment_method_id',
         'created_at',           # Can't change timestamps
         'updated_at'
-    ]
\ No newline at end of file
+    ]
+
+# Register the Stripe outbox so stuck or failed calls can be inspected
+@admin.register(StripeOutbox)
+class StripeOutboxAdmin(admin.ModelAdmin):
+    list_display = ['order', 'operation', 'status', 'attempts', 'available_at', 'updated_at']
+    list_filter = ['operation', 'status']
+    search_fields = ['order__order_number']
+    readonly_fields = ['order', 'operation', 'payload', 'attempts', 'last_error', 'claimed_at', 'created_at', 'updated_at']
+
+
+# Register stored webhook events so deliveries can be inspected
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'event_type', 'status', 'received_at', 'processed_at']
+    list_filter = ['event_type', 'status']
+    search_fields = ['event_id']
+    readonly_fields = ['event_id', 'event_type', 'stripe_created', 'payload', 'received_at', 'processed_at']
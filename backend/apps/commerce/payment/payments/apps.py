@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.commerce.payment.payments'
\ No newline at end of file
+    name = 'apps.commerce.payment.payments'
+
+    def ready(self):
+        # Connect the product price cache invalidation receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,73 @@
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+import stripe
+from django.conf import settings
+
+
+# Local stand-in for StripeGateway (see gateway.py)
+# Used by the tests, by `manage.py process_stripe_outbox --fake-stripe`, or for
+# the whole site with STRIPE_GATEWAY_CLASS = 'apps.commerce.payment.payments.fake_stripe.FakeStripe'
+# to run payments without network access or Stripe keys.
+#
+#   fake = FakeStripe(latency=0.2, failures=1)
+#   OutboxWorker(fake).run_once()
+class FakeStripe:
+    def __init__(self, latency=0.0, failures=0, payment_status='succeeded'):
+        # Seconds every call takes, to simulate a slow provider
+        self.latency = latency
+        # Number of calls that fail with an APIConnectionError before calls succeed
+        self.failures = failures
+        # Status returned for retrieved PaymentIntents
+        self.payment_status = payment_status
+
+        self.lock = threading.Lock()
+        self.intents = {}
+        self.idempotency_keys = {}
+        self.calls = []
+
+    def call(self, name):
+        """Record a call, wait for the simulated latency and inject failures"""
+        with self.lock:
+            self.calls.append(name)
+            fail = self.failures > 0
+            if fail:
+                self.failures -= 1
+        time.sleep(self.latency)
+        if fail:
+            raise stripe.error.APIConnectionError('Simulated connection error')
+
+    def create_payment_intent(self, amount, currency='usd', metadata=None, idempotency_key=None):
+        self.call('payment_intents.create')
+        with self.lock:
+            # Stripe returns the original object for a repeated idempotency key
+            if idempotency_key in self.idempotency_keys:
+                return self.idempotency_keys[idempotency_key]
+            intent_id = f"pi_fake_{uuid.uuid4().hex[:16]}"
+            intent = SimpleNamespace(
+                id=intent_id,
+                client_secret=f"{intent_id}_secret_{uuid.uuid4().hex[:8]}",
+                amount=amount,
+                currency=currency,
+                status='requires_payment_method',
+                metadata=metadata or {},
+            )
+            self.intents[intent_id] = intent
+            if idempotency_key:
+                self.idempotency_keys[idempotency_key] = intent
+        return intent
+
+    def retrieve_payment_intent(self, payment_intent_id):
+        self.call('payment_intents.retrieve')
+        with self.lock:
+            intent = self.intents.get(payment_intent_id)
+            if intent is None:
+                raise stripe.error.InvalidRequestError(f"No such payment_intent: '{payment_intent_id}'", 'id')
+            intent.status = self.payment_status
+        return intent
+
+    def construct_event(self, payload, sig_header):
+        # Signatures are checked locally, exactly as StripeGateway does
+        return stripe.Webhook.construct_event(payload, sig_header, settings.STRIPE_WEBHOOK_SECRET)
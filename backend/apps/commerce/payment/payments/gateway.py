@@ -0,0 +1,244 @@
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+import requests
+import stripe
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+# Default gateway configuration
+# Any key can be overridden through settings.STRIPE_GATEWAY
+DEFAULT_GATEWAY_SETTINGS = {
+    # Keep-alive connections kept open to Stripe
+    'POOL_SIZE': 20,
+    # Seconds to open a connection and to wait for a response, per attempt
+    'CONNECT_TIMEOUT': 3,
+    'READ_TIMEOUT': 10,
+    # Total seconds a call may take, retries included
+    'DEADLINES': {
+        'payment_intents.create': 15,
+        'payment_intents.retrieve': 8,
+    },
+    'DEFAULT_DEADLINE': 10,
+    # Retries after the first attempt, for network errors, rate limits and 5xx responses
+    'MAX_RETRIES': 2,
+    # First retry delay in seconds, doubled for every retry (with jitter)
+    'BACKOFF': 0.25,
+    # Stripe API address, only changed to point at a local stand-in
+    'API_BASE': None,
+}
+
+
+def get_gateway_settings():
+    """Return the gateway configuration merged with the defaults"""
+    config = dict(DEFAULT_GATEWAY_SETTINGS)
+    config.update(getattr(settings, 'STRIPE_GATEWAY', {}))
+    return config
+
+
+# Upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# Per-process latency histograms of Stripe calls, one per endpoint
+# Exposed through GatewayMetricsView
+class GatewayMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, seconds, error=False):
+        milliseconds = seconds * 1000
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, {
+                'count': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+            })
+            stats['count'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += milliseconds
+            stats['buckets'][bisect_left(LATENCY_BUCKETS_MS, milliseconds)] += 1
+
+    def record_retry(self, endpoint):
+        with self.lock:
+            if endpoint in self.endpoints:
+                self.endpoints[endpoint]['retries'] += 1
+
+    def snapshot(self):
+        with self.lock:
+            endpoints = {name: dict(stats, buckets=list(stats['buckets'])) for name, stats in self.endpoints.items()}
+        labels = [str(bound) for bound in LATENCY_BUCKETS_MS] + ['+Inf']
+        for stats in endpoints.values():
+            stats['total_ms'] = round(stats['total_ms'], 3)
+            stats['buckets'] = dict(zip(labels, stats['buckets']))
+        return endpoints
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+metrics = GatewayMetrics()
+
+
+# stripe's requests-based HTTP client with a timeout that can change per call
+# Every thread shares one requests.Session, so connections to Stripe are pooled
+# and kept alive instead of being opened for each call.
+class PooledHTTPClient(stripe.RequestsClient):
+    def __init__(self, session, timeout):
+        self.call_timeout = threading.local()
+        super().__init__(timeout=timeout, session=session)
+
+    # RequestsClient passes self._timeout to requests on every call
+    @property
+    def _timeout(self):
+        return getattr(self.call_timeout, 'value', None) or self.default_timeout
+
+    @_timeout.setter
+    def _timeout(self, value):
+        self.default_timeout = value
+
+
+def is_retryable(error):
+    """Network errors, rate limits and Stripe server errors are worth retrying"""
+    if getattr(error, 'headers', None) and error.headers.get('stripe-should-retry') == 'false':
+        return False
+    if isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    return (getattr(error, 'http_status', None) or 0) >= 500
+
+
+# Single entry point for Stripe calls made by the payments app
+#
+# - one pooled keep-alive HTTP client shared by every thread
+# - a deadline per endpoint that covers all attempts; each attempt's timeout
+#   is cut down to the time that is left
+# - bounded retries with backoff; POSTs reuse one idempotency key across
+#   attempts, so a retry never creates a second PaymentIntent
+# - latency histograms per endpoint (GatewayMetricsView)
+class StripeGateway:
+    def __init__(self, config=None, api_key=None):
+        self.config = config or get_gateway_settings()
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.config['POOL_SIZE'],
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.http_client = PooledHTTPClient(
+            self.session, (self.config['CONNECT_TIMEOUT'], self.config['READ_TIMEOUT'])
+        )
+        base_addresses = {'api': self.config['API_BASE']} if self.config['API_BASE'] else {}
+        self.client = stripe.StripeClient(
+            api_key or settings.STRIPE_SECRET_KEY or '',
+            http_client=self.http_client,
+            base_addresses=base_addresses,
+            # Retries are handled here so they respect the deadline
+            max_network_retries=0,
+        )
+
+    def deadline_for(self, endpoint):
+        return self.config['DEADLINES'].get(endpoint, self.config['DEFAULT_DEADLINE'])
+
+    def attempt_timeout(self, remaining):
+        return (
+            min(self.config['CONNECT_TIMEOUT'], remaining),
+            min(self.config['READ_TIMEOUT'], remaining),
+        )
+
+    def call(self, endpoint, method, *args, **kwargs):
+        """Run one Stripe call with retries inside the endpoint's deadline"""
+        deadline = time.monotonic() + self.deadline_for(endpoint)
+        retries = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            start = time.monotonic()
+            self.http_client.call_timeout.value = self.attempt_timeout(remaining)
+            try:
+                result = method(*args, **kwargs)
+            except stripe.error.StripeError as e:
+                metrics.record(endpoint, time.monotonic() - start, error=True)
+                delay = self.config['BACKOFF'] * (2 ** retries) * random.uniform(0.5, 1.5)
+                out_of_time = time.monotonic() + delay >= deadline
+                if retries >= self.config['MAX_RETRIES'] or out_of_time or not is_retryable(e):
+                    raise
+                retries += 1
+                metrics.record_retry(endpoint)
+                time.sleep(delay)
+            else:
+                metrics.record(endpoint, time.monotonic() - start)
+                return result
+            finally:
+                self.http_client.call_timeout.value = None
+
+    def create_payment_intent(self, amount, currency='usd', metadata=None, idempotency_key=None):
+        params = {
+            'amount': amount,
+            'currency': currency,
+            'automatic_payment_methods': {'enabled': True},
+            'metadata': metadata or {},
+        }
+        options = {'idempotency_key': idempotency_key or str(uuid.uuid4())}
+        return self.call(
+            'payment_intents.create', self.client.payment_intents.create, params=params, options=options
+        )
+
+    def retrieve_payment_intent(self, payment_intent_id):
+        return self.call(
+            'payment_intents.retrieve', self.client.payment_intents.retrieve, payment_intent_id
+        )
+
+    def construct_event(self, payload, sig_header):
+        """Verify a webhook signature and parse the event (no network call)"""
+        return stripe.Webhook.construct_event(payload, sig_header, settings.STRIPE_WEBHOOK_SECRET)
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def clear_gateway():
+    """Drop the process-wide gateway; the next get_gateway() builds a new one"""
+    global _gateway
+    _gateway = None
+
+
+@receiver(setting_changed)
+def reset_gateway(setting, **kwargs):
+    # Tests swap the gateway class and its settings
+    if setting.startswith('STRIPE'):
+        clear_gateway()
+
+
+def get_gateway():
+    """Return the process-wide gateway
+
+    settings.STRIPE_GATEWAY_CLASS can name another class by dotted path,
+    e.g. the FakeStripe stand-in for local development and tests
+    """
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                gateway_class = import_string(getattr(settings, 'STRIPE_GATEWAY_CLASS', None) or
+                                              'apps.commerce.payment.payments.gateway.StripeGateway')
+                _gateway = gateway_class()
+    return _gateway
+
+
+# Admin-only endpoint exposing the Stripe latency histograms of this process
+class GatewayMetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'endpoints': metrics.snapshot()})
@@ -0,0 +1,147 @@
+import json
+import random
+import re
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from apps.commerce.payment.payments.models import Order, Payment
+
+STATUSES = [status for status, label in Order.STATUS_CHOICES]
+
+
+class Rollback(Exception):
+    """Raised to undo the synthetic rows created for the benchmark"""
+
+
+def postgres_seq_scans(plan, tables):
+    """Yield every sequential scan on one of `tables` in an EXPLAIN (FORMAT JSON) plan"""
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in tables:
+        yield f"Seq Scan on {plan['Relation Name']}"
+    for child in plan.get('Plans', []):
+        yield from postgres_seq_scans(child, tables)
+
+
+def find_seq_scans(queryset):
+    """Plan lines showing a full scan of the orders or payments table for a queryset"""
+    tables = {Order._meta.db_table, Payment._meta.db_table}
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return list(postgres_seq_scans(plan[0]['Plan'], tables))
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        full_scan = re.compile(rf"^SCAN (TABLE )?({'|'.join(tables)})\b(?!.*\bUSING\b)")
+        return [row[-1] for row in cursor.fetchall() if full_scan.match(row[-1])]
+
+
+# Seeds a large order history and times the lookups the payment views and
+# the admin make. Fails when a lookup scans a whole table or its 95th
+# percentile latency is over --max-ms.
+# The rows are rolled back, but seeding still loads the configured database,
+# so it only runs with DEBUG on unless --allow-non-debug is passed.
+# Example: python manage.py benchmark_order_lookups --orders 1000000
+class Command(BaseCommand):
+    help = 'Time PaymentIntent and status lookups on a large synthetic order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000, help='Synthetic orders to create')
+        parser.add_argument('--lookups', type=int, default=500, help='Timed lookups per query')
+        parser.add_argument('--max-ms', type=float, default=5.0, help='Highest allowed p95 latency in milliseconds')
+        parser.add_argument('--allow-non-debug', action='store_true',
+                            help='Run even though DEBUG is off (e.g. against a staging database)')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['allow_non_debug']:
+            raise CommandError('DEBUG is off; pass --allow-non-debug to seed this database anyway')
+        # Synthetic rows are created inside a transaction that is always rolled back
+        failures = []
+        try:
+            with transaction.atomic():
+                self.seed(options['orders'])
+                failures = self.run_benchmarks(options['orders'], options['lookups'], options['max_ms'])
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f"Slow order lookups: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('Order lookups use indexes'))
+
+    def seed(self, count):
+        batch_size = 5000
+        for start in range(0, count, batch_size):
+            stop = min(start + batch_size, count)
+            orders = Order.objects.bulk_create([
+                Order(
+                    order_number=f'BENCH-{i}',
+                    status=STATUSES[i % len(STATUSES)],
+                    total_amount_cents=1000 + i % 10000,
+                    # One order in ten never got a PaymentIntent
+                    stripe_payment_intent_id=f'pi_bench_{i}' if i % 10 else None,
+                )
+                for i in range(start, stop)
+            ])
+            # Orders created on databases that don't return ids are looked up again
+            if orders and orders[0].pk is None:
+                orders = Order.objects.filter(order_number__startswith='BENCH-').order_by('-pk')[:stop - start]
+            Payment.objects.bulk_create([
+                Payment(
+                    order=order,
+                    amount_cents=order.total_amount_cents,
+                    status=order.status if order.status != 'PROCESSING' else 'PENDING',
+                    stripe_payment_intent_id=order.stripe_payment_intent_id,
+                    stripe_payment_method_id='pm_bench',
+                )
+                for order in orders if order.stripe_payment_intent_id
+            ])
+
+        # Fresh statistics so the planner sees the real table size
+        with connection.cursor() as cursor:
+            for model in (Order, Payment):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    def get_lookups(self, count):
+        """(label, function returning a queryset for one random key) for each timed query"""
+        def payment_intent():
+            return f'pi_bench_{random.randrange(count)}'
+
+        return [
+            ('order by payment intent', lambda: Order.objects.filter(stripe_payment_intent_id=payment_intent())),
+            ('payment by payment intent', lambda: Payment.objects.filter(stripe_payment_intent_id=payment_intent())),
+            # The list columns are in the status indexes' INCLUDE, so these can
+            # be index-only scans on PostgreSQL
+            ('orders by status', lambda: Order.objects.filter(
+                status=random.choice(STATUSES)).order_by('-created_at').only(
+                'status', 'created_at', 'order_number', 'total_amount_cents', 'stripe_payment_intent_id')[:100]),
+            ('payments by status', lambda: Payment.objects.filter(
+                status=random.choice(['PENDING', 'COMPLETED', 'FAILED'])).order_by('-created_at').only(
+                'status', 'created_at', 'order', 'amount_cents', 'stripe_payment_intent_id')[:100]),
+        ]
+
+    def run_benchmarks(self, count, lookups, max_ms):
+        failures = []
+        for label, build in self.get_lookups(count):
+            scans = find_seq_scans(build())
+            timings = []
+            for _ in range(lookups):
+                queryset = build()
+                start = time.perf_counter()
+                list(queryset)
+                timings.append((time.perf_counter() - start) * 1000)
+
+            p50 = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            line = f'  {label}: p50 {p50:.2f} ms, p95 {p95:.2f} ms'
+            if scans or p95 > max_ms:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'{line} {"; ".join(scans)}'))
+            else:
+                self.stdout.write(line)
+        return failures
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.commerce.payment.payments.fake_stripe import FakeStripe
+from apps.commerce.payment.payments.gateway import get_gateway
+from apps.commerce.payment.payments.outbox import OutboxWorker, get_outbox_settings
+
+
+# Makes the Stripe calls queued by CreateOrderView and ProcessPaymentView
+# Example: python manage.py process_stripe_outbox --workers 16
+#          python manage.py process_stripe_outbox --once --fake-stripe
+class Command(BaseCommand):
+    help = 'Process queued Stripe calls from the payments outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+        parser.add_argument('--workers', type=int, help='Concurrent Stripe calls')
+        parser.add_argument('--batch-size', type=int, help='Rows claimed per round')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--fake-stripe', action='store_true', help='Use the local Stripe stand-in')
+
+    def handle(self, *args, **options):
+        config = get_outbox_settings()
+        if options['workers']:
+            config['MAX_WORKERS'] = options['workers']
+        if options['batch_size']:
+            config['BATCH_SIZE'] = options['batch_size']
+
+        gateway = FakeStripe() if options['fake_stripe'] else get_gateway()
+        worker = OutboxWorker(gateway, config)
+        try:
+            while True:
+                processed = worker.run_once()
+                if processed:
+                    self.stdout.write(f'Processed {processed} outbox entries')
+                if options['once']:
+                    break
+                if not processed:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.commerce.payment.payments.webhooks import WebhookProcessor, get_webhook_settings
+
+
+# Applies the Stripe webhook events stored by PaymentWebhookView
+# Run it with STRIPE_WEBHOOK_PROCESS_INLINE=False so webhook requests only store events
+# Example: python manage.py process_webhook_events --batch-size 1000
+class Command(BaseCommand):
+    help = 'Apply stored Stripe webhook events to orders in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Apply the pending events and exit')
+        parser.add_argument('--batch-size', type=int, help='Events applied per batch')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when nothing is pending')
+
+    def handle(self, *args, **options):
+        config = get_webhook_settings()
+        if options['batch_size']:
+            config['BATCH_SIZE'] = options['batch_size']
+        processor = WebhookProcessor(config)
+
+        try:
+            while True:
+                processed = processor.process_pending()
+                if processed:
+                    self.stdout.write(f'Applied {processed} webhook events')
+                if options['once']:
+                    break
+                if not processed:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
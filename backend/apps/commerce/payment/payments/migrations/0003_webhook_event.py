@@ -0,0 +1,30 @@
+# Generated by Django 4.2.17 on 2026-10-17 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_stripe_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('stripe_created', models.BigIntegerField(default=0)),
+                ('payload', models.JSONField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSED', 'Processed'), ('IGNORED', 'Ignored')], default='PENDING', max_length=20)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['stripe_created', 'id'],
+                'indexes': [models.Index(fields=['status', 'stripe_created', 'id'], name='webhook_event_pending_idx')],
+            },
+        ),
+    ]
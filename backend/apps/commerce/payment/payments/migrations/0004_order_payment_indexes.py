@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-17 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_webhook_event'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', '-created_at'], include=('id', 'order_number', 'total_amount_cents', 'stripe_payment_intent_id'), name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['stripe_payment_intent_id'], name='payment_intent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at'], include=('id', 'order', 'amount_cents', 'stripe_payment_intent_id'), name='payment_status_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('stripe_payment_intent_id__isnull', False)), fields=('stripe_payment_intent_id',), name='order_payment_intent_uniq'),
+        ),
+    ]
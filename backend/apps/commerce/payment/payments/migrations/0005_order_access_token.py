@@ -0,0 +1,39 @@
+# Generated by Django 4.2.17 on 2026-10-17 08:27
+
+import apps.commerce.payment.payments.models
+from apps.commerce.payment.payments.models import new_access_token
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def fill_access_tokens(apps, schema_editor):
+    # AddField evaluates the default once, so existing orders would share a token
+    # Orders are updated in primary key batches, never all in memory at once
+    Order = apps.get_model('payments', 'Order')
+    last_pk = 0
+    while True:
+        orders = list(Order.objects.filter(pk__gt=last_pk).order_by('pk').only('id')[:BATCH_SIZE])
+        if not orders:
+            return
+        for order in orders:
+            order.access_token = new_access_token()
+        Order.objects.bulk_update(orders, ['access_token'])
+        last_pk = orders[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_order_payment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='access_token',
+            field=models.CharField(default=apps.commerce.payment.payments.models.new_access_token, editable=False, max_length=64),
+        ),
+        migrations.RunPython(fill_access_tokens, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,17 @@
 # apps/commerce/payment/payments/models.py
 # Import necessary Django modules and the Product model
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator  # For validating minimum values
+import secrets  # For unguessable order access tokens
 from apps.commerce.product_features.products.models import Product  # Our existing Product model
 
+# Random token handed to whoever created the order
+# Order numbers are short and guessable, so reading an order's status
+# (and its client_secret) requires this token as well
+def new_access_token():
+    return secrets.token_urlsafe(32)
+
 # Order model - represents a customer's order
 class Order(models.Model):
     # Define possible status values for an order
@@ -35,11 +43,40 @@ class Order(models.Model):
     # Stripe's unique identifier for this payment transaction
     # null=True and blank=True allow this field to be empty
     stripe_payment_intent_id = models.CharField(max_length=255, null=True, blank=True)
+
+    # Secret the frontend needs to confirm the payment
+    # Filled in by the outbox worker when PaymentIntents are created off the request thread
+    stripe_client_secret = models.CharField(max_length=255, null=True, blank=True)
+
+    # Required by the order status endpoint; only returned when the order is created
+    access_token = models.CharField(max_length=64, default=new_access_token, editable=False)
     
     # Automatic timestamps
     created_at = models.DateTimeField(auto_now_add=True)  # Set when order is created
     updated_at = models.DateTimeField(auto_now=True)      # Updated on any change
 
+    class Meta:
+        constraints = [
+            # Webhooks and payment processing look orders up by PaymentIntent
+            # Partial, so the many orders still waiting for one are not indexed
+            models.UniqueConstraint(
+                fields=['stripe_payment_intent_id'],
+                condition=models.Q(stripe_payment_intent_id__isnull=False),
+                name='order_payment_intent_uniq',
+            ),
+        ]
+        indexes = [
+            # Admin and dashboards: orders in a status, newest first
+            # INCLUDE holds the other columns those lists show, so PostgreSQL
+            # can answer them from the index alone. Backends without INCLUDE
+            # support create the plain index (SQLite reports this as models.W040)
+            models.Index(
+                fields=['status', '-created_at'],
+                include=['id', 'order_number', 'total_amount_cents', 'stripe_payment_intent_id'],
+                name='order_status_created_idx',
+            ),
+        ]
+
     # Property to convert cents to dollars for display
     @property
     def total_amount(self):
@@ -114,6 +151,19 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Not unique: a PaymentIntent can be confirmed more than once
+            models.Index(fields=['stripe_payment_intent_id'], name='payment_intent_idx'),
+            # Admin and dashboards: payments in a status, newest first
+            # Covers the listed columns the same way as order_status_created_idx
+            models.Index(
+                fields=['status', '-created_at'],
+                include=['id', 'order', 'amount_cents', 'stripe_payment_intent_id'],
+                name='payment_status_created_idx',
+            ),
+        ]
+
     # Property to show amount in dollars
     @property
     def amount(self):
@@ -122,4 +172,86 @@ class Payment(models.Model):
     
     # String representation of the payment
     def __str__(self):
-        return f"Payment {self.stripe_payment_intent_id} for Order {self.order.order_number}"
\ No newline at end of file
+        return f"Payment {self.stripe_payment_intent_id} for Order {self.order.order_number}"
+
+# StripeOutbox model - Stripe calls waiting to be made by the outbox worker
+# Rows are written in the same transaction as the order they belong to, so a
+# call is never lost and never made for an order that was rolled back.
+# manage.py process_stripe_outbox makes the calls and records the results.
+class StripeOutbox(models.Model):
+    # Stripe calls the worker knows how to make
+    OPERATION_CHOICES = [
+        ('CREATE_PAYMENT_INTENT', 'Create PaymentIntent'),  # For a new order
+        ('SYNC_PAYMENT_INTENT', 'Sync PaymentIntent'),      # After the customer paid
+    ]
+
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),        # Waiting for the worker (or for a retry)
+        ('PROCESSING', 'Processing'),  # Claimed by a worker
+        ('DONE', 'Done'),              # Result recorded
+        ('FAILED', 'Failed'),          # Gave up after the maximum number of attempts
+    ]
+
+    order = models.ForeignKey(Order, related_name='outbox_entries', on_delete=models.CASCADE)
+    operation = models.CharField(max_length=30, choices=OPERATION_CHOICES)
+
+    # Extra arguments of the call (e.g. the payment method ID)
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    # Retries are delayed by moving available_at forward
+    available_at = models.DateTimeField(default=timezone.now)
+    # When a worker claimed the row; rows claimed too long ago are picked up again
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # The worker's claim query
+            models.Index(fields=['status', 'available_at'], name='stripe_outbox_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.operation} for Order {self.order_id} - {self.status}"
+
+
+# WebhookEvent model - raw Stripe webhook events waiting to be applied
+# PaymentWebhookView only stores the event; the unique event_id makes repeated
+# deliveries of the same event a no-op. manage.py process_webhook_events
+# applies the order status changes in batches (see webhooks.py).
+class WebhookEvent(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),      # Stored, not applied yet
+        ('PROCESSED', 'Processed'),  # Order status updated
+        ('IGNORED', 'Ignored'),      # Event type we do not act on
+    ]
+
+    # Stripe's event ID (e.g. "evt_1Nv...")
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+
+    # When Stripe created the event (Unix time), used to apply events in order
+    stripe_created = models.BigIntegerField(default=0)
+
+    # The event exactly as Stripe sent it
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['stripe_created', 'id']
+        indexes = [
+            # The batch processor's query
+            models.Index(fields=['status', 'stripe_created', 'id'], name='webhook_event_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id} - {self.status}"
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+
+def order_total_cents(lines):
+    """Total of validated order lines in cents"""
+    return sum(line['price_cents'] * line['quantity'] for line in lines)
+
+
+# Order writing pipeline used by CreateOrderView
+# Lines come from CreateOrderSerializer, so they are already validated.
+# The order and all of its items are written in one transaction, with a single
+# INSERT for the items, so the number of round-trips does not grow with the cart
+# and a failure never leaves an order without its items.
+def write_order(order_number, lines, stripe_payment_intent_id=None):
+    with transaction.atomic():
+        order = Order.objects.create(
+            order_number=order_number,
+            total_amount_cents=order_total_cents(lines),
+            stripe_payment_intent_id=stripe_payment_intent_id
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product_id=line['product_id'],
+                quantity=line['quantity'],
+                price_cents=line['price_cents']
+            )
+            for line in lines
+        ])
+    return order
+
+
+# Order state machine: the statuses each status may move to
+# Keys are the values of Order.STATUS_CHOICES
+ORDER_TRANSITIONS = {
+    'PENDING': {'PROCESSING', 'COMPLETED', 'FAILED'},
+    'PROCESSING': {'COMPLETED', 'FAILED'},
+    # The customer can retry a failed payment
+    'FAILED': {'PROCESSING', 'COMPLETED'},
+    'COMPLETED': {'REFUNDED'},
+    'REFUNDED': set(),
+}
+
+
+class InvalidTransition(ValueError):
+    """Raised for a status change the order state machine never allows"""
+
+
+def allowed_sources(new_status, expected=None):
+    """Statuses an order may be in to move to new_status"""
+    if new_status not in ORDER_TRANSITIONS:
+        raise InvalidTransition(f"Unknown order status: {new_status}")
+    if expected is not None:
+        if new_status not in ORDER_TRANSITIONS.get(expected, ()):
+            raise InvalidTransition(f"Order can't go from {expected} to {new_status}")
+        return [expected]
+    return sorted(status for status, targets in ORDER_TRANSITIONS.items() if new_status in targets)
+
+
+# Status changes are compare-and-set UPDATEs
+# The WHERE clause only matches orders whose current status allows the change,
+# so racing requests can't overwrite each other and no Python-side read is
+# needed. Only status and updated_at are written.
+def transition_orders(queryset, new_status, expected=None):
+    """Move the orders of a queryset to new_status; returns the number moved
+
+    Orders whose status doesn't allow the change (or isn't `expected`) are left alone
+    """
+    return queryset.filter(status__in=allowed_sources(new_status, expected)).update(
+        status=new_status, updated_at=timezone.now()
+    )
+
+
+def transition_order(order_id, new_status, expected=None):
+    """Move one order to new_status; False when another change got there first"""
+    return transition_orders(Order.objects.filter(pk=order_id), new_status, expected) == 1
@@ -0,0 +1,145 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Order, Payment, StripeOutbox
+from .orders import transition_order
+
+
+# Default outbox configuration
+# Any key can be overridden through settings.STRIPE_OUTBOX
+DEFAULT_OUTBOX_SETTINGS = {
+    # When False the views call Stripe inside the request, as before
+    'ENABLED': False,
+    # Rows claimed per round
+    'BATCH_SIZE': 50,
+    # Stripe calls made at the same time
+    'MAX_WORKERS': 8,
+    # A row is marked FAILED after this many attempts
+    'MAX_ATTEMPTS': 5,
+    # Rows claimed longer ago than this (e.g. by a worker that died) are claimed again
+    'LEASE_SECONDS': 300,
+}
+
+
+def get_outbox_settings():
+    """Return the outbox configuration merged with the defaults"""
+    config = dict(DEFAULT_OUTBOX_SETTINGS)
+    config.update(getattr(settings, 'STRIPE_OUTBOX', {}))
+    return config
+
+
+def outbox_enabled():
+    return get_outbox_settings()['ENABLED']
+
+
+def enqueue(order, operation, **payload):
+    """Add a Stripe call for an order; call inside the transaction that writes the order"""
+    return StripeOutbox.objects.create(order=order, operation=operation, payload=payload)
+
+
+def retry_delay(attempts):
+    """Exponential backoff capped at five minutes"""
+    return timedelta(seconds=min(2 ** attempts, 300))
+
+
+# Makes the Stripe calls waiting in the outbox
+#
+# Rows are claimed in small batches. The Stripe calls of a batch run in a
+# thread pool, since they spend their time waiting on the network, while all
+# database work stays on the calling thread. `gateway` is a StripeGateway
+# (see gateway.py) or the FakeStripe stand-in.
+class OutboxWorker:
+    def __init__(self, gateway, config=None):
+        self.gateway = gateway
+        self.config = config or get_outbox_settings()
+        self.executor = ThreadPoolExecutor(max_workers=self.config['MAX_WORKERS'])
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def claim(self):
+        """Mark a batch of due rows as PROCESSING and return them"""
+        now = timezone.now()
+        lease_expired = now - timedelta(seconds=self.config['LEASE_SECONDS'])
+        with transaction.atomic():
+            # skip_locked lets several workers claim different rows on PostgreSQL
+            # (other databases ignore select_for_update)
+            queryset = StripeOutbox.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                Q(status='PENDING', available_at__lte=now) |
+                Q(status='PROCESSING', claimed_at__lt=lease_expired)
+            ).select_related('order').order_by('id')
+            entries = list(queryset[:self.config['BATCH_SIZE']])
+            StripeOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+                status='PROCESSING', claimed_at=now, attempts=F('attempts') + 1
+            )
+        for entry in entries:
+            entry.attempts += 1
+        return entries
+
+    def run_once(self):
+        """Process one batch; returns the number of rows handled"""
+        entries = self.claim()
+        futures = [(entry, self.executor.submit(self.call_stripe, entry)) for entry in entries]
+        for entry, future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                self.record_failure(entry, e)
+            else:
+                self.record_success(entry, result)
+        return len(entries)
+
+    # Runs on a pool thread: Stripe only, no database access
+    def call_stripe(self, entry):
+        if entry.operation == 'CREATE_PAYMENT_INTENT':
+            order = entry.order
+            return self.gateway.create_payment_intent(
+                amount=order.total_amount_cents,
+                currency='usd',
+                metadata={'order_number': order.order_number},
+                # A retry after a timeout or a crash returns the same PaymentIntent
+                idempotency_key=f"outbox-{entry.pk}",
+            )
+        if entry.operation == 'SYNC_PAYMENT_INTENT':
+            return self.gateway.retrieve_payment_intent(entry.payload['payment_intent_id'])
+        raise ValueError(f"Unknown outbox operation: {entry.operation}")
+
+    def record_success(self, entry, payment_intent):
+        with transaction.atomic():
+            if entry.operation == 'CREATE_PAYMENT_INTENT':
+                Order.objects.filter(pk=entry.order_id).update(
+                    stripe_payment_intent_id=payment_intent.id,
+                    stripe_client_secret=payment_intent.client_secret,
+                    updated_at=timezone.now()
+                )
+            else:
+                # Same bookkeeping ProcessPaymentView does inline
+                succeeded = payment_intent.status == 'succeeded'
+                Payment.objects.create(
+                    order_id=entry.order_id,
+                    amount_cents=payment_intent.amount,
+                    stripe_payment_intent_id=payment_intent.id,
+                    stripe_payment_method_id=entry.payload.get('payment_method_id') or '',
+                    status='COMPLETED' if succeeded else 'FAILED'
+                )
+                transition_order(entry.order_id, 'COMPLETED' if succeeded else 'FAILED')
+            StripeOutbox.objects.filter(pk=entry.pk).update(status='DONE', last_error='')
+
+    def record_failure(self, entry, error):
+        with transaction.atomic():
+            if entry.attempts >= self.config['MAX_ATTEMPTS']:
+                StripeOutbox.objects.filter(pk=entry.pk).update(status='FAILED', last_error=str(error))
+                # An order without a PaymentIntent can never be paid
+                if entry.operation == 'CREATE_PAYMENT_INTENT':
+                    transition_order(entry.order_id, 'FAILED')
+            else:
+                StripeOutbox.objects.filter(pk=entry.pk).update(
+                    status='PENDING',
+                    last_error=str(error),
+                    available_at=timezone.now() + retry_delay(entry.attempts)
+                )
@@ -0,0 +1,92 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from apps.commerce.product_features.products.models import Product
+
+
+# Default pricing configuration
+# Any key can be overridden through settings.ORDER_PRICING
+DEFAULT_PRICING_SETTINGS = {
+    # Cache prices at all; only safe with a cache shared by every worker, or
+    # a price saved in one worker is still charged by the others
+    'CACHE_ENABLED': False,
+    # Which entry of settings.CACHES holds product prices
+    'CACHE_ALIAS': 'default',
+    # Upper bound on how long a price is cached, even without invalidation
+    'CACHE_TIMEOUT': 300,
+    'KEY_PREFIX': 'pricing:product',
+}
+
+
+def get_pricing_settings():
+    """Return the pricing configuration merged with the defaults"""
+    config = dict(DEFAULT_PRICING_SETTINGS)
+    config.update(getattr(settings, 'ORDER_PRICING', {}))
+    return config
+
+
+def to_cents(amount):
+    """Convert a Decimal dollar amount to integer cents (Stripe format)"""
+    return int((Decimal(amount) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+# Resolves order line prices from Product.price
+#
+# All the products of an order are read with one in_bulk() query, so pricing
+# a cart never costs more than one query whatever its size.
+# With CACHE_ENABLED (a shared cache), prices of recently ordered products are
+# cached too, and product saves and deletes remove the cached price (see signals.py).
+class PriceResolver:
+    def __init__(self, config=None):
+        self.config = config or get_pricing_settings()
+        self.cache = caches[self.config['CACHE_ALIAS']]
+
+    def key(self, product_id):
+        return f"{self.config['KEY_PREFIX']}:{product_id}"
+
+    def get_prices(self, product_ids):
+        """Price in cents for each purchasable product id; unknown and inactive ids are left out"""
+        product_ids = set(product_ids)
+        use_cache = self.config['CACHE_ENABLED']
+        prices = {}
+        if use_cache:
+            keys = {self.key(product_id): product_id for product_id in product_ids}
+            prices = {keys[key]: cents for key, cents in self.cache.get_many(list(keys)).items()}
+
+        missing = product_ids - set(prices)
+        if missing:
+            products = Product.objects.filter(is_active=True).only('price').in_bulk(missing)
+            fetched = {product_id: to_cents(product.price) for product_id, product in products.items()}
+            if use_cache:
+                self.cache.set_many(
+                    {self.key(product_id): cents for product_id, cents in fetched.items()},
+                    self.config['CACHE_TIMEOUT']
+                )
+            prices.update(fetched)
+        return prices
+
+    def price_lines(self, lines):
+        """Set price_cents on every order line from the product's current price
+
+        Returns the product ids that could not be priced
+        """
+        prices = self.get_prices(line['product_id'] for line in lines)
+        unpriced = sorted({line['product_id'] for line in lines} - set(prices))
+        for line in lines:
+            if line['product_id'] in prices:
+                line['price_cents'] = prices[line['product_id']]
+        return unpriced
+
+    def invalidate(self, product_id):
+        self.invalidate_many([product_id])
+
+    def invalidate_many(self, product_ids):
+        if not self.config['CACHE_ENABLED']:
+            return
+        keys = [self.key(product_id) for product_id in product_ids]
+        self.cache.delete_many(keys)
+        # Again after commit, in case another request cached the old price meanwhile
+        transaction.on_commit(lambda: self.cache.delete_many(keys))
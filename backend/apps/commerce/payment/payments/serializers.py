@@ -2,6 +2,7 @@
 from rest_framework import serializers
 # Import our models that we want to serialize
 from .models import Order, OrderItem, Payment
+from .pricing import PriceResolver
 
 # Serializer for individual items in an order
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -84,4 +85,24 @@ class PaymentSerializer(serializers.ModelSerializer):
             'created_at'                # When payment was created
         ]
         # Fields that can't be modified through the API
-        read_only_fields = ['stripe_payment_intent_id']
\ No newline at end of file
+        read_only_fields = ['stripe_payment_intent_id']
+
+# Serializer for one line of an incoming order (write only)
+# price_cents is accepted for older clients but replaced by the server price
+class OrderLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    price_cents = serializers.IntegerField(min_value=0, required=False)
+
+
+# Serializer for the body of CreateOrderView
+# Every line is validated and priced before anything is written
+class CreateOrderSerializer(serializers.Serializer):
+    items = OrderLineSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, items):
+        # Prices come from Product.price, at most one query for the whole cart
+        unpriced = PriceResolver().price_lines(items)
+        if unpriced:
+            raise serializers.ValidationError(f"Unknown or unavailable product ids: {unpriced}")
+        return items
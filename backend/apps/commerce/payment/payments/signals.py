@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.commerce.product_features.products.models import Product
+from .pricing import PriceResolver
+
+
+# A changed (or deactivated, or deleted) product must not keep its cached price
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_price(sender, instance, **kwargs):
+    PriceResolver().invalidate(instance.pk)
@@ -1,3 +1,558 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import io
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import stripe
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.commerce.product_features.products.models import Product
+from .fake_stripe import FakeStripe
+from .gateway import DEFAULT_GATEWAY_SETTINGS, StripeGateway, clear_gateway, get_gateway, metrics
+from .models import Order, OrderItem, Payment, StripeOutbox, WebhookEvent
+from .outbox import OutboxWorker, get_outbox_settings
+from .orders import ORDER_TRANSITIONS, InvalidTransition, transition_order
+from .pricing import PriceResolver, to_cents
+from .webhooks import WebhookProcessor
+
+
+def create_products(count):
+    return [
+        Product.objects.create(name=f"Product {i}", price=Decimal('10.00') + i, description=f"Product number {i}")
+        for i in range(count)
+    ]
+
+
+FAKE_GATEWAY = 'apps.commerce.payment.payments.fake_stripe.FakeStripe'
+
+
+# Payments tests never call Stripe: the gateway is the FakeStripe stand-in
+@override_settings(STRIPE_GATEWAY_CLASS=FAKE_GATEWAY)
+class CreateOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(50)
+
+    def setUp(self):
+        cache.clear()
+        clear_gateway()
+
+    def post_order(self, items):
+        # secure=True because settings force an HTTPS redirect
+        return self.client.post(reverse('create-order'), {'items': items}, content_type='application/json', secure=True)
+
+    def lines(self, count):
+        return [
+            {'product_id': product.id, 'quantity': 2, 'price_cents': to_cents(product.price)}
+            for product in self.products[:count]
+        ]
+
+    def test_order_and_items_are_written(self):
+        response = self.post_order(self.lines(3))
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount_cents, 2 * (1000 + 1100 + 1200))
+        intent = get_gateway().intents[order.stripe_payment_intent_id]
+        self.assertEqual(intent.amount, order.total_amount_cents)
+        self.assertEqual(response.json()['client_secret'], intent.client_secret)
+        self.assertEqual(order.items.count(), 3)
+        self.assertEqual(len(response.json()['order']['items']), 3)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        counts = []
+        for size in (1, 50):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.post_order(self.lines(size)).status_code, 201)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_client_prices_are_ignored(self):
+        lines = [{'product_id': self.products[5].id, 'quantity': 3, 'price_cents': 1}]
+        self.assertEqual(self.post_order(lines).status_code, 201)
+        self.assertEqual(OrderItem.objects.get().price_cents, 1500)
+        self.assertEqual(Order.objects.get().total_amount_cents, 4500)
+
+    def test_inactive_products_cannot_be_ordered(self):
+        Product.objects.filter(pk=self.products[0].pk).update(is_active=False)
+        self.assertEqual(self.post_order(self.lines(1)).status_code, 400)
+
+    def test_invalid_lines_write_nothing(self):
+        lines = self.lines(2) + [{'product_id': 999999, 'quantity': 1, 'price_cents': 100}]
+        for items in (lines, [{'product_id': self.products[0].id, 'quantity': 0, 'price_cents': 100}], []):
+            response = self.post_order(items)
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(get_gateway().calls, [])
+
+    def test_failed_item_insert_rolls_back_the_order(self):
+        with mock.patch.object(OrderItem.objects, 'bulk_create', side_effect=RuntimeError('insert failed')):
+            response = self.post_order(self.lines(5))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class PriceResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = create_products(5)
+
+    def test_to_cents(self):
+        self.assertEqual(
+            [to_cents(Decimal(value)) for value in ('19.99', '0.01', '999999.99', '1.005')],
+            [1999, 1, 99999999, 101]
+        )
+
+    def test_prices_are_read_from_products_without_the_cache(self):
+        product = self.products[0]
+        PriceResolver().get_prices([product.id])
+        # A change that no receiver in this process sees, e.g. from another worker
+        Product.objects.filter(pk=product.pk).update(price=Decimal('42.50'))
+        with self.assertNumQueries(1):
+            self.assertEqual(PriceResolver().get_prices([product.id]), {product.id: 4250})
+
+    @override_settings(ORDER_PRICING={'CACHE_ENABLED': True})
+    def test_one_query_then_cached(self):
+        ids = [product.id for product in self.products]
+        with self.assertNumQueries(1):
+            prices = PriceResolver().get_prices(ids + [999999])
+        self.assertEqual(prices, {product.id: to_cents(product.price) for product in self.products})
+        with self.assertNumQueries(0):
+            self.assertEqual(PriceResolver().get_prices(ids), prices)
+
+    @override_settings(ORDER_PRICING={'CACHE_ENABLED': True})
+    def test_save_invalidates_cached_price(self):
+        product = self.products[0]
+        PriceResolver().get_prices([product.id])
+        product.price = Decimal('42.50')
+        product.save()
+        self.assertEqual(PriceResolver().get_prices([product.id]), {product.id: 4250})
+        product.delete()
+        self.assertEqual(PriceResolver().get_prices([product.id]), {})
+
+
+@override_settings(STRIPE_OUTBOX={'ENABLED': True}, STRIPE_GATEWAY_CLASS=FAKE_GATEWAY)
+class StripeOutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_products(3)
+
+    def setUp(self):
+        cache.clear()
+        clear_gateway()
+        self.stripe = FakeStripe()
+
+    def run_worker(self, stripe=None, **config):
+        worker = OutboxWorker(stripe or self.stripe, dict(get_outbox_settings(), **config))
+        self.addCleanup(worker.close)
+        return worker.run_once()
+
+    def create_order(self):
+        items = [{'product_id': product.id, 'quantity': 1} for product in self.products]
+        response = self.client.post(
+            reverse('create-order'), {'items': items}, content_type='application/json', secure=True
+        )
+        self.assertEqual(get_gateway().calls, [])
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_order_gets_client_secret_from_worker(self):
+        body = self.create_order()
+        self.assertIsNone(body['client_secret'])
+        entry = StripeOutbox.objects.get()
+        self.assertEqual((entry.operation, entry.status), ('CREATE_PAYMENT_INTENT', 'PENDING'))
+
+        self.assertEqual(self.run_worker(), 1)
+        status = self.client.get(body['status_url'], secure=True).json()
+        order = Order.objects.get()
+        self.assertEqual(status['client_secret'], order.stripe_client_secret)
+        self.assertEqual(self.stripe.intents[order.stripe_payment_intent_id].amount, 3300)
+        self.assertEqual(StripeOutbox.objects.get().status, 'DONE')
+        self.assertEqual(self.run_worker(), 0)
+
+    def test_order_status_needs_the_access_token(self):
+        body = self.create_order()
+        self.run_worker()
+        order = Order.objects.get()
+        self.assertEqual(body['access_token'], order.access_token)
+        self.assertNotIn('access_token', body['order'])
+        url = reverse('order-status', kwargs={'order_number': order.order_number})
+        for params in ({}, {'token': 'guess'}, {'token': 'é'}):
+            response = self.client.get(url, params, secure=True)
+            self.assertEqual(response.status_code, 404)
+            self.assertNotIn('client_secret', response.json())
+        response = self.client.get(url, {'token': order.access_token}, secure=True)
+        self.assertEqual(response.json()['client_secret'], order.stripe_client_secret)
+        # Each order gets its own token
+        self.assertNotEqual(self.create_order()['access_token'], order.access_token)
+
+    def test_failed_calls_are_retried_with_the_same_idempotency_key(self):
+        self.create_order()
+        self.stripe.failures = 1
+        self.run_worker()
+        entry = StripeOutbox.objects.get()
+        self.assertEqual((entry.status, entry.attempts), ('PENDING', 1))
+        self.assertGreater(entry.available_at, timezone.now())
+        # Not due yet
+        self.assertEqual(self.run_worker(), 0)
+
+        StripeOutbox.objects.update(available_at=timezone.now())
+        self.run_worker()
+        self.assertEqual(StripeOutbox.objects.get().status, 'DONE')
+        self.assertEqual(len(self.stripe.intents), 1)
+
+    def test_order_fails_after_max_attempts(self):
+        self.create_order()
+        self.run_worker(FakeStripe(failures=1), MAX_ATTEMPTS=1)
+        self.assertEqual(StripeOutbox.objects.get().status, 'FAILED')
+        self.assertEqual(Order.objects.get().status, 'FAILED')
+
+    def test_expired_claims_are_picked_up_again(self):
+        self.create_order()
+        StripeOutbox.objects.update(status='PROCESSING', claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.run_worker(), 1)
+        self.assertEqual(StripeOutbox.objects.get().status, 'DONE')
+
+    def test_payment_is_recorded_by_worker(self):
+        self.create_order()
+        self.run_worker()
+        order = Order.objects.get()
+        response = self.client.post(reverse('process-payment'), {
+            'payment_intent_id': order.stripe_payment_intent_id, 'payment_method_id': 'pm_card'
+        }, content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 202)
+        self.run_worker()
+        payment = Payment.objects.get()
+        self.assertEqual((payment.status, payment.amount_cents, payment.stripe_payment_method_id), ('COMPLETED', 3300, 'pm_card'))
+        self.assertEqual(Order.objects.get().status, 'COMPLETED')
+
+    def test_payment_without_intent_id_is_rejected(self):
+        # Two orders still waiting for their PaymentIntent
+        self.create_order()
+        self.create_order()
+        for data in ({}, {'payment_intent_id': None}, {'payment_intent_id': ''}):
+            response = self.client.post(
+                reverse('process-payment'), data, content_type='application/json', secure=True
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(StripeOutbox.objects.filter(operation='SYNC_PAYMENT_INTENT').count(), 0)
+
+    def test_stripe_calls_run_concurrently(self):
+        for _ in range(8):
+            self.create_order()
+        start = time.perf_counter()
+        self.assertEqual(self.run_worker(FakeStripe(latency=0.2), MAX_WORKERS=8), 8)
+        # Sequential calls would take 1.6 seconds
+        self.assertLess(time.perf_counter() - start, 0.8)
+
+
+# Minimal HTTP server answering like the Stripe API, with scripted responses
+class FakeStripeAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.respond()
+
+    def respond(self):
+        server = self.server
+        server.requests.append({
+            'path': self.path,
+            'port': self.client_address[1],
+            'idempotency_key': self.headers.get('Idempotency-Key'),
+        })
+        status, delay = server.script.pop(0) if server.script else (200, 0)
+        time.sleep(delay)
+        if status == 200:
+            body = {'id': 'pi_local', 'object': 'payment_intent', 'amount': 1000,
+                    'client_secret': 'pi_local_secret', 'status': 'requires_payment_method'}
+        else:
+            body = {'error': {'type': 'api_error', 'message': 'Server error'}}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StripeGatewayTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeStripeAPIHandler)
+        self.server.requests = []
+        self.server.script = []
+        # Clients hanging up after a deadline are expected
+        self.server.handle_error = lambda request, client_address: None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        metrics.reset()
+        # stripe logs every request at INFO
+        stripe_logger = logging.getLogger('stripe')
+        stripe_logger.setLevel(logging.WARNING)
+        self.addCleanup(stripe_logger.setLevel, logging.NOTSET)
+
+    def gateway(self, **config):
+        config = dict({
+            'API_BASE': f"http://127.0.0.1:{self.server.server_port}",
+            'BACKOFF': 0.01, 'READ_TIMEOUT': 0.5,
+        }, **config)
+        gateway = StripeGateway(dict(DEFAULT_GATEWAY_SETTINGS, **config), api_key='sk_test_local')
+        self.addCleanup(gateway.session.close)
+        return gateway
+
+    def test_connections_are_reused(self):
+        gateway = self.gateway()
+        for _ in range(3):
+            self.assertEqual(gateway.create_payment_intent(1000).client_secret, 'pi_local_secret')
+        self.assertEqual(len({request['port'] for request in self.server.requests}), 1)
+
+    def test_retries_reuse_the_idempotency_key(self):
+        self.server.script = [(500, 0), (500, 0)]
+        intent = self.gateway().create_payment_intent(1000, idempotency_key='order-1')
+        self.assertEqual(intent.id, 'pi_local')
+        self.assertEqual([request['idempotency_key'] for request in self.server.requests], ['order-1'] * 3)
+        stats = metrics.snapshot()['payment_intents.create']
+        self.assertEqual((stats['count'], stats['errors'], stats['retries']), (3, 2, 2))
+
+    def test_retries_are_bounded(self):
+        self.server.script = [(500, 0)] * 5
+        with self.assertRaises(stripe.error.APIError):
+            self.gateway(MAX_RETRIES=1).retrieve_payment_intent('pi_local')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_deadline_limits_slow_calls(self):
+        self.server.script = [(200, 1.0)] * 5
+        start = time.monotonic()
+        with self.assertRaises(stripe.error.APIConnectionError):
+            self.gateway(DEADLINES={'payment_intents.retrieve': 0.6}).retrieve_payment_intent('pi_local')
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_latency_histogram(self):
+        gateway = self.gateway()
+        gateway.retrieve_payment_intent('pi_local')
+        stats = metrics.snapshot()['payment_intents.retrieve']
+        self.assertEqual(sum(stats['buckets'].values()), 1)
+        self.assertEqual(set(stats['buckets']), {'25', '50', '100', '250', '500', '1000', '2500', '5000', '10000', '+Inf'})
+
+
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+@override_settings(STRIPE_GATEWAY_CLASS=FAKE_GATEWAY, STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+                   STRIPE_WEBHOOKS={'PROCESS_INLINE': False})
+class WebhookIngestionTests(TestCase):
+    def setUp(self):
+        clear_gateway()
+        self.order = Order.objects.create(order_number='ORD-1', total_amount_cents=1000, stripe_payment_intent_id='pi_1')
+
+    def deliver(self, event_id, event_type, payment_intent_id='pi_1', created=1, signature=None):
+        payload = json.dumps({
+            'id': event_id, 'object': 'event', 'type': event_type, 'created': created,
+            'data': {'object': {'id': payment_intent_id, 'object': 'payment_intent'}},
+        })
+        if signature is None:
+            timestamp = int(time.time())
+            digest = hmac.new(WEBHOOK_SECRET.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+            signature = f"t={timestamp},v1={digest}"
+        return self.client.post(reverse('stripe-webhook'), payload, content_type='application/json',
+                                HTTP_STRIPE_SIGNATURE=signature, secure=True)
+
+    def test_view_only_stores_the_event(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.deliver('evt_1', 'payment_intent.succeeded')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if 'payments_order' in q['sql']])
+        self.assertEqual(WebhookEvent.objects.get().status, 'PENDING')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'PENDING')
+
+    def test_duplicate_deliveries_are_stored_once(self):
+        for _ in range(3):
+            self.assertEqual(self.deliver('evt_1', 'payment_intent.succeeded').status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.deliver('evt_1', 'payment_intent.succeeded', signature='t=1,v1=bad')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_events_apply_in_creation_order(self):
+        # Delivered out of order: the failure was created before the success
+        self.deliver('evt_2', 'payment_intent.succeeded', created=20)
+        self.deliver('evt_1', 'payment_intent.payment_failed', created=10)
+        self.assertEqual(WebhookProcessor().process_pending(), 2)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'COMPLETED')
+
+    def test_events_in_one_batch_follow_the_state_machine(self):
+        # Same created second, so the events are applied in delivery order
+        self.deliver('evt_1', 'payment_intent.succeeded', created=10)
+        self.deliver('evt_2', 'payment_intent.payment_failed', created=10)
+        other = Order.objects.create(order_number='ORD-2', total_amount_cents=1000, stripe_payment_intent_id='pi_2')
+        # A retried payment: failed first, then succeeded
+        self.deliver('evt_3', 'payment_intent.payment_failed', payment_intent_id='pi_2', created=10)
+        self.deliver('evt_4', 'payment_intent.succeeded', payment_intent_id='pi_2', created=10)
+        self.assertEqual(WebhookProcessor().process_pending(), 4)
+        self.order.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.order.status, other.status), ('COMPLETED', 'COMPLETED'))
+
+    def test_late_failure_does_not_undo_completed_order(self):
+        self.deliver('evt_1', 'payment_intent.succeeded', created=10)
+        WebhookProcessor().process_pending()
+        self.deliver('evt_2', 'payment_intent.payment_failed', created=20)
+        WebhookProcessor().process_pending()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'COMPLETED')
+
+    def test_batch_updates_do_not_grow_with_event_count(self):
+        orders = [
+            Order(order_number=f"ORD-B{i}", total_amount_cents=1000, stripe_payment_intent_id=f"pi_b{i}")
+            for i in range(20)
+        ]
+        Order.objects.bulk_create(orders)
+        for i in range(20):
+            self.deliver(f"evt_b{i}", 'payment_intent.succeeded', payment_intent_id=f"pi_b{i}", created=i)
+        self.deliver('evt_other', 'charge.refunded')
+        with CaptureQueriesContext(connection) as queries:
+            WebhookProcessor().process_pending()
+        self.assertLess(len(queries), 10)
+        self.assertEqual(Order.objects.filter(status='COMPLETED').count(), 20)
+        self.assertEqual(WebhookEvent.objects.get(event_id='evt_other').status, 'IGNORED')
+        # Running again finds nothing left to do
+        self.assertEqual(WebhookProcessor().process_pending(), 0)
+
+    @override_settings(STRIPE_WEBHOOKS={'PROCESS_INLINE': True})
+    def test_inline_processing(self):
+        self.deliver('evt_1', 'payment_intent.succeeded')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'COMPLETED')
+        self.assertEqual(WebhookEvent.objects.get().status, 'PROCESSED')
+
+
+class OrderLookupIndexTests(TestCase):
+    def test_lookups_use_indexes(self):
+        output = io.StringIO()
+        # Latency is not asserted here, only the query plans
+        call_command('benchmark_order_lookups', orders=3000, lookups=20, max_ms=1000,
+                     allow_non_debug=True, stdout=output)
+        self.assertIn('Order lookups use indexes', output.getvalue())
+        # The synthetic rows are rolled back
+        self.assertFalse(Order.objects.exists())
+
+    def test_refuses_to_run_without_debug(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark_order_lookups', orders=10, stdout=io.StringIO())
+        self.assertFalse(Order.objects.exists())
+
+    def test_payment_intent_is_unique_per_order(self):
+        Order.objects.create(order_number='ORD-1', total_amount_cents=100, stripe_payment_intent_id='pi_1')
+        # Orders still waiting for a PaymentIntent don't collide
+        Order.objects.create(order_number='ORD-2', total_amount_cents=100)
+        Order.objects.create(order_number='ORD-3', total_amount_cents=100)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Order.objects.create(order_number='ORD-4', total_amount_cents=100, stripe_payment_intent_id='pi_1')
+
+
+class OrderTransitionTests(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(order_number='ORD-1', total_amount_cents=100)
+
+    def test_states_match_status_choices(self):
+        self.assertEqual(set(ORDER_TRANSITIONS), {value for value, label in Order.STATUS_CHOICES})
+
+    def test_only_status_is_written(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(transition_order(self.order.pk, 'COMPLETED'))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('total_amount_cents', queries[0]['sql'])
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'COMPLETED')
+
+    @override_settings(STRIPE_GATEWAY_CLASS=FAKE_GATEWAY)
+    def test_process_payment_moves_order_through_state_machine(self):
+        clear_gateway()
+        intent = get_gateway().create_payment_intent(amount=100)
+        Order.objects.filter(pk=self.order.pk).update(stripe_payment_intent_id=intent.id)
+        response = self.client.post(reverse('process-payment'), {
+            'payment_intent_id': intent.id, 'payment_method_id': 'pm_1'
+        }, content_type='application/json', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'COMPLETED')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'COMPLETED')
+
+    def test_illegal_transitions(self):
+        Order.objects.filter(pk=self.order.pk).update(status='COMPLETED')
+        # Not allowed from the current status: nothing changes
+        self.assertFalse(transition_order(self.order.pk, 'FAILED'))
+        self.assertTrue(transition_order(self.order.pk, 'REFUNDED'))
+        with self.assertRaises(InvalidTransition):
+            transition_order(self.order.pk, 'SHIPPED')
+        with self.assertRaises(InvalidTransition):
+            transition_order(self.order.pk, 'PENDING', expected='REFUNDED')
+
+
+# Threads hit the database for real, so the changes have to be committed
+class OrderTransitionContentionTests(TransactionTestCase):
+    def run_threads(self, count, target):
+        barrier = threading.Barrier(count)
+        results = [None] * count
+
+        def run(index):
+            try:
+                barrier.wait()
+                results[index] = target(index)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_racing_transition_wins(self):
+        order = Order.objects.create(order_number='ORD-1', total_amount_cents=100)
+        statuses = ['COMPLETED', 'FAILED'] * 4
+        results = self.run_threads(len(statuses), lambda i: transition_order(order.pk, statuses[i], expected='PENDING'))
+        self.assertEqual(results.count(True), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.status, statuses[results.index(True)])
+
+    def test_status_changes_keep_concurrent_writes(self):
+        order = Order.objects.create(order_number='ORD-1', total_amount_cents=100)
+
+        def work(index):
+            if index % 2:
+                return transition_order(order.pk, 'PROCESSING')
+            # Another writer filling in a different column at the same time
+            return Order.objects.filter(pk=order.pk).update(stripe_client_secret='secret')
+
+        self.run_threads(8, work)
+        order.refresh_from_db()
+        self.assertEqual((order.status, order.stripe_client_secret), ('PROCESSING', 'secret'))
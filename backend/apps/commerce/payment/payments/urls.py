@@ -1,7 +1,8 @@
 # Import path from django.urls to define URL patterns
 from django.urls import path
-# Import our three view classes from views.py
-from .views import CreateOrderView, ProcessPaymentView, PaymentWebhookView
+# Import our view classes from views.py
+from .views import CreateOrderView, OrderStatusView, ProcessPaymentView, PaymentWebhookView
+from .gateway import GatewayMetricsView
 
 # Define URL patterns for our payment system
 urlpatterns = [
@@ -10,11 +11,21 @@ urlpatterns = [
          CreateOrderView.as_view(),  # Convert class to view
          name='create-order'),       # Name for reverse URL lookup
     
+    # URL pattern for polling an order while Stripe calls run in the outbox worker
+    path('orders/<str:order_number>/', 
+         OrderStatusView.as_view(), 
+         name='order-status'),
+    
     # URL pattern for processing payments after card entry
     path('process/', 
          ProcessPaymentView.as_view(), 
          name='process-payment'),
     
+    # Stripe call latency histograms (admin users only)
+    path('gateway/metrics/', 
+         GatewayMetricsView.as_view(), 
+         name='stripe-gateway-metrics'),
+    
     # URL pattern for receiving Stripe webhook notifications
     path('webhook/', 
          PaymentWebhookView.as_view(), 
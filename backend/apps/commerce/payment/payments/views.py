@@ -3,18 +3,24 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-# Import Django settings to access Stripe keys
-from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
 # Import our models and serializers
-from .models import Order, OrderItem, Payment
-from .serializers import OrderSerializer, PaymentSerializer
-# Import Stripe for payment processing
+from .models import Order, Payment
+from .serializers import CreateOrderSerializer, OrderSerializer, PaymentSerializer
+from .orders import order_total_cents, transition_order, write_order
+from .outbox import enqueue, outbox_enabled
+from .gateway import get_gateway
+from .webhooks import WebhookProcessor, get_webhook_settings, ingest_event
+# Import Stripe for its error classes; calls go through the gateway
 import stripe
 # Import uuid for generating unique order numbers
 import uuid
+# Import secrets for comparing order access tokens in constant time
+import secrets
 
-# Set up Stripe with our secret key from Django settings
-stripe.api_key = settings.STRIPE_SECRET_KEY
+# Every Stripe call goes through the payments gateway (see gateway.py)
+# It holds the API key, pooled connections, timeouts and retries
 
 class CreateOrderView(APIView):
     def post(self, request):
@@ -29,46 +35,55 @@ class CreateOrderView(APIView):
             #The "ORD-" prefix makes it immediately clear it's an order number, and the 8 random characters after make it unique. 
             order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
             
-            # Get the items array from the request data
-            # If no items found, default to empty list []
-            items = request.data.get('items', [])
+            # Validate every line of the order before anything is written
+            # Lines need an active product_id and a positive quantity
+            # Prices are read from the products, not taken from the client (see pricing.py)
+            order_serializer = CreateOrderSerializer(data=request.data)
+            if not order_serializer.is_valid():
+                return Response({
+                    'error': 'Invalid order',
+                    'details': order_serializer.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
+            items = order_serializer.validated_data['items']
+            
+            # With the outbox enabled, Stripe is called by the outbox worker instead
+            # The order and the queued call are committed together, and the client
+            # polls the order status URL for the client_secret
+            # The status URL carries the order's access token, which is only
+            # ever returned here, to the client that created the order
+            if outbox_enabled():
+                with transaction.atomic():
+                    order = write_order(order_number, items)
+                    enqueue(order, 'CREATE_PAYMENT_INTENT')
+                status_url = reverse('order-status', kwargs={'order_number': order_number})
+                return Response({
+                    'order': OrderSerializer(order).data,
+                    'client_secret': None,
+                    'access_token': order.access_token,
+                    'status_url': f"{status_url}?token={order.access_token}"
+                }, status=status.HTTP_202_ACCEPTED)  # 202 = Accepted, payment setup still running
             
             # Calculate the total amount in cents
             # Example: 2 items at $29.99 each = 5998 cents
-            total_amount_cents = sum(
-                item.get('price_cents', 0) * item.get('quantity', 0) 
-                for item in items
-            )
+            total_amount_cents = order_total_cents(items)
             
             # Create a PaymentIntent in Stripe
             # This is Stripe's way of tracking a payment
-            payment_intent = stripe.PaymentIntent.create(
+            # It runs before the database transaction so no transaction is held open
+            # while waiting for Stripe
+            # The gateway allows any payment method and retries with an idempotency key
+            payment_intent = get_gateway().create_payment_intent(
                 amount=total_amount_cents,          # Amount to charge
                 currency='usd',                     # Currency to use
-                automatic_payment_methods={
-                    'enabled': True                 # Allow any payment method
-                },
                 metadata={
                     'order_number': order_number    # Add our reference # We can find this later
-                }
-            )
-            
-            # Create the order in our database
-            order = Order.objects.create(
-                order_number=order_number,          # Our unique reference
-                total_amount_cents=total_amount_cents,  # Total in cents
-                stripe_payment_intent_id=payment_intent.id  # Stripe's reference
+                },
+                idempotency_key=f"order-{order_number}"
             )
             
-            # Create individual order items
-            # Each item in the order is saved separately
-            for item in items:
-                OrderItem.objects.create(
-                    order=order,                # Link to parent order
-                    product_id=item['product_id'],  # Which product
-                    quantity=item['quantity'],      # How many
-                    price_cents=item['price_cents'] # Price per item
-                )
+            # Create the order and all of its items in one transaction
+            # The items are inserted with a single statement (see orders.py)
+            order = write_order(order_number, items, payment_intent.id)
             
             # Prepare the response
             # Serialize the order for the API response
@@ -102,27 +117,55 @@ class ProcessPaymentView(APIView):
             payment_intent_id = request.data.get('payment_intent_id')   # ID of the payment attempt
             payment_method_id = request.data.get('payment_method_id')   # ID of the card/payment method
             
+            # Orders still waiting for a PaymentIntent have no id, so looking one
+            # up without an id would match all of them
+            if not payment_intent_id:
+                return Response(
+                    {'error': 'payment_intent_id is required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # With the outbox enabled, the worker checks with Stripe and records the payment
+            # The client polls the order status URL for the result, adding the
+            # access token it got when the order was created
+            if outbox_enabled():
+                order = Order.objects.get(stripe_payment_intent_id=payment_intent_id)
+                enqueue(
+                    order, 'SYNC_PAYMENT_INTENT',
+                    payment_intent_id=payment_intent_id,
+                    payment_method_id=payment_method_id
+                )
+                return Response({
+                    'status': 'PENDING',
+                    'status_url': reverse('order-status', kwargs={'order_number': order.order_number})
+                }, status=status.HTTP_202_ACCEPTED)
+            
             # Check with Stripe if payment was successful
             # This gets the current status of the payment
-            payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-            
-            # Find our order using Stripe's payment ID
-            # This links Stripe's payment to our order
-            order = Order.objects.get(stripe_payment_intent_id=payment_intent_id)
-            
-            # Create a record of the payment in our database
-            payment = Payment.objects.create(
-                order=order,                    # Link to our order
-                amount_cents=payment_intent.amount,  # Amount from Stripe
-                stripe_payment_intent_id=payment_intent_id,  # Stripe's payment ID
-                stripe_payment_method_id=payment_method_id,  # Card/payment method ID
-                # Set status based on Stripe's response
-                status='COMPLETED' if payment_intent.status == 'succeeded' else 'FAILED'
-            )
+            payment_intent = get_gateway().retrieve_payment_intent(payment_intent_id)
             
-            # Update the order's status based on payment result
-            order.status = 'COMPLETED' if payment_intent.status == 'succeeded' else 'FAILED'
-            order.save()
+            new_status = 'COMPLETED' if payment_intent.status == 'succeeded' else 'FAILED'
+            with transaction.atomic():
+                # Find our order using Stripe's payment ID and lock it, so
+                # concurrent confirmations of one order are applied one at a time
+                order = Order.objects.select_for_update().only('id', 'order_number', 'status').get(
+                    stripe_payment_intent_id=payment_intent_id
+                )
+                
+                # Create a record of the payment in our database
+                payment = Payment.objects.create(
+                    order=order,                    # Link to our order
+                    amount_cents=payment_intent.amount,  # Amount from Stripe
+                    stripe_payment_intent_id=payment_intent_id,  # Stripe's payment ID
+                    stripe_payment_method_id=payment_method_id,  # Card/payment method ID
+                    # Set status based on Stripe's response
+                    status=new_status
+                )
+                
+                # Update the order's status based on payment result
+                # Only status and updated_at are written, and only if the
+                # state machine allows the change (see orders.py)
+                transition_order(order.pk, new_status)
             
             # Return the payment details
             serializer = PaymentSerializer(payment)
@@ -141,6 +184,27 @@ class ProcessPaymentView(APIView):
                 'details': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
 
+# Order status endpoint polled by the frontend while the outbox worker talks to Stripe
+# client_secret stays null until the PaymentIntent exists
+# Needs ?token=<access_token> from the create response; order numbers alone
+# can be guessed, so a wrong or missing token looks like an unknown order
+class OrderStatusView(APIView):
+    def get(self, request, order_number):
+        token = request.query_params.get('token', '')
+        try:
+            order = Order.objects.prefetch_related('items').get(order_number=order_number)
+        except Order.DoesNotExist:
+            order = None
+        if order is None or not secrets.compare_digest(token.encode(), order.access_token.encode()):
+            return Response(
+                {'error': 'Order not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response({
+            'order': OrderSerializer(order).data,
+            'client_secret': order.stripe_client_secret
+        })
+
 # Second Class: Handles automatic updates from Stripe (webhook notifications)
 class PaymentWebhookView(APIView):
     def post(self, request):
@@ -152,28 +216,20 @@ class PaymentWebhookView(APIView):
         try:
             # Verify this is really from Stripe
             # Uses our webhook secret to validate the signature
-            event = stripe.Webhook.construct_event(
+            # The gateway checks it against settings.STRIPE_WEBHOOK_SECRET
+            event = get_gateway().construct_event(
                 payload,                         # The raw data from the request
-                sig_header,                      # Stripe's signature
-                settings.STRIPE_WEBHOOK_SECRET   # Our secret key shared with Stripe
+                sig_header                       # Stripe's signature
             )
             
-            # Handle different types of events from Stripe
-            if event.type == 'payment_intent.succeeded':
-                # Payment was successful
-                payment_intent = event.data.object
-                 # Use Stripe's payment ID to find our order
-                order = Order.objects.get(stripe_payment_intent_id=payment_intent.id)
-                order.status = 'COMPLETED'
-                order.save()
-                
-            elif event.type == 'payment_intent.payment_failed':
-                # Payment failed
-                payment_intent = event.data.object
-                # Find and update our order
-                order = Order.objects.get(stripe_payment_intent_id=payment_intent.id)
-                order.status = 'FAILED'
-                order.save()
+            # Store the raw event and answer right away
+            # The unique event id turns repeated deliveries into no-ops, and the
+            # order status changes are applied in batches (see webhooks.py)
+            event_id = ingest_event(payload)
+            
+            # Without the batch worker, apply the event before answering
+            if get_webhook_settings()['PROCESS_INLINE']:
+                WebhookProcessor().process_batch(event_ids=[event_id])
                 
             # Tell Stripe we received their notification
             return Response({'status': 'success'})
@@ -0,0 +1,129 @@
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, WebhookEvent
+from .orders import ORDER_TRANSITIONS, transition_orders
+
+
+# Default webhook configuration
+# Any key can be overridden through settings.STRIPE_WEBHOOKS
+DEFAULT_WEBHOOK_SETTINGS = {
+    # Apply each event right after storing it, inside the webhook request.
+    # Turn off when `manage.py process_webhook_events` is running.
+    'PROCESS_INLINE': True,
+    # Events applied per batch
+    'BATCH_SIZE': 500,
+}
+
+
+def get_webhook_settings():
+    """Return the webhook configuration merged with the defaults"""
+    config = dict(DEFAULT_WEBHOOK_SETTINGS)
+    config.update(getattr(settings, 'STRIPE_WEBHOOKS', {}))
+    return config
+
+
+# Order status each event type moves the order to
+EVENT_ORDER_STATUS = {
+    'payment_intent.succeeded': 'COMPLETED',
+    'payment_intent.payment_failed': 'FAILED',
+}
+
+
+def ingest_event(payload):
+    """Store a verified webhook payload; repeated deliveries are ignored
+
+    One INSERT ... ON CONFLICT DO NOTHING, no reads and no order rows touched
+    """
+    data = json.loads(payload)
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(
+            event_id=data['id'],
+            event_type=data.get('type', ''),
+            stripe_created=data.get('created') or 0,
+            payload=data,
+        )
+    ], ignore_conflicts=True)
+    return data['id']
+
+
+# Applies stored webhook events to orders in batches
+#
+# Events are read in the order Stripe created them and folded through the
+# order state machine per PaymentIntent, starting from the order's current
+# status: each event only counts if the state machine allows it at that
+# point, exactly as if the events were applied one at a time. A burst of
+# events for one order still becomes a single change. Orders are locked in
+# primary key order and updated with one UPDATE per target status, which
+# keeps concurrent processors from deadlocking on the same rows.
+class WebhookProcessor:
+    def __init__(self, config=None):
+        self.config = config or get_webhook_settings()
+
+    def process_batch(self, event_ids=None):
+        """Apply one batch of pending events; returns the number of events handled"""
+        with transaction.atomic():
+            # skip_locked lets several processors take different events on PostgreSQL
+            queryset = WebhookEvent.objects.select_for_update(skip_locked=True, of=('self',)).filter(status='PENDING')
+            if event_ids is not None:
+                queryset = queryset.filter(event_id__in=event_ids)
+            events = list(queryset.order_by('stripe_created', 'id')[:self.config['BATCH_SIZE']])
+            if not events:
+                return 0
+
+            # Statuses each PaymentIntent's events ask for, in event order
+            requested = defaultdict(list)
+            processed = []
+            ignored = []
+            for event in events:
+                order_status = EVENT_ORDER_STATUS.get(event.event_type)
+                payment_intent_id = event.payload.get('data', {}).get('object', {}).get('id')
+                if order_status is None or not payment_intent_id:
+                    ignored.append(event.pk)
+                    continue
+                requested[payment_intent_id].append(order_status)
+                processed.append(event.pk)
+
+            self.apply(requested)
+
+            now = timezone.now()
+            WebhookEvent.objects.filter(pk__in=processed).update(status='PROCESSED', processed_at=now)
+            WebhookEvent.objects.filter(pk__in=ignored).update(status='IGNORED', processed_at=now)
+        return len(events)
+
+    def apply(self, requested):
+        if not requested:
+            return
+        # Lock the affected orders in a fixed order before changing them
+        orders = (
+            Order.objects.select_for_update()
+            .filter(stripe_payment_intent_id__in=list(requested))
+            .order_by('pk').values_list('pk', 'stripe_payment_intent_id', 'status')
+        )
+
+        order_ids_by_status = defaultdict(list)
+        for order_id, payment_intent_id, current_status in orders:
+            # Statuses the state machine doesn't allow at that point (e.g. a
+            # failure after a success) are skipped, as they would be one by one
+            final_status = current_status
+            for order_status in requested[payment_intent_id]:
+                if order_status in ORDER_TRANSITIONS[final_status]:
+                    final_status = order_status
+            if final_status != current_status:
+                order_ids_by_status[final_status].append(order_id)
+
+        for order_status, order_ids in sorted(order_ids_by_status.items()):
+            transition_orders(Order.objects.filter(pk__in=order_ids), order_status)
+
+    def process_pending(self):
+        """Apply batches until no pending events are left"""
+        total = 0
+        while True:
+            processed = self.process_batch()
+            total += processed
+            if processed < self.config['BATCH_SIZE']:
+                return total
@@ -4,6 +4,7 @@ from django.contrib import admin  # Core Django admin functionality
 from django.contrib.admin import SimpleListFilter  # For creating custom filters in admin
 from django.utils.html import format_html  # For safely rendering HTML in admin
 from .models import Product, ProductImage  # Import our models
+from .variants import smallest_variant  # Admin thumbnails use the smallest resized copy
 
 # Custom filter for product prices in the admin interface
 class PriceRangeFilter(SimpleListFilter):
@@ -92,6 +93,7 @@ class ProductAdmin(admin.ModelAdmin):
     
     # Fields that can be searched
     search_fields = [
+        'sku',
         'name',
         'description',
         'short_description'
@@ -103,7 +105,7 @@ class ProductAdmin(admin.ModelAdmin):
     # Group fields into sections in the edit form
     fieldsets = (
         ('Basic Information', {
-            'fields': ('name', 'category', 'subcategory', 'price')
+            'fields': ('name', 'sku', 'category', 'subcategory', 'price')
         }),
         ('Descriptive Content', {
             'fields': ('description', 'short_description', 'meta_description')
@@ -127,9 +129,10 @@ class ProductAdmin(admin.ModelAdmin):
     def display_image(self, obj):
         if obj.image:
             # Return HTML for image thumbnail using format_html for safe rendering
+            # The smallest generated variant keeps the list page from loading full-size uploads
             return format_html(
                 '<img src="{}" style="width: 100px; height: auto;" />',
-                obj.image.url
+                obj.image.storage.url(smallest_variant(obj.image_variants, obj.image.name))
             )
         return 'No Image'
     display_image.short_description = 'Image'  # Column header in admin
@@ -147,7 +150,7 @@ class ProductImageAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="width: 100px; height: auto;" />',
-                obj.image.url
+                obj.image.storage.url(smallest_variant(obj.image_variants, obj.image.name))
             )
         return 'No Image'
     display_image.short_description = 'Image'
\ No newline at end of file
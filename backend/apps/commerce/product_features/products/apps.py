@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.commerce.product_features.products'
\ No newline at end of file
+    name = 'apps.commerce.product_features.products'
+
+    def ready(self):
+        # Create database objects the search backend needs (e.g. the SQLite FTS5 table)
+        from .search import install_search_backend
+        post_migrate.connect(install_search_backend, sender=self)
+
+        # Connect the response cache invalidation receivers
+        from . import signals  # noqa: F401
\ No newline at end of file
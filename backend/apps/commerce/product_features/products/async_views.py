@@ -0,0 +1,139 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .fast_serializers import FastPrimaryImageSerializer, FastProductSerializer
+from .fieldsets import parse_fieldset
+from .models import Product
+from .pagination import StandardResultsSetPagination
+from .sampling import FeaturedProductSampler
+from .serializers import PrimaryImageProductSerializer, ProductSerializer
+from .views import ProductListView, ProductSearchView
+
+logger = logging.getLogger(__name__)
+
+# Native async read path for the catalog (served under /api/products/async/)
+#
+# Under ASGI the DRF views in views.py run in a worker thread each. These
+# views are coroutines instead: queries go through Django's async ORM
+# (acount, aget, async iteration) and products are built by
+# FastProductSerializer.aserialize_many(). Listings take their queryset from
+# the matching sync view, so filters, search and ordering are the ones its
+# filter backends apply. Responses match the sync views with
+# PRODUCT_FAST_SERIALIZER enabled and page-number pagination. The response
+# cache, conditional GETs and cursor pagination stay on the sync views.
+
+
+def json_response(data, status=200):
+    # DRF's encoder writes decimals and datetimes the same way the sync views do
+    return JsonResponse(data, status=status, safe=False, encoder=JSONEncoder)
+
+
+class AsyncProductView(View):
+    http_method_names = ['get', 'head', 'options']
+    # Accept ?images=primary, as the sync listing views do
+    allow_primary_image_only = False
+
+    def serializer(self, request):
+        serializer_class, fields = FastProductSerializer, ProductSerializer.Meta.fields
+        if self.allow_primary_image_only and request.GET.get('images') == 'primary':
+            serializer_class, fields = FastPrimaryImageSerializer, PrimaryImageProductSerializer.Meta.fields
+        # Sparse fieldsets (?fields= / ?exclude=) as on the sync views
+        return serializer_class(context={'request': request, 'fieldset': parse_fieldset(request.GET, fields)})
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            return await self.aget(request, *args, **kwargs)
+        except ValidationError as e:
+            return json_response(e.detail, status=400)
+
+
+# Listing shared by the list and search views
+# The queryset is built by sync_view_class, then paginated by page number with
+# StandardResultsSetPagination's parameters and response shape
+class AsyncProductListMixin:
+    sync_view_class = None
+    pagination_class = StandardResultsSetPagination
+
+    def get_queryset(self, request):
+        """The sync view's queryset after its filter backends"""
+        view = self.sync_view_class()
+        view.setup(request)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        return view.filter_queryset(view.get_queryset())
+
+    async def aget(self, request):
+        # Validating filters and picking the search backend may query the
+        # database, so the queryset is built on the sync side
+        queryset = await sync_to_async(self.get_queryset)(request)
+        return await self.paginate(request, queryset)
+
+    async def paginate(self, request, queryset):
+        pagination = self.pagination_class()
+        page_size = pagination.get_page_size(Request(request))
+        count = await queryset.acount()
+        last_page = max(1, -(-count // page_size))
+        page_number = request.GET.get(pagination.page_query_param, 1)
+        try:
+            page = last_page if page_number in pagination.last_page_strings else int(page_number)
+        except ValueError:
+            page = 0
+        if page < 1 or page > last_page:
+            return json_response({'detail': str(pagination.invalid_page_message)}, status=404)
+
+        offset = (page - 1) * page_size
+        results = await self.serializer(request).aserialize_many(queryset[offset:offset + page_size])
+
+        url = request.build_absolute_uri()
+        param = pagination.page_query_param
+        next_link = replace_query_param(url, param, page + 1) if page < last_page else None
+        previous_link = None
+        if page > 1:
+            previous_link = remove_query_param(url, param) if page == 2 else replace_query_param(url, param, page - 1)
+        return json_response({
+            'count': count,
+            'next': next_link,
+            'previous': previous_link,
+            'results': results,
+        })
+
+
+# GET /api/products/async/ - ProductListView's queryset and filters
+class AsyncProductListView(AsyncProductListMixin, AsyncProductView):
+    sync_view_class = ProductListView
+    allow_primary_image_only = True
+
+
+# GET /api/products/async/search/ - ProductSearchView's queryset and filters
+class AsyncProductSearchView(AsyncProductListView):
+    sync_view_class = ProductSearchView
+
+
+# GET /api/products/async/<pk>/
+class AsyncProductDetailView(AsyncProductView):
+    async def aget(self, request, pk):
+        try:
+            data = await self.serializer(request).aserialize_one(Product.objects.all(), pk=pk)
+        except Product.DoesNotExist:
+            return json_response({'error': 'Product not found'}, status=404)
+        return json_response(data)
+
+
+# GET /api/products/async/featured/ - same sampling as FeaturedProductsView
+class AsyncFeaturedProductsView(AsyncProductView):
+    async def aget(self, request):
+        serializer = self.serializer(request)
+        try:
+            queryset = await FeaturedProductSampler().asample_queryset()
+            results = await serializer.aserialize_many(queryset)
+        except Exception as e:
+            logger.error(f"Error in AsyncFeaturedProductsView: {str(e)}")
+            return json_response({'error': 'Unable to retrieve featured products'}, status=500)
+        return json_response({'data': {'results': results, 'count': len(results)}})
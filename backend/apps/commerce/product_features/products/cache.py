@@ -0,0 +1,171 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+# Default response cache configuration
+# Any key can be overridden through settings.PRODUCT_CACHE
+DEFAULT_CACHE_SETTINGS = {
+    'ENABLED': True,
+    # Which entry of settings.CACHES to use
+    'ALIAS': 'default',
+    # Upper bound on how long a response can live, even without invalidation
+    'TIMEOUT': 300,
+    'KEY_PREFIX': 'catalog',
+}
+
+
+def get_cache_settings():
+    """Return the response cache configuration merged with the defaults"""
+    config = dict(DEFAULT_CACHE_SETTINGS)
+    config.update(getattr(settings, 'PRODUCT_CACHE', {}))
+    return config
+
+
+# Per-process hit/miss counters, exposed through CacheMetricsView
+class CacheMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def record(self, view_name, hit):
+        with self.lock:
+            self.counts[(view_name, 'hits' if hit else 'misses')] += 1
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+        views = {}
+        for (view_name, kind), value in counts.items():
+            views.setdefault(view_name, {'hits': 0, 'misses': 0})[kind] = value
+        return views
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+
+metrics = CacheMetrics()
+
+
+# Cache of serialized API responses with tag-based invalidation
+#
+# Every cached response lists the tags it depends on (e.g. 'products' for
+# listings, 'product:42' for a detail page) together with each tag's version
+# at the time it was stored. Changing a model bumps the versions of its tags,
+# and a stored response is only served while all of its versions still match.
+# Editing one product therefore only invalidates responses that used it.
+class ResponseCache:
+    def __init__(self, config=None):
+        self.config = config or get_cache_settings()
+        self.cache = caches[self.config['ALIAS']]
+        self.prefix = self.config['KEY_PREFIX']
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    def tag_key(self, tag):
+        return f"{self.prefix}:tag:{tag}"
+
+    def make_key(self, view_name, request):
+        """Cache key from the view, the origin, the path and the normalized query params"""
+        params = request.query_params
+        normalized = urlencode(sorted(
+            (name, value) for name in params for value in params.getlist(name)
+        ))
+        # Bodies hold absolute media URLs built from the request's scheme and
+        # host, so each origin gets its own entry in a shared cache
+        origin = f"{request.scheme}://{request.get_host()}"
+        digest = hashlib.md5(f"{origin}{request.path}?{normalized}".encode()).hexdigest()
+        return f"{self.prefix}:response:{view_name}:{digest}"
+
+    def get_tag_versions(self, tags):
+        keys = {self.tag_key(tag): tag for tag in tags}
+        found = self.cache.get_many(list(keys))
+        versions = {keys[key]: value for key, value in found.items()}
+        for tag in tags:
+            if tag not in versions:
+                # A time-based start value means a tag that was evicted from the
+                # cache never comes back with a version an old response used
+                self.cache.add(self.tag_key(tag), time.time_ns(), None)
+                versions[tag] = self.cache.get(self.tag_key(tag))
+        return versions
+
+    def bump_tags(self, tags):
+        # The new version is the time of the change (never lower than before),
+        # which also lets conditional GETs use it as a Last-Modified value
+        keys = [self.tag_key(tag) for tag in tags]
+        current = self.cache.get_many(keys)
+        now = time.time_ns()
+        self.cache.set_many({key: max(now, current.get(key, 0) + 1) for key in keys}, None)
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if self.get_tag_versions(list(entry['versions'])) != entry['versions']:
+            return None
+        return entry['data']
+
+    def set(self, key, data, tags):
+        entry = {'versions': self.get_tag_versions(tags), 'data': data}
+        self.cache.set(key, entry, self.config['TIMEOUT'])
+
+
+def invalidate(*tags):
+    """Bump tag versions now and again once the current transaction commits"""
+    tags = [tag for tag in tags if tag]
+    response_cache = ResponseCache()
+    response_cache.bump_tags(tags)
+    # The second bump covers responses cached by other requests that read
+    # the old rows before this transaction became visible
+    transaction.on_commit(lambda: ResponseCache().bump_tags(tags))
+
+
+# Mixin for read-only API views
+# Caches the response data of successful GET requests. It must be listed
+# before the DRF view class so its get() runs first.
+class CachedResponseMixin:
+    # Name used in cache keys and metrics
+    cache_view_name = None
+
+    def get_cache_tags(self, request, data):
+        """Tags the response depends on; override for per-object tags"""
+        return ['products']
+
+    def get(self, request, *args, **kwargs):
+        response_cache = ResponseCache()
+        if not response_cache.enabled:
+            return super().get(request, *args, **kwargs)
+
+        view_name = self.cache_view_name or self.__class__.__name__
+        key = response_cache.make_key(view_name, request)
+        data = response_cache.get(key)
+        if data is not None:
+            metrics.record(view_name, hit=True)
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        metrics.record(view_name, hit=False)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data, self.get_cache_tags(request, response.data))
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+# Admin-only endpoint exposing the hit/miss counters of this process
+class CacheMetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'views': metrics.snapshot()})
@@ -0,0 +1,57 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import ResponseCache
+
+
+def build_validators(request, tags, last_modified=None):
+    """ETag and Last-Modified for a response that depends on the given tags
+
+    Both come from the tag versions kept by the response cache, which change
+    whenever a receiver in signals.py invalidates a tag, so no query or
+    serialization is needed. last_modified can add a datetime from the database.
+    """
+    versions = ResponseCache().get_tag_versions(tags)
+    # Bodies differ per origin (absolute media URLs), so the ETag does too
+    fingerprint = f"{request.build_absolute_uri()}|" + '|'.join(
+        f"{tag}={versions[tag]}" for tag in sorted(versions)
+    )
+    etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+
+    # Tag versions are change times in nanoseconds
+    timestamps = [version // 1_000_000_000 for version in versions.values()]
+    if last_modified is not None:
+        timestamps.append(int(last_modified.timestamp()))
+    return etag, max(timestamps)
+
+
+# Mixin adding ETag / Last-Modified support to read-only API views
+# List it first so a matching If-None-Match or If-Modified-Since header is
+# answered with 304 before the response cache or the database are touched.
+class ConditionalGetMixin:
+
+    def get_validators(self, request):
+        """Return (etag, last_modified) or None to skip conditional handling"""
+        return build_validators(request, ['products'])
+
+    def get(self, request, *args, **kwargs):
+        # The tag versions are only shared by every worker when the response
+        # cache is on (see settings.PRODUCT_CACHE), so no ETags without it
+        validators = self.get_validators(request) if ResponseCache().enabled else None
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = validators
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            not_modified['Last-Modified'] = http_date(last_modified)
+            return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
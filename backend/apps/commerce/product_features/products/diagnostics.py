@@ -0,0 +1,76 @@
+import json
+import logging
+import random
+
+from django.conf import settings
+
+# Diagnostics for the products app
+#
+# Hot paths (serializers run once per row) log through DiagnosticsLogger
+# instead of print(). A disabled level costs one cached isEnabledFor() check:
+# nothing is formatted and callables passed as fields are never called.
+#
+# Levels are set per logger in settings.LOGGING as usual. Sampling rates
+# come from settings.PRODUCT_DIAGNOSTICS['SAMPLE_RATES'], keyed by logger
+# name, e.g. {'apps.commerce.product_features.products.serializers': 0.01}
+# to keep 1% of the enabled debug/info events. Warnings and errors are
+# never sampled.
+
+
+def get_sample_rate(name):
+    config = getattr(settings, 'PRODUCT_DIAGNOSTICS', {})
+    return config.get('SAMPLE_RATES', {}).get(name, 1.0)
+
+
+class DiagnosticsLogger:
+    def __init__(self, name):
+        self.logger = logging.getLogger(name)
+        self.name = name
+
+    def should_emit(self, level):
+        if not self.logger.isEnabledFor(level):
+            return False
+        if level >= logging.WARNING:
+            return True
+        rate = get_sample_rate(self.name)
+        return rate >= 1.0 or random.random() < rate
+
+    def log(self, level, event, exc_info=False, **fields):
+        if not self.should_emit(level):
+            return
+        # Lazy fields: callables are only evaluated for events that are emitted
+        fields = {key: value() if callable(value) else value for key, value in fields.items()}
+        self.logger.log(level, event, exc_info=exc_info, extra={'fields': fields})
+
+    def debug(self, event, **fields):
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event, **fields):
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        self.log(logging.WARNING, event, **fields)
+
+    def exception(self, event, **fields):
+        self.log(logging.ERROR, event, exc_info=True, **fields)
+
+
+def get_logger(name):
+    """Return a DiagnosticsLogger, e.g. get_logger(__name__)"""
+    return DiagnosticsLogger(name)
+
+
+# Formatter that writes one JSON object per line
+# Used by the 'structured' formatter in settings.LOGGING
+class StructuredFormatter(logging.Formatter):
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        payload.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            payload['exception'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
@@ -0,0 +1,129 @@
+from itertools import islice
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework import permissions
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.views import APIView
+
+from .fast_serializers import PRODUCT_COLUMNS, FastProductSerializer
+from .filters import InvalidParameter, filter_products
+from .models import Product
+
+
+# Default catalog export configuration
+# Any key can be overridden through settings.PRODUCT_EXPORT
+DEFAULT_EXPORT_SETTINGS = {
+    # Rows read per database round trip, and per images/subcategories query
+    'CHUNK_SIZE': 2000,
+    # Let anyone download the catalog instead of staff users only
+    'PUBLIC': False,
+}
+
+
+def get_export_settings():
+    """Return the export configuration merged with the defaults"""
+    config = dict(DEFAULT_EXPORT_SETTINGS)
+    config.update(getattr(settings, 'PRODUCT_EXPORT', {}))
+    return config
+
+
+# Supported formats: content type and file extension
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'json': ('application/json', 'json'),
+}
+
+
+# FastProductSerializer for exports
+# Additional image URLs don't depend on a request here, so feeds written by
+# the management command have them too
+class ExportSerializer(FastProductSerializer):
+    def additional_image_url(self, name):
+        return self.image_url(name)
+
+    def additional_image_srcset(self, variants, name):
+        return self.image_srcset(variants, name)
+
+
+def iter_products(queryset, chunk_size, context=None):
+    """Yield product dicts in primary key order, one chunk in memory at a time
+
+    Rows are streamed with .iterator() (a server-side cursor on PostgreSQL);
+    each chunk gets its images and subcategories with one query each, the
+    same way FastProductSerializer prefetches a page.
+    """
+    serializer = ExportSerializer(context=context)
+    rows = queryset.order_by('pk').values(*PRODUCT_COLUMNS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from serializer.build(chunk, *serializer.fetch_related(chunk))
+
+
+def iter_export(queryset, fmt='ndjson', chunk_size=None, context=None):
+    """Yield the encoded export in pieces of about one chunk each"""
+    chunk_size = chunk_size or get_export_settings()['CHUNK_SIZE']
+    encode = JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+    products = iter_products(queryset, chunk_size, context)
+
+    # Joining a chunk's lines keeps the number of writes low
+    if fmt == 'ndjson':
+        while True:
+            lines = [encode(product) for product in islice(products, chunk_size)]
+            if not lines:
+                return
+            yield '\n'.join(lines) + '\n'
+
+    # 'json': one array, written a chunk at a time
+    yield '['
+    separator = ''
+    while True:
+        items = [encode(product) for product in islice(products, chunk_size)]
+        if not items:
+            break
+        yield separator + ','.join(items)
+        separator = ','
+    yield ']\n'
+
+
+# ?format= picks the export format here, not a DRF renderer; errors are
+# rendered with the first renderer (JSON)
+class ExportNegotiation(DefaultContentNegotiation):
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+# GET /api/products/export/?format=ndjson|json - the whole catalog in one download
+# Accepts the category, subcategory, is_featured and price filters of ProductListView
+# The body is generated while it is sent, so memory use doesn't grow with the catalog
+class ProductExportView(APIView):
+    content_negotiation_class = ExportNegotiation
+
+    def get_permissions(self):
+        if get_export_settings()['PUBLIC']:
+            return [permissions.AllowAny()]
+        return [permissions.IsAdminUser()]
+
+    def get(self, request):
+        fmt = request.query_params.get('format', 'ndjson')
+        if fmt not in FORMATS:
+            return Response({'format': [f'Choose one of: {", ".join(FORMATS)}.']}, status=400)
+        try:
+            queryset = filter_products(Product.objects.all(), request.query_params)
+        except InvalidParameter as e:
+            return Response(e.errors, status=400)
+
+        content_type, extension = FORMATS[fmt]
+        response = StreamingHttpResponse(
+            iter_export(queryset, fmt, context={'request': request}),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = content_disposition_header(True, f'products.{extension}')
+        # The export is never cached by shared caches
+        response['Cache-Control'] = 'private, no-store'
+        return response
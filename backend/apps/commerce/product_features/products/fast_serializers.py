@@ -0,0 +1,367 @@
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from apps.commerce.product_features.subcategories.models import Subcategory
+from apps.commerce.product_features.subcategories.serializers import SubcategorySerializer
+from .fieldsets import SparseFieldsetMixin, columns_for
+from .media import get_media_resolver
+from .pagination import KeysetPagination
+from .models import ProductImage
+from .variants import build_srcset
+from .serializers import PrimaryImageProductSerializer, ProductSerializer
+
+# Columns read with .values() for each product row
+PRODUCT_COLUMNS = (
+    'id', 'name', 'category', 'subcategory_id', 'price', 'description',
+    'short_description', 'meta_description', 'image', 'image_variants', 'rating',
+    'is_featured', 'created_at', 'updated_at', 'primary_image_id',
+)
+IMAGE_COLUMNS = ('id', 'product_id', 'image', 'image_variants', 'is_primary', 'alt_text')
+SUBCATEGORY_COLUMNS = ('id', 'name', 'slug', 'category', 'description', 'active_products_count')
+
+
+# Field formatters taken from a ProductSerializer instance, built once per process
+# Reusing DRF's own to_representation keeps decimals and datetimes identical
+class FieldFormatters:
+    @cached_property
+    def fields(self):
+        return ProductSerializer().fields
+
+    @cached_property
+    def price(self):
+        return self.fields['price'].to_representation
+
+    @cached_property
+    def rating(self):
+        return self.fields['rating'].to_representation
+
+    @cached_property
+    def datetime(self):
+        return self.fields['created_at'].to_representation
+
+
+formatters = FieldFormatters()
+
+
+def row_from_instance(product, columns=None):
+    """Read a Product instance into the same dict shape .values() returns
+
+    columns limits the row to a sparse fieldset's columns, so fields
+    deferred with .only() are not loaded one query at a time
+    """
+    if columns is not None:
+        row = {column: getattr(product, column) for column in columns}
+        if 'image' in row:
+            row['image'] = row['image'].name
+        return row
+    return {
+        'id': product.id,
+        'name': product.name,
+        'category': product.category,
+        'subcategory_id': product.subcategory_id,
+        'price': product.price,
+        'description': product.description,
+        'short_description': product.short_description,
+        'meta_description': product.meta_description,
+        'image': product.image.name,
+        'image_variants': product.image_variants,
+        'rating': product.rating,
+        'is_featured': product.is_featured,
+        'created_at': product.created_at,
+        'updated_at': product.updated_at,
+        'primary_image_id': product.primary_image_id,
+    }
+
+
+# Read-only replacement for ProductSerializer
+#
+# Produces the same output as ProductSerializer without DRF's per-field
+# machinery: rows come from .values() (or from already loaded instances),
+# images and subcategories are fetched in one query each, and every product
+# dict is built in a single pass. The golden tests in tests.py compare both.
+class FastProductSerializer:
+    # True replaces additional_images with primary_image, as
+    # PrimaryImageProductSerializer does
+    primary_image_only = False
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        # Sparse fieldset chosen by the view (see products/fieldsets.py)
+        self.fieldset = self.context.get('fieldset')
+        self.columns = PRODUCT_COLUMNS if self.fieldset is None else columns_for(self.fieldset)
+
+    @property
+    def data(self):
+        if self.many:
+            return self.serialize_many(self.instance)
+        return self.serialize_many([self.instance])[0]
+
+    # URL building matches ProductSerializer.get_image_url and
+    # ProductImageSerializer.get_image_url
+    @cached_property
+    def request(self):
+        return self.context.get('request')
+
+    @cached_property
+    def media_resolver(self):
+        return get_media_resolver(self.context)
+
+    def image_url(self, name):
+        try:
+            return self.media_resolver.url(name)
+        except Exception:
+            return None
+
+    def additional_image_url(self, name):
+        # Additional images have no relative fallback without a request
+        if self.request is None:
+            return None
+        return self.image_url(name)
+
+    def image_srcset(self, variants, name):
+        try:
+            return build_srcset(variants, name, self.media_resolver.url)
+        except Exception:
+            return None
+
+    def additional_image_srcset(self, variants, name):
+        if self.request is None:
+            return None
+        return self.image_srcset(variants, name)
+
+    def includes(self, name):
+        return self.fieldset is None or name in self.fieldset
+
+    @property
+    def images_field(self):
+        return 'primary_image' if self.primary_image_only else 'additional_images'
+
+    def serialize_many(self, objects):
+        if isinstance(objects, QuerySet):
+            # Ordering by annotations such as search_rank still applies
+            rows = list(objects.prefetch_related(None).values(*self.columns))
+            return self.build(rows, *self.fetch_related(rows))
+
+        objects = list(objects)
+        if objects and isinstance(objects[0], dict):
+            return self.build(objects, *self.fetch_related(objects))
+
+        # Model instances: use relations that are already prefetched
+        rows = [row_from_instance(product, None if self.fieldset is None else self.columns) for product in objects]
+        images = {}
+        if self.includes(self.images_field) and self.primary_image_only:
+            images = {
+                product.id: [self.image_row(product.primary_image)] if product.primary_image_id else []
+                for product in objects
+            }
+        elif self.includes(self.images_field):
+            images = {product.id: [self.image_row(image) for image in product.images.all()] for product in objects}
+        subcategories = {}
+        if self.includes('subcategory_details'):
+            subcategories = {
+                product.subcategory_id: self.subcategory_row(product.subcategory)
+                for product in objects if product.subcategory_id
+            }
+        return self.build(rows, images, subcategories)
+
+    @staticmethod
+    def image_row(image):
+        return {
+            'id': image.id, 'product_id': image.product_id, 'image': image.image.name,
+            'image_variants': image.image_variants, 'is_primary': image.is_primary, 'alt_text': image.alt_text,
+        }
+
+    @staticmethod
+    def subcategory_row(subcategory):
+        return {
+            'id': subcategory.id, 'name': subcategory.name, 'slug': subcategory.slug,
+            'category': subcategory.category, 'description': subcategory.description,
+            'active_products_count': SubcategorySerializer().get_products_count(subcategory),
+        }
+
+    # Async path for the ASGI views (see async_views.py)
+    # Same queries as serialize_many() and fetch_related(), run with the async ORM
+    async def aserialize_many(self, queryset):
+        rows = [row async for row in queryset.prefetch_related(None).values(*self.columns)]
+        return self.build(rows, *await self.afetch_related(rows))
+
+    async def aserialize_one(self, queryset, **lookups):
+        """The one product matching lookups, fetched with aget(); raises DoesNotExist"""
+        row = await queryset.prefetch_related(None).values(*self.columns).aget(**lookups)
+        return self.build([row], *await self.afetch_related([row]))[0]
+
+    async def afetch_related(self, rows):
+        images = {row['id']: [] for row in rows}
+        image_filter = self.image_filter(rows)
+        if image_filter:
+            async for image in ProductImage.objects.filter(**image_filter).values(*IMAGE_COLUMNS):
+                images[image['product_id']].append(image)
+
+        subcategory_ids = set()
+        if self.includes('subcategory_details'):
+            subcategory_ids = {row['subcategory_id'] for row in rows if row['subcategory_id']}
+        subcategories = {}
+        if subcategory_ids:
+            queryset = Subcategory.objects.with_products_count().filter(id__in=subcategory_ids)
+            subcategories = {row['id']: row async for row in queryset.values(*SUBCATEGORY_COLUMNS)}
+        return images, subcategories
+
+    def image_filter(self, rows):
+        """Lookup for the images of these rows, or None when there are none to load"""
+        if not self.includes(self.images_field):
+            return None
+        if self.primary_image_only:
+            image_ids = [row['primary_image_id'] for row in rows if row['primary_image_id']]
+            return {'id__in': image_ids} if image_ids else None
+        return {'product_id__in': [row['id'] for row in rows]} if rows else None
+
+    def fetch_related(self, rows):
+        """Images grouped by product and subcategories by id, one query each"""
+        images = {row['id']: [] for row in rows}
+        image_filter = self.image_filter(rows)
+        if image_filter:
+            for image in ProductImage.objects.filter(**image_filter).values(*IMAGE_COLUMNS):
+                images[image['product_id']].append(image)
+
+        subcategory_ids = set()
+        if self.includes('subcategory_details'):
+            subcategory_ids = {row['subcategory_id'] for row in rows if row['subcategory_id']}
+        subcategories = {}
+        if subcategory_ids:
+            queryset = Subcategory.objects.with_products_count().filter(id__in=subcategory_ids)
+            subcategories = {row['id']: row for row in queryset.values(*SUBCATEGORY_COLUMNS)}
+        return images, subcategories
+
+    def image_dict(self, image):
+        return {
+            'id': image['id'],
+            'image_url': self.additional_image_url(image['image']),
+            'image_srcset': self.additional_image_srcset(image['image_variants'], image['image']),
+            'is_primary': image['is_primary'],
+            'alt_text': image['alt_text'],
+        }
+
+    @staticmethod
+    def subcategory_dict(subcategory):
+        if not subcategory:
+            return None
+        return {
+            'id': subcategory['id'],
+            'name': subcategory['name'],
+            'slug': subcategory['slug'],
+            'category': subcategory['category'],
+            'description': subcategory['description'],
+            'products_count': subcategory['active_products_count'],
+        }
+
+    def build(self, rows, images, subcategories):
+        if self.fieldset is not None:
+            return self.build_fieldset(rows, images, subcategories)
+
+        # Look-ups hoisted out of the loop
+        price = formatters.price
+        rating = formatters.rating
+        datetime = formatters.datetime
+        image_url = self.image_url
+        image_srcset = self.image_srcset
+        image_dict = self.image_dict
+        subcategory_dict = self.subcategory_dict
+        primary_image_only = self.primary_image_only
+        images_field = self.images_field
+
+        results = []
+        for row in rows:
+            product_images = images.get(row['id'], ())
+            results.append({
+                'id': row['id'],
+                'name': row['name'],
+                'category': row['category'],
+                'subcategory': row['subcategory_id'],
+                'subcategory_details': subcategory_dict(subcategories.get(row['subcategory_id'])),
+                'price': price(row['price']),
+                'description': row['description'],
+                'short_description': row['short_description'],
+                'meta_description': row['meta_description'],
+                'image_url': image_url(row['image']),
+                'image_srcset': image_srcset(row['image_variants'], row['image']),
+                images_field: (
+                    next(map(image_dict, product_images), None) if primary_image_only
+                    else [image_dict(image) for image in product_images]
+                ),
+                'rating': rating(row['rating']),
+                'is_featured': row['is_featured'],
+                'created_at': datetime(row['created_at']),
+                'updated_at': datetime(row['updated_at']),
+                # Product.is_in_stock() is a placeholder that always returns True
+                'is_in_stock': True,
+            })
+        return results
+
+    def build_fieldset(self, rows, images, subcategories):
+        """build() for a sparse fieldset: only the chosen fields are computed"""
+        image_dict = self.image_dict
+        builders = {
+            'id': lambda row: row['id'],
+            'name': lambda row: row['name'],
+            'category': lambda row: row['category'],
+            'subcategory': lambda row: row['subcategory_id'],
+            'subcategory_details': lambda row: self.subcategory_dict(subcategories.get(row['subcategory_id'])),
+            'price': lambda row: formatters.price(row['price']),
+            'description': lambda row: row['description'],
+            'short_description': lambda row: row['short_description'],
+            'meta_description': lambda row: row['meta_description'],
+            'image_url': lambda row: self.image_url(row['image']),
+            'image_srcset': lambda row: self.image_srcset(row['image_variants'], row['image']),
+            'additional_images': lambda row: [image_dict(image) for image in images.get(row['id'], ())],
+            'primary_image': lambda row: next(map(image_dict, images.get(row['id'], ())), None),
+            'rating': lambda row: formatters.rating(row['rating']),
+            'is_featured': lambda row: row['is_featured'],
+            'created_at': lambda row: formatters.datetime(row['created_at']),
+            'updated_at': lambda row: formatters.datetime(row['updated_at']),
+            'is_in_stock': lambda row: True,
+        }
+        chosen = [(name, builders[name]) for name in self.fieldset]
+        return [{name: build(row) for name, build in chosen} for row in rows]
+
+
+# FastProductSerializer for the ?images=primary listing mode
+class FastPrimaryImageSerializer(FastProductSerializer):
+    primary_image_only = True
+
+
+# Mixin for product views that can switch to FastProductSerializer
+# Set use_fast_serializer on a view, or PRODUCT_FAST_SERIALIZER in settings
+# to change the default for every view using the mixin
+# The fast serializer selects only the columns of the sparse fieldset, so it
+# builds on SparseFieldsetMixin (see fieldsets.py)
+class FastSerializerMixin(SparseFieldsetMixin):
+    use_fast_serializer = None
+
+    def fast_serializer_enabled(self):
+        if self.use_fast_serializer is not None:
+            return self.use_fast_serializer
+        return getattr(settings, 'PRODUCT_FAST_SERIALIZER', False)
+
+    def get_serializer_class(self):
+        primary_image_only = self.primary_image_only()
+        if self.fast_serializer_enabled():
+            return FastPrimaryImageSerializer if primary_image_only else FastProductSerializer
+        if primary_image_only:
+            return PrimaryImageProductSerializer
+        return self.serializer_class
+
+    def paginate_queryset(self, queryset):
+        # Paginate plain .values() rows so no model instances are built
+        if self.fast_serializer_enabled() and isinstance(queryset, QuerySet):
+            fieldset = self.get_fieldset()
+            columns = PRODUCT_COLUMNS if fieldset is None else columns_for(fieldset)
+            fields = columns + tuple(queryset.query.annotations)
+            # Keyset cursors are built from the sort values of the last row,
+            # which a sparse fieldset may not select; build() leaves them out
+            sort_fields = (field.lstrip('-') for field in KeysetPagination.get_ordering(queryset))
+            fields += tuple(field for field in sort_fields if field not in fields)
+            queryset = queryset.prefetch_related(None).values(*fields)
+        return super().paginate_queryset(queryset)
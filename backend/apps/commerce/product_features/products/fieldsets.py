@@ -0,0 +1,120 @@
+from rest_framework.exceptions import ValidationError
+
+from .serializers import PrimaryImageProductSerializer, ProductSerializer
+
+# Sparse fieldsets for product responses: ?fields=id,name,price or ?exclude=description
+#
+# The chosen fields decide everything a request loads: serializer fields are
+# dropped, the product query only selects the columns they are built from
+# (.only() / .values()), and the images and subcategory queries are skipped
+# when no chosen field shows them.
+
+# Product columns each response field is built from
+FIELD_COLUMNS = {
+    'id': (),
+    'name': ('name',),
+    'category': ('category',),
+    'subcategory': ('subcategory_id',),
+    'subcategory_details': ('subcategory_id',),
+    'price': ('price',),
+    'description': ('description',),
+    'short_description': ('short_description',),
+    'meta_description': ('meta_description',),
+    'image_url': ('image',),
+    'image_srcset': ('image', 'image_variants'),
+    'additional_images': (),
+    'primary_image': ('primary_image_id',),
+    'rating': ('rating',),
+    'is_featured': ('is_featured',),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+    'is_in_stock': (),
+}
+
+
+def split_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_fieldset(params, available):
+    """Response fields chosen by ?fields= and ?exclude=, in response order
+
+    None when neither parameter is given. id is always kept so clients can
+    tell products apart. Unknown names are a 400.
+    """
+    fields = params.get('fields')
+    exclude = params.get('exclude')
+    if fields is None and exclude is None:
+        return None
+
+    errors = {}
+    requested = split_names(fields) if fields is not None else list(available)
+    excluded = split_names(exclude) if exclude is not None else []
+    for param, names in (('fields', requested), ('exclude', excluded)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = [f"Unknown field: {name}" for name in unknown]
+    if errors:
+        raise ValidationError(errors)
+
+    chosen = (set(requested) - set(excluded)) | {'id'}
+    return tuple(name for name in available if name in chosen)
+
+
+def columns_for(fieldset):
+    """Product columns needed to build these fields, id first"""
+    columns = ['id']
+    for name in fieldset:
+        for column in FIELD_COLUMNS[name]:
+            if column not in columns:
+                columns.append(column)
+    return tuple(columns)
+
+
+# Mixin for product views answering ?fields= / ?exclude=
+#
+# The chosen fields are passed to the serializer (context['fieldset']),
+# decide which related rows for_listing() loads (listing_options()) and which
+# columns the product query selects (select_fieldset_columns()). ?images=primary
+# is read here too, since it changes which fields there are to choose from.
+# Works with ProductSerializer and FastProductSerializer alike.
+class SparseFieldsetMixin:
+    # Listing views set this to accept ?images=primary, which returns only
+    # each product's primary image instead of all of its images
+    allow_primary_image_only = False
+
+    def primary_image_only(self):
+        return self.allow_primary_image_only and self.request.query_params.get('images') == 'primary'
+
+    def get_fieldset(self):
+        """Fields chosen with ?fields= / ?exclude=, or None for all of them"""
+        if not hasattr(self, '_fieldset'):
+            serializer_class = PrimaryImageProductSerializer if self.primary_image_only() else ProductSerializer
+            self._fieldset = parse_fieldset(self.request.query_params, serializer_class.Meta.fields)
+        return self._fieldset
+
+    def listing_options(self):
+        """Arguments for Product.objects.for_listing(): only load what is shown"""
+        primary_image_only = self.primary_image_only()
+        fieldset = self.get_fieldset()
+        images_field = 'primary_image' if primary_image_only else 'additional_images'
+        return {
+            'primary_image_only': primary_image_only,
+            'images': fieldset is None or images_field in fieldset,
+            'subcategory': fieldset is None or 'subcategory_details' in fieldset,
+        }
+
+    def select_fieldset_columns(self, queryset):
+        """Only select the columns the chosen fields are built from"""
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            queryset = queryset.only(*columns_for(fieldset))
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+        return context
+
+    def filter_queryset(self, queryset):
+        return self.select_fieldset_columns(super().filter_queryset(queryset))
@@ -0,0 +1,58 @@
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+from .models import Product
+
+# Query string filters for product listings
+# The price range is shared by the listing views in views.py; the catalog
+# export applies all of ProductListView's filters without its filter backends,
+# with the same parameter names, accepted values and error messages.
+
+BOOLEAN_VALUES = {'true': True, '1': True, 'false': False, '0': False}
+
+
+class InvalidParameter(ValidationError):
+    """Raised for a query parameter that can't be applied, answered with a 400"""
+
+    def __init__(self, name, message):
+        super().__init__({name: [message]})
+        self.errors = {name: [message]}
+
+
+def parse_decimal(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise InvalidParameter(name, 'A valid number is required.')
+
+
+def filter_price_range(queryset, params):
+    """Apply ?min_price= and ?max_price=; a value that isn't a number is a 400"""
+    min_price = parse_decimal(params, 'min_price')
+    max_price = parse_decimal(params, 'max_price')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    return queryset
+
+
+def filter_products(queryset, params, filters=('category', 'is_featured', 'subcategory')):
+    """Apply the filters the sync listing views read from the query string"""
+    if 'category' in filters and params.get('category'):
+        if params['category'] not in Product.CategoryChoices.values:
+            raise InvalidParameter('category', 'Select a valid choice.')
+        queryset = queryset.filter(category=params['category'])
+    if 'is_featured' in filters and params.get('is_featured'):
+        value = BOOLEAN_VALUES.get(params['is_featured'].lower())
+        if value is not None:
+            queryset = queryset.filter(is_featured=value)
+    if 'subcategory' in filters and params.get('subcategory'):
+        if not params['subcategory'].isdigit():
+            raise InvalidParameter('subcategory', 'Select a valid choice.')
+        queryset = queryset.filter(subcategory_id=int(params['subcategory']))
+    return filter_price_range(queryset, params)
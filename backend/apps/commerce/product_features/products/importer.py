@@ -0,0 +1,268 @@
+import csv
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.validators import DecimalValidator, MaxLengthValidator
+from django.db import models
+from django.utils.text import get_valid_filename
+
+from apps.commerce.payment.payments.pricing import PriceResolver
+from apps.commerce.product_features.subcategories.models import Subcategory
+from .cache import invalidate
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+
+# Default catalog import configuration
+# Any key can be overridden through settings.PRODUCT_IMPORT
+DEFAULT_IMPORT_SETTINGS = {
+    # Rows upserted per INSERT ... ON CONFLICT statement
+    'BATCH_SIZE': 1000,
+    # Threads downloading and storing images
+    'IMAGE_WORKERS': 8,
+    # Seconds allowed for each image download
+    'IMAGE_TIMEOUT': 10,
+}
+
+
+def get_import_settings():
+    """Return the import configuration merged with the defaults"""
+    config = dict(DEFAULT_IMPORT_SETTINGS)
+    config.update(getattr(settings, 'PRODUCT_IMPORT', {}))
+    return config
+
+
+# Columns overwritten when a row's sku already exists
+# created_at and image_variants keep their stored values; image is only
+# overwritten for rows whose image was stored by this import
+UPDATE_FIELDS = [
+    'name', 'category', 'subcategory', 'price', 'description', 'short_description',
+    'meta_description', 'rating', 'is_featured', 'is_active', 'updated_at',
+]
+
+# Folder for imported images; names include a hash of the source, so
+# re-importing the same file skips downloads that are already stored
+IMAGE_FOLDER = 'products/import'
+
+TRUE_VALUES = {'true', '1', 'yes'}
+
+
+class ImportRowError(ValueError):
+    """A row that can't be turned into a product; the import skips it"""
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, row dict) pairs from a CSV or NDJSON stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+
+def parse_decimal(row, name, default):
+    value = row.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        raise ImportRowError(f'{name} is not a number: {value!r}')
+
+
+def parse_bool(row, name, default):
+    value = row.get(name)
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def check_column_limits(product):
+    """Reject values the database would refuse (max_length, max_digits)
+
+    On PostgreSQL one such value raises DataError for the whole batch, so
+    the row is skipped instead.
+    """
+    for field in product._meta.concrete_fields:
+        value = getattr(product, field.attname)
+        if value in (None, ''):
+            continue
+        try:
+            if isinstance(field, models.DecimalField):
+                DecimalValidator(field.max_digits, field.decimal_places)(value)
+            elif field.max_length and isinstance(value, str):
+                MaxLengthValidator(field.max_length)(value)
+        except ValidationError as e:
+            raise ImportRowError(f"{field.name}: {' '.join(e.messages)}")
+
+
+def image_name(sku, source):
+    """Storage name of an imported image, e.g. products/import/TV-100-3f2a9c1e.jpg"""
+    _, extension = os.path.splitext(urlsplit(source).path)
+    digest = hashlib.sha1(source.encode()).hexdigest()[:12]
+    return f"{IMAGE_FOLDER}/{get_valid_filename(sku)}-{digest}{extension.lower() or '.jpg'}"
+
+
+# Loads a catalog file into Product with batched upserts
+#
+# Rows are read lazily and handled BATCH_SIZE at a time: subcategory slugs
+# are resolved from a map loaded once, images are fetched in a thread pool,
+# and the batch is written with bulk_create(update_conflicts=True) keyed on
+# sku (one statement for rows with a new image, one for the rest).
+# bulk_create skips model signals, so the response cache and the cached
+# checkout prices are invalidated here once per batch, and image variants
+# are generated at the end by `manage.py generate_image_variants`.
+class ProductImporter:
+    def __init__(self, config=None, storage=None):
+        self.config = config or get_import_settings()
+        self.storage = storage or default_storage
+        self.subcategories = dict(Subcategory.objects.values_list('slug', 'id'))
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.config['IMAGE_WORKERS'])
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.imported = 0
+        self.images = 0
+        self.errors = []
+
+    def build(self, row):
+        if not isinstance(row, dict):
+            raise ImportRowError('not a JSON object')
+        sku = (row.get('sku') or '').strip()
+        name = (row.get('name') or '').strip()
+        if not sku or not name:
+            raise ImportRowError('sku and name are required')
+        category = row.get('category') or Product.CategoryChoices.ELECTRONICS
+        if category not in Product.CategoryChoices.values:
+            raise ImportRowError(f'unknown category {category!r}')
+        subcategory_id = None
+        if row.get('subcategory'):
+            subcategory_id = self.subcategories.get(row['subcategory'])
+            if subcategory_id is None:
+                raise ImportRowError(f"unknown subcategory {row['subcategory']!r}")
+        product = Product(
+            sku=sku,
+            name=name,
+            category=category,
+            subcategory_id=subcategory_id,
+            price=parse_decimal(row, 'price', Decimal('0.00')),
+            description=row.get('description') or '',
+            short_description=row.get('short_description') or '',
+            meta_description=row.get('meta_description') or '',
+            rating=parse_decimal(row, 'rating', Decimal('0')),
+            is_featured=parse_bool(row, 'is_featured', False),
+            is_active=parse_bool(row, 'is_active', True),
+        )
+        check_column_limits(product)
+        return product
+
+    def fetch_image(self, sku, source):
+        """Store the image at source (URL or local path); returns its name or None"""
+        name = image_name(sku, source)
+        if self.storage.exists(name):
+            return name
+        try:
+            if urlsplit(source).scheme in ('http', 'https'):
+                response = self.session.get(source, timeout=self.config['IMAGE_TIMEOUT'])
+                response.raise_for_status()
+                content = response.content
+            else:
+                with open(source, 'rb') as image_file:
+                    content = image_file.read()
+            saved = self.storage.save(name, ContentFile(content))
+        except (requests.RequestException, OSError) as e:
+            logger.warning('Could not import image %s for %s: %s', source, sku, e)
+            return None
+        self.images += 1
+        return saved
+
+    def import_batch(self, numbered_rows, executor):
+        products = {}
+        sources = {}
+        for number, row in numbered_rows:
+            try:
+                product = self.build(row)
+            except ImportRowError as e:
+                self.errors.append((number, str(e)))
+                continue
+            # A later row for the same sku replaces an earlier one
+            products[product.sku] = product
+            sources.pop(product.sku, None)
+            if row.get('image'):
+                sources[product.sku] = row['image']
+        if not products:
+            return
+
+        names = executor.map(lambda sku: self.fetch_image(sku, sources[sku]), list(sources))
+        with_image = []
+        for sku, name in zip(list(sources), names):
+            # A row without an image, or whose download failed, keeps the stored one
+            if name:
+                products[sku].image = name
+                with_image.append(products.pop(sku))
+
+        # Products moving out of a subcategory change its product count too
+        batch = [*products.values(), *with_image]
+        skus = [product.sku for product in batch]
+        previous_subcategories = set(
+            Product.objects.filter(sku__in=skus).values_list('subcategory_id', flat=True)
+        )
+        # One upsert for the rows with a new image, one for the rest
+        groups = (
+            (list(products.values()), UPDATE_FIELDS),
+            (with_image, UPDATE_FIELDS + ['image']),
+        )
+        for group, update_fields in groups:
+            if group:
+                Product.objects.bulk_create(
+                    group,
+                    update_conflicts=True,
+                    unique_fields=['sku'],
+                    update_fields=update_fields,
+                )
+        product_ids = list(Product.objects.filter(sku__in=skus).values_list('id', flat=True))
+        subcategory_ids = previous_subcategories | {product.subcategory_id for product in batch}
+        invalidate(
+            'products',
+            'subcategories',
+            *(f'product:{product_id}' for product_id in product_ids),
+            *(f'subcategory:{subcategory_id}' for subcategory_id in subcategory_ids if subcategory_id),
+        )
+        # Imported prices and is_active flags apply to the next checkout
+        PriceResolver().invalidate_many(product_ids)
+        self.imported += len(batch)
+
+    def run(self, numbered_rows, progress=None):
+        """Import every row; progress(imported, elapsed) is called after each batch"""
+        start = time.perf_counter()
+        batch_size = self.config['BATCH_SIZE']
+        with ThreadPoolExecutor(max_workers=self.config['IMAGE_WORKERS'], thread_name_prefix='product-import') as executor:
+            while True:
+                batch = list(islice(numbered_rows, batch_size))
+                if not batch:
+                    break
+                self.import_batch(batch, executor)
+                if progress:
+                    progress(self.imported, time.perf_counter() - start)
+        return time.perf_counter() - start
@@ -0,0 +1,122 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from apps.commerce.product_features.products.models import Product
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / elapsed, statistics.median(latencies) * 1000, p99 * 1000
+
+
+# Load test of the sync catalog views against their async versions at a fixed concurrency
+#
+# In-process (default): the WSGI handler driven by a thread pool against the
+# ASGI handler driven by asyncio, both on the current database.
+#
+# Against real servers, e.g.
+#   gunicorn backend.wsgi -w 4 -b :8000
+#   uvicorn backend.asgi:application --workers 4 --port 8001
+#   python manage.py benchmark_async_views --sync-url http://127.0.0.1:8000 --async-url http://127.0.0.1:8001
+class Command(BaseCommand):
+    help = 'Compare throughput and p99 latency of the sync and async product endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at any time')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and mode')
+        parser.add_argument('--sync-url', help='Base URL of a WSGI server (e.g. gunicorn)')
+        parser.add_argument('--async-url', help='Base URL of an ASGI server (e.g. uvicorn)')
+
+    def handle(self, *args, **options):
+        product_id = Product.objects.order_by('id').values_list('id', flat=True).first()
+        if product_id is None:
+            raise CommandError('The catalog is empty; add products first')
+
+        endpoints = [
+            ('list', 'product-list', 'async-product-list', {}, ''),
+            ('detail', 'product-detail', 'async-product-detail', {'pk': product_id}, ''),
+            ('featured', 'featured-products', 'async-featured-products', {}, ''),
+            ('search', 'product-search', 'async-product-search', {}, '?q=product'),
+        ]
+        external = options['sync_url'] or options['async_url']
+        if external and not (options['sync_url'] and options['async_url']):
+            raise CommandError('Pass both --sync-url and --async-url')
+
+        concurrency, count = options['concurrency'], options['requests']
+        self.stdout.write(f'{count} requests per endpoint, concurrency {concurrency}')
+        paths = [
+            (label, reverse(sync_name, kwargs=kwargs) + query, reverse(async_name, kwargs=kwargs) + query)
+            for label, sync_name, async_name, kwargs, query in endpoints
+        ]
+        # Every request does its full work, as under real traffic with a cold cache
+        # The in-process clients send Host: testserver, which the test runner allows too
+        testing_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(PRODUCT_CACHE={'ENABLED': False}, ALLOWED_HOSTS=testing_hosts):
+            if external:
+                sync_results = [self.run_http(options['sync_url'] + path, concurrency, count) for _, path, _ in paths]
+                async_results = [self.run_http(options['async_url'] + path, concurrency, count) for _, _, path in paths]
+            else:
+                sync_results = [self.run_wsgi(path, concurrency, count) for _, path, _ in paths]
+                # One event loop for every async run
+                async_results = asyncio.run(self.run_asgi_all([path for _, _, path in paths], concurrency, count))
+
+        for (label, _, _), sync_result, async_result in zip(paths, sync_results, async_results):
+            self.report(label, 'sync', sync_result)
+            self.report(label, 'async', async_result)
+
+    def report(self, label, mode, result):
+        throughput, p50, p99 = result
+        self.stdout.write(f'  {label:8} {mode:5}: {throughput:8.1f} req/s  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms')
+
+    def run_threads(self, send, concurrency, count):
+        def timed(_):
+            start = time.perf_counter()
+            status = send()
+            if status != 200:
+                raise CommandError(f'Unexpected status {status}')
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed, range(count)))
+        return summarize(latencies, time.perf_counter() - start)
+
+    def run_wsgi(self, path, concurrency, count):
+        # secure=True because settings force an HTTPS redirect
+        client = Client()
+        return self.run_threads(lambda: client.get(path, secure=True).status_code, concurrency, count)
+
+    def run_http(self, url, concurrency, count):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return self.run_threads(lambda: session.get(url, timeout=30).status_code, concurrency, count)
+
+    async def run_asgi_all(self, paths, concurrency, count):
+        return [await self.run_asgi(path, concurrency, count) for path in paths]
+
+    async def run_asgi(self, path, concurrency, count):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path, secure=True)
+                if response.status_code != 200:
+                    raise CommandError(f'Unexpected status {response.status_code}')
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(timed() for _ in range(count)))
+        return summarize(latencies, time.perf_counter() - start)
@@ -0,0 +1,63 @@
+import contextlib
+import logging
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from apps.commerce.product_features.products.diagnostics import get_logger
+from apps.commerce.product_features.products.models import Product
+
+LOGGER_NAME = 'apps.commerce.product_features.products.benchmark'
+
+
+# Per-row cost of the serializer diagnostics
+# Compares the print() calls the serializers used to make with DiagnosticsLogger
+# Example: python manage.py benchmark_product_diagnostics --rows 100000
+class Command(BaseCommand):
+    help = 'Benchmark per-row diagnostics overhead in the product serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='Rows to simulate per scenario')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        product = Product(id=1, name='Benchmark', image='products/2025/01/benchmark.jpg')
+        request = RequestFactory().get('/api/products/', HTTP_HOST='localhost')
+        url = request.build_absolute_uri(product.image.url)
+
+        # Old behaviour: print with a filesystem path lookup for every row
+        # stdout goes to /dev/null so only the call overhead is measured
+        def legacy_print():
+            print(f"Image URL details: path={product.image.path}, url={product.image.url}, absolute={url}")
+
+        diagnostics = get_logger(LOGGER_NAME)
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.propagate = False
+        logger.addHandler(logging.NullHandler())
+
+        def structured():
+            diagnostics.debug('product.image_url', product_id=product.id, name=product.image.name, url=url)
+
+        results = []
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            results.append(('print() + image.path (before)', self.time_rows(rows, legacy_print)))
+
+        logger.setLevel(logging.WARNING)
+        results.append(('diagnostics, debug disabled', self.time_rows(rows, structured)))
+
+        logger.setLevel(logging.DEBUG)
+        with override_settings(PRODUCT_DIAGNOSTICS={'SAMPLE_RATES': {LOGGER_NAME: 0.01}}):
+            results.append(('diagnostics, debug sampled at 1%', self.time_rows(rows, structured)))
+        results.append(('diagnostics, debug every row', self.time_rows(rows, structured)))
+
+        self.stdout.write(f'{rows} rows per scenario')
+        for label, microseconds in results:
+            self.stdout.write(f'  {label:<34} {microseconds:8.3f} us/row')
+
+    def time_rows(self, rows, emit):
+        start = time.perf_counter()
+        for _ in range(rows):
+            emit()
+        return (time.perf_counter() - start) / rows * 1_000_000
@@ -0,0 +1,83 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from apps.commerce.product_features.products.fast_serializers import FastProductSerializer
+from apps.commerce.product_features.products.models import Product, ProductImage
+from apps.commerce.product_features.products.serializers import ProductSerializer
+from apps.commerce.product_features.subcategories.models import Subcategory
+
+
+class Rollback(Exception):
+    """Raised to undo the synthetic rows created for the benchmark"""
+
+
+# Compares ProductSerializer with FastProductSerializer on one page of products
+# Example: python manage.py benchmark_product_serializers --products 100 --rounds 50
+class Command(BaseCommand):
+    help = 'Benchmark ProductSerializer against FastProductSerializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100, help='Products per page')
+        parser.add_argument('--images', type=int, default=3, help='Additional images per product')
+        parser.add_argument('--rounds', type=int, default=50, help='Timed rounds per serializer')
+
+    def handle(self, *args, **options):
+        # Synthetic rows are created inside a transaction that is always rolled back
+        try:
+            with transaction.atomic():
+                self.seed(options['products'], options['images'])
+                self.run(options['products'], options['rounds'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count, images_per_product):
+        subcategory = Subcategory.objects.create(
+            name='Benchmark', slug='benchmark-serializers', category='ELEC'
+        )
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Benchmark product {i}',
+                subcategory=subcategory,
+                price=Decimal('19.99'),
+                description='Synthetic product used by the serializer benchmark',
+                image=f'products/benchmark/{i}.jpg',
+            )
+            for i in range(count)
+        ])
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'products/additional/benchmark/{product.pk}-{n}.jpg')
+            for product in products
+            for n in range(images_per_product)
+        ])
+
+    def time_rounds(self, rounds, serialize):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            serialize()
+        return (time.perf_counter() - start) / rounds * 1000
+
+    def run(self, count, rounds):
+        context = {'request': RequestFactory().get('/api/products/', HTTP_HOST='localhost')}
+        queryset = Product.objects.for_listing().filter(name__startswith='Benchmark product')[:count]
+
+        def drf():
+            return ProductSerializer(list(queryset.all()), many=True, context=context).data
+
+        def fast():
+            return FastProductSerializer(queryset.all(), many=True, context=context).data
+
+        if drf() != fast():
+            self.stderr.write(self.style.ERROR('Serializer outputs differ'))
+            return
+
+        drf_ms = self.time_rounds(rounds, drf)
+        fast_ms = self.time_rounds(rounds, fast)
+        self.stdout.write(f'{count} products, {rounds} rounds (fetch + serialize per round)')
+        self.stdout.write(f'  ProductSerializer:     {drf_ms:8.2f} ms')
+        self.stdout.write(f'  FastProductSerializer: {fast_ms:8.2f} ms')
+        self.stdout.write(self.style.SUCCESS(f'  Speedup: {drf_ms / fast_ms:.1f}x'))
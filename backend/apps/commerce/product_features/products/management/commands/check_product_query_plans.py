@@ -0,0 +1,146 @@
+import json
+import re
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+
+from apps.commerce.product_features.products.models import Product
+from apps.commerce.product_features.products.sampling import FeaturedProductSampler
+from apps.commerce.product_features.subcategories.models import Subcategory
+
+# SQLite plan lines for a full table scan, e.g. "SCAN products_product"
+# Index scans read "SCAN products_product USING INDEX ..." or "SEARCH ..."
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (TABLE )?products_product\b(?!.*\bUSING\b)')
+
+# A COUNT(*) reads every matching row whatever the indexes (?count=estimated avoids it)
+COUNT_QUERY = re.compile(r'^SELECT COUNT\(\*\)')
+
+
+class Rollback(Exception):
+    """Raised to undo the synthetic rows created for the check"""
+
+
+def postgres_seq_scans(plan):
+    """Yield every sequential scan on products_product in an EXPLAIN (FORMAT JSON) plan"""
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') == Product._meta.db_table:
+        yield f"Seq Scan on {plan['Relation Name']}"
+    for child in plan.get('Plans', []):
+        yield from postgres_seq_scans(child)
+
+
+def find_seq_scans(sql):
+    """Plan lines showing a full scan of products_product for one SQL statement"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return list(postgres_seq_scans(plan[0]['Plan']))
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall() if SQLITE_FULL_SCAN.match(row[-1])]
+
+
+# Runs every product endpoint against a large synthetic catalog and EXPLAINs
+# the SQL it generates. Fails when a query scans the whole products table.
+# Example: python manage.py check_product_query_plans --products 20000
+class Command(BaseCommand):
+    help = 'Fail if a product endpoint query falls back to a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=20000, help='Synthetic products to create')
+        parser.add_argument('--subcategories', type=int, default=200, help='Synthetic subcategories to create')
+
+    def handle(self, *args, **options):
+        # Synthetic rows are created inside a transaction that is always rolled back
+        failures = []
+        try:
+            with transaction.atomic():
+                self.seed(options['products'], options['subcategories'])
+                failures = self.check_endpoints()
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError(f"Sequential scans in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('No sequential scans on products_product'))
+
+    def seed(self, count, subcategory_count):
+        subcategories = Subcategory.objects.bulk_create([
+            Subcategory(name=f'Plan check {i}', slug=f'plan-check-{i}', category='ELEC')
+            for i in range(subcategory_count)
+        ])
+        Product.objects.bulk_create([
+            Product(
+                name=f'Plan check product {i}',
+                category='FOOD' if i % 10 == 0 else 'ELEC',
+                subcategory=subcategories[i % subcategory_count],
+                price=Decimal(i % 1000) + Decimal('0.99'),
+                rating=Decimal(i % 500) / 100,
+                is_featured=i % 50 == 0,
+                is_active=i % 20 != 0,
+                description=f'Synthetic product for the query plan check token{i}',
+            )
+            for i in range(count)
+        ], batch_size=1000)
+
+        # Fresh statistics so the planner sees the real table size
+        with connection.cursor() as cursor:
+            for model in (Product, Subcategory):
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+        self.subcategory = subcategories[0]
+        self.product = Product.objects.filter(subcategory=self.subcategory).first()
+
+    def get_endpoints(self):
+        """(label, url, query params) for each query shape the views produce"""
+        products = reverse('product-list')
+        category = reverse('products-by-category', kwargs={'category': 'ELEC'})
+        return [
+            ('list', products, {}),
+            ('list by price', products, {'ordering': 'price'}),
+            ('list by rating', products, {'ordering': '-rating'}),
+            ('list by category', products, {'category': 'FOOD'}),
+            ('list by subcategory', products, {'subcategory': self.subcategory.pk}),
+            ('list featured', products, {'is_featured': 'true'}),
+            ('list price range', products, {'min_price': '10', 'max_price': '20'}),
+            ('list keyset', products, {'pagination': 'cursor'}),
+            ('category', category, {}),
+            ('category price range', category, {'min_price': '10', 'max_price': '20', 'ordering': 'price'}),
+            ('category by slug', category, {'slug': self.subcategory.slug}),
+            ('search', reverse('product-search'), {'q': 'token42'}),
+            ('detail', reverse('product-detail', kwargs={'pk': self.product.pk}), {}),
+            ('featured', reverse('featured-products'), {}),
+        ]
+
+    def check_endpoints(self):
+        failures = []
+        factory = RequestFactory()
+        # Every request has to reach the database
+        with override_settings(PRODUCT_CACHE={'ENABLED': False}):
+            for label, url, params in self.get_endpoints():
+                cache.delete(FeaturedProductSampler.POOL_CACHE_KEY)
+                match = resolve(url)
+                request = factory.get(url, params, HTTP_HOST='localhost')
+                with CaptureQueriesContext(connection) as queries:
+                    match.func(request, *match.args, **match.kwargs).render()
+
+                scans = []
+                for query in queries.captured_queries:
+                    sql = query['sql']
+                    if Product._meta.db_table not in sql or COUNT_QUERY.match(sql):
+                        continue
+                    scans.extend(find_seq_scans(sql))
+
+                if scans:
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f'  {label}: {"; ".join(scans)}'))
+                else:
+                    self.stdout.write(f'  {label}: ok')
+        return failures
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.commerce.product_features.products.export import FORMATS, iter_export
+from apps.commerce.product_features.products.models import Product
+
+
+# Writes the whole catalog as NDJSON (one product per line) or a JSON array,
+# in the same shape as the API, without holding the catalog in memory
+# Image URLs are absolute when MEDIA_CDN_URL or a remote storage is configured
+# Example: python manage.py export_products --output feed.ndjson --category ELEC
+class Command(BaseCommand):
+    help = 'Stream the product catalog to a file or stdout'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='File to write (default: stdout)')
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per query')
+        parser.add_argument('--category', choices=Product.CategoryChoices.values)
+        parser.add_argument('--featured', action='store_true', help='Only featured products')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] is not None and options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        queryset = Product.objects.all()
+        if options['category']:
+            queryset = queryset.filter(category=options['category'])
+        if options['featured']:
+            queryset = queryset.filter(is_featured=True)
+
+        pieces = iter_export(queryset, options['format'], options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                for piece in pieces:
+                    stream.write(piece)
+            self.stderr.write(self.style.SUCCESS(f"Exported {queryset.count()} products to {options['output']}"))
+        else:
+            for piece in pieces:
+                self.stdout.write(piece, ending='')
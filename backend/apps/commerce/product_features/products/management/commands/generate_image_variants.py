@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from apps.commerce.product_features.products.models import Product, ProductImage
+from apps.commerce.product_features.products.variants import (
+    get_variant_settings, has_variants, run_in_worker,
+)
+
+
+# Creates the resized variants of images uploaded before the variant pipeline,
+# or after changing PRODUCT_IMAGE_VARIANTS (with --force)
+# Example: python manage.py generate_image_variants --workers 4
+class Command(BaseCommand):
+    help = 'Generate missing WebP/JPEG variants for product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Images resized at the same time')
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or get_variant_settings()['MAX_WORKERS']
+        jobs = []
+        for model, product_field in ((Product, 'id'), (ProductImage, 'product_id')):
+            rows = model.objects.exclude(image='').exclude(image__isnull=True).values_list(
+                'id', 'image', 'image_variants', product_field
+            )
+            for pk, name, variants, product_id in rows.iterator():
+                if options['force'] or not has_variants(variants, name):
+                    jobs.append((model._meta.label, pk, name, product_id))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda job: run_in_worker(*job), jobs))
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {len(jobs)} images'))
@@ -0,0 +1,58 @@
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.commerce.product_features.products.importer import (
+    ProductImporter, get_import_settings, read_rows,
+)
+from apps.commerce.product_features.products.variants import get_variant_settings
+
+
+# Creates or updates products from a CSV or NDJSON catalog file
+#
+# Columns: sku, name (required), category, subcategory (slug), price,
+# description, short_description, meta_description, rating, is_featured,
+# is_active, image (URL or local path). Rows are matched to products by sku.
+# Example: python manage.py import_products catalog.ndjson --batch-size 5000 --image-workers 16
+class Command(BaseCommand):
+    help = 'Upsert products from a CSV or NDJSON file in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Catalog file (.csv, .ndjson or .jsonl)')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, help='Rows upserted per statement')
+        parser.add_argument('--image-workers', type=int, help='Images downloaded at the same time')
+        parser.add_argument('--skip-variants', action='store_true', help="Don't resize imported images afterwards")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('csv' if options['path'].lower().endswith('.csv') else 'ndjson')
+        if not os.path.exists(options['path']):
+            raise CommandError(f"No such file: {options['path']}")
+
+        config = get_import_settings()
+        if options['batch_size']:
+            config['BATCH_SIZE'] = options['batch_size']
+        if options['image_workers']:
+            config['IMAGE_WORKERS'] = options['image_workers']
+
+        importer = ProductImporter(config)
+        with open(options['path'], newline='', encoding='utf-8') as stream:
+            elapsed = importer.run(read_rows(stream, fmt), progress=self.progress)
+
+        for number, error in importer.errors[:20]:
+            self.stderr.write(f'  line {number}: {error}')
+        if len(importer.errors) > 20:
+            self.stderr.write(f'  ... and {len(importer.errors) - 20} more')
+
+        rate = importer.imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.imported} products and {importer.images} images in {elapsed:.1f}s '
+            f'({rate:.0f} rows/s), skipped {len(importer.errors)} rows'
+        ))
+
+        if importer.images and not options['skip_variants'] and get_variant_settings()['ENABLED']:
+            call_command('generate_image_variants', stdout=self.stdout, stderr=self.stderr)
+
+    def progress(self, imported, elapsed):
+        self.stdout.write(f'  {imported} rows, {imported / max(elapsed, 1e-6):.0f} rows/s')
@@ -0,0 +1,41 @@
+from django.db import models
+from django.db.models import Prefetch
+
+
+# Custom QuerySet for products
+# Every API endpoint that returns products goes through these methods so that
+# the related rows ProductSerializer needs are loaded in a fixed number of queries
+class ProductQuerySet(models.QuerySet):
+
+    def for_listing(self, primary_image_only=False, images=True, subcategory=True):
+        """Products with their subcategory and images loaded up front
+
+        primary_image_only joins the primary image instead of prefetching
+        every image, for the ?images=primary listing mode. images and
+        subcategory turn off loads a sparse fieldset doesn't need.
+        """
+        # Imported here because the subcategories app imports the Product model
+        from apps.commerce.product_features.subcategories.models import Subcategory
+
+        # search_vector is only used inside SQL, so it is never loaded
+        queryset = self.defer('search_vector')
+        if subcategory:
+            queryset = queryset.prefetch_related(
+                # One query for all subcategories on the page, with the active
+                # product count already computed for SubcategorySerializer
+                Prefetch(
+                    'subcategory',
+                    queryset=Subcategory.objects.with_products_count()
+                )
+            )
+        if not images:
+            return queryset
+        if primary_image_only:
+            # Same query as the products, through Product.primary_image
+            return queryset.select_related('primary_image')
+        # One query for all additional images on the page
+        return queryset.prefetch_related('images')
+
+
+# Manager built from the QuerySet so the methods are available on Product.objects
+ProductManager = models.Manager.from_queryset(ProductQuerySet)
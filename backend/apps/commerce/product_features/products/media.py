@@ -0,0 +1,90 @@
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.encoding import filepath_to_uri
+
+# Media URL resolver
+#
+# storage.url() and request.build_absolute_uri() were called for every image
+# of every product. Both do the same work each time: the storage rebuilds its
+# prefix (S3 goes through boto3) and the request re-reads scheme and host.
+#
+# The resolver works out the URL prefix once: per process for the storage
+# (or settings.MEDIA_CDN_URL when a CDN origin is configured), and per request
+# for the scheme and host. File names are then joined with concatenation.
+#
+# Works with FileSystemStorage and django-storages' S3 storage. Storages whose
+# URLs are not "prefix + name", such as signed S3 URLs (AWS_QUERYSTRING_AUTH),
+# keep calling storage.url() for each file.
+
+# File name used to find the prefix a storage puts in front of every name
+PROBE_NAME = 'media-url-probe.jpg'
+
+# Storage prefixes, computed once per process
+_storage_bases = {}
+
+
+@receiver(setting_changed)
+def reset_storage_bases(**kwargs):
+    # Tests override MEDIA_URL and the AWS settings
+    _storage_bases.clear()
+
+
+def get_storage_base(storage):
+    """URL prefix of a storage, or None when URLs are not prefix + name"""
+    cdn_url = getattr(settings, 'MEDIA_CDN_URL', None)
+    if cdn_url:
+        return cdn_url.rstrip('/') + '/'
+
+    key = id(storage)
+    if key not in _storage_bases:
+        probe_url = storage.url(PROBE_NAME)
+        base = None
+        if probe_url.endswith(PROBE_NAME):
+            base = probe_url[:-len(PROBE_NAME)]
+        _storage_bases[key] = base
+    return _storage_bases[key]
+
+
+def is_absolute(url):
+    return bool(urlsplit(url).scheme)
+
+
+class MediaURLResolver:
+    def __init__(self, request=None, storage=None):
+        self.request = request
+        self.storage = storage or default_storage
+        self.base = get_storage_base(self.storage)
+
+        # Absolute prefix, built once for the whole request
+        self.absolute_base = None
+        if self.base is not None:
+            if request is not None:
+                self.absolute_base = request.build_absolute_uri(self.base)
+            elif is_absolute(self.base):
+                self.absolute_base = self.base
+
+    def url(self, name):
+        """URL of a stored file: absolute when possible, else relative to the site"""
+        if not name:
+            return None
+        if self.base is None:
+            url = self.storage.url(name)
+            if self.request is not None:
+                return self.request.build_absolute_uri(url)
+            return url
+        path = filepath_to_uri(name).lstrip('/')
+        if self.absolute_base is not None:
+            return self.absolute_base + path
+        return self.base + path
+
+
+def get_media_resolver(context):
+    """Resolver shared by every serializer that uses the same context"""
+    resolver = context.get('media_resolver')
+    if resolver is None:
+        resolver = context['media_resolver'] = MediaURLResolver(context.get('request'))
+    return resolver
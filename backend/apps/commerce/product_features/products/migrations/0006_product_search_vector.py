@@ -0,0 +1,67 @@
+# Generated by Django 4.2.17 on 2026-10-17 07:26
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# PostgreSQL only: keep search_vector current with a trigger and index it with GIN
+# Other databases skip these steps (SQLite uses an FTS5 table, see products/search.py)
+POSTGRES_FORWARD_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION products_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.short_description, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER products_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, short_description, description ON products_product
+    FOR EACH ROW EXECUTE PROCEDURE products_product_search_vector_update()
+    """,
+    # Fill the column for products that already exist
+    """
+    UPDATE products_product SET search_vector =
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(short_description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    """,
+    "CREATE INDEX products_product_search_vector_gin ON products_product USING gin (search_vector)",
+]
+
+POSTGRES_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS products_product_search_vector_gin",
+    "DROP TRIGGER IF EXISTS products_product_search_vector_trigger ON products_product",
+    "DROP FUNCTION IF EXISTS products_product_search_vector_update()",
+]
+
+
+def run_postgres_sql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(
+            run_postgres_sql(POSTGRES_FORWARD_SQL),
+            run_postgres_sql(POSTGRES_REVERSE_SQL),
+        ),
+    ]
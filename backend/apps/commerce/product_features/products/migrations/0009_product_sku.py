@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-17 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, help_text='Unique product code used by catalog imports', max_length=64, null=True, unique=True),
+        ),
+    ]
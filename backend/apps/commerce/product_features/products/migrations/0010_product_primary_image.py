@@ -0,0 +1,40 @@
+# Generated by Django 4.2.17 on 2026-10-17 08:11
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_primary_images(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductImage = apps.get_model('products', 'ProductImage')
+    # Keep the newest primary image where a product has several
+    newest = ProductImage.objects.filter(is_primary=True).values('product').annotate(newest=Max('id')).values('newest')
+    ProductImage.objects.filter(is_primary=True).exclude(id__in=Subquery(newest)).update(is_primary=False)
+    Product.objects.update(primary_image=Subquery(
+        ProductImage.objects.filter(product=OuterRef('pk'), is_primary=True).values('id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_sku'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='productimage',
+            options={'ordering': ['-is_primary', 'id'], 'verbose_name': 'Product Image', 'verbose_name_plural': 'Product Images'},
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productimage'),
+        ),
+        migrations.RunPython(fill_primary_images, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('product',), name='productimage_one_primary'),
+        ),
+    ]
@@ -3,9 +3,11 @@ from django.core.validators import (
     MinLengthValidator, MaxLengthValidator,
     FileExtensionValidator, MinValueValidator, MaxValueValidator
 )
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from decimal import Decimal
+from .managers import ProductManager
 
 class Product(models.Model):
     # Define choices for product categories using Django's TextChoices
@@ -23,6 +25,16 @@ class Product(models.Model):
             MaxLengthValidator(100, "Product name is too long")
         ]
     )
+
+    # Stock keeping unit from the catalog feed; `manage.py import_products`
+    # matches rows to products by it. Products added in the admin may have none.
+    sku = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Unique product code used by catalog imports"
+    )
     is_active = models.BooleanField(
         default=True,
         help_text="Whether this product is active and should be displayed"
@@ -102,6 +114,21 @@ class Product(models.Model):
         help_text="Upload product image (max 5MB, formats: jpg, png, webp)"
     )
 
+    # Resized WebP/JPEG copies of image, written by the variants worker (see variants.py)
+    # e.g. {"source": "products/2025/01/tv.jpg", "widths": [320, 640], "formats": ["webp", "jpeg"]}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    # The ProductImage marked is_primary, kept in step by ProductImage.save()
+    # Lets listings load one image per product instead of all of them
+    primary_image = models.ForeignKey(
+        'ProductImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+
     # Product metrics
     rating = models.DecimalField(
         max_digits=3,
@@ -116,10 +143,17 @@ class Product(models.Model):
     # Boolean flag for featured products
     is_featured = models.BooleanField(default=False)
     
+    # Full-text search document built from name and descriptions
+    # Filled in by a database trigger on PostgreSQL (see products/search.py)
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+
     # Automatic timestamps
     created_at = models.DateTimeField(auto_now_add=True)  # Set on creation
     updated_at = models.DateTimeField(auto_now=True)      # Updated on save
 
+    # Custom manager that adds listing helpers like Product.objects.for_listing()
+    objects = ProductManager()
+
     # Custom validation method
     def clean(self):
         # Prevent description from being identical to name
@@ -143,6 +177,26 @@ class Product(models.Model):
         ordering = ['-created_at']  # Newest first
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
+        # Indexes matched to the listing queries (check with manage.py check_product_query_plans)
+        indexes = [
+            # Default listing order, including the id tie-breaker of keyset pages
+            models.Index(fields=['-created_at', '-id'], name='product_created_idx'),
+            # Category pages and ?category=, newest first
+            models.Index(fields=['category', '-created_at'], name='product_cat_created_idx'),
+            # Category pages with price ranges or ?ordering=price
+            models.Index(fields=['category', 'price'], name='product_cat_price_idx'),
+            # ?subcategory= and ?slug=, newest first
+            models.Index(fields=['subcategory', '-created_at'], name='product_sub_created_idx'),
+            # Featured pool, best rated first (see sampling.py)
+            models.Index(fields=['is_featured', '-rating'], name='product_featured_rating_idx'),
+            # ?ordering=price / rating across the whole catalog
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['rating'], name='product_rating_idx'),
+            # Active product counts per subcategory (Subcategory.objects.with_products_count())
+            models.Index(
+                fields=['subcategory'], condition=models.Q(is_active=True), name='product_active_sub_idx'
+            ),
+        ]
 
 # Related model for product images
 class ProductImage(models.Model):
@@ -156,6 +210,9 @@ class ProductImage(models.Model):
         upload_to='products/additional/%Y/%m/',
         verbose_name='Image'
     )
+
+    # Resized copies of image, same format as Product.image_variants
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     is_primary = models.BooleanField(
         default=False,
@@ -171,18 +228,35 @@ class ProductImage(models.Model):
     )
 
     class Meta:
-        ordering = ['is_primary']
+        # Primary image first, then in upload order
+        ordering = ['-is_primary', 'id']
         verbose_name = 'Product Image'
         verbose_name_plural = 'Product Images'
+        constraints = [
+            # At most one primary image per product
+            models.UniqueConstraint(
+                fields=['product'], condition=models.Q(is_primary=True), name='productimage_one_primary'
+            ),
+        ]
 
     def __str__(self):
         return f"Image for {self.product.name} ({'Primary' if self.is_primary else 'Secondary'})"
 
     def save(self, *args, **kwargs):
-        # If this is marked as primary, ensure no other image is primary
-        if self.is_primary:
-            ProductImage.objects.filter(
-                product=self.product, 
-                is_primary=True
-            ).exclude(id=self.id).update(is_primary=False)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        # The flag and Product.primary_image change together or not at all
+        with transaction.atomic():
+            # If this is marked as primary, ensure no other image is primary
+            # (before saving, so the one-primary constraint is never broken)
+            if self.is_primary:
+                ProductImage.objects.filter(
+                    product_id=self.product_id,
+                    is_primary=True
+                ).exclude(id=self.id).update(is_primary=False)
+            super().save(*args, **kwargs)
+
+            # update() skips Product's signals; the ProductImage post_save
+            # receiver already invalidates the product's cached responses
+            if self.is_primary:
+                Product.objects.filter(pk=self.product_id).update(primary_image=self)
+            else:
+                Product.objects.filter(pk=self.product_id, primary_image=self).update(primary_image=None)
\ No newline at end of file
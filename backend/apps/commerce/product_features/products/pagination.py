@@ -1,6 +1,242 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset, threshold=1000):
+    """Row count read from the query planner instead of COUNT(*)
+
+    Only PostgreSQL exposes a usable estimate. Small estimates are not
+    trusted and fall back to an exact count, which is cheap at that size.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]['Plan']['Plan Rows'])
+    if estimate < threshold:
+        return queryset.count()
+    return estimate
+
+
+# Django paginator whose count comes from the planner estimate
+# Page numbers near the end of the listing are approximate in this mode
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10  # Number of items per page
     page_size_query_param = 'page_size'  # Allows client to override page size
-    max_page_size = 100  # Maximum number of items in a page
\ No newline at end of file
+    max_page_size = 100  # Maximum number of items in a page
+
+
+# Same page-number pagination, but the total count is estimated
+class EstimatedCountPagination(StandardResultsSetPagination):
+    django_paginator_class = EstimatedCountPaginator
+
+
+# Keyset (cursor) pagination
+# Instead of OFFSET, each page continues from the sort values of the last row
+# of the previous page, so page 500 costs the same as page 1 and no COUNT runs
+class KeysetPagination(BasePagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+
+    # When True the response also carries an estimated total count
+    include_estimated_count = False
+
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    @staticmethod
+    def get_ordering(queryset):
+        """Sort fields for the page, always ending in the primary key"""
+        # Explicit ordering from OrderingFilter or the view, else the model's Meta ordering
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        ordering = [field for field in ordering if isinstance(field, str)]
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            # Tie-breaker so rows with equal sort values keep a stable order
+            descending = bool(ordering) and ordering[0].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    @staticmethod
+    def get_value(obj, field):
+        # Rows are model instances, or dicts when a view paginates .values()
+        if isinstance(obj, dict):
+            value = obj[field.lstrip('-')]
+        else:
+            value = obj
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def keyset_filter(ordering, values):
+        # Rows that sort after (a, b, id) are:
+        # a after A, or a == A and b after B, or a == A and b == B and id after ID
+        condition = Q()
+        for position, field in enumerate(ordering):
+            step = Q()
+            for previous_field, previous_value in zip(ordering[:position], values[:position]):
+                step &= Q(**{previous_field.lstrip('-'): previous_value})
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step &= Q(**{f"{field.lstrip('-')}__{lookup}": values[position]})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, ordering, values):
+        payload = json.dumps({'o': ordering, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values = payload['v']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor only makes sense for the sort order it was created with
+        if payload.get('o') != ordering or len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(isinstance(value, str) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        self.count = None
+        if self.include_estimated_count:
+            self.count = estimate_count(queryset)
+
+        values = self.decode_cursor(request, self.ordering)
+        if values is not None:
+            try:
+                queryset = queryset.filter(self.keyset_filter(self.ordering, values))
+            except (ValidationError, ValueError, TypeError):
+                # Values that cannot be converted back to the field type
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to find out whether there is a next page
+        results = list(queryset[:self.page_size_value + 1])
+        self.has_next = len(results) > self.page_size_value
+        self.page = results[:self.page_size_value]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        values = [self.get_value(last, field) for field in self.ordering]
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.ordering, values))
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = None
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+# Pagination used by the product listing views
+# Page-number pagination stays the default for the existing frontend.
+# Clients opt in per request:
+#   ?pagination=cursor (or any ?cursor=...)  -> keyset pagination
+#   ?count=estimated                         -> planner estimate instead of COUNT(*)
+# Views can change the defaults with pagination_mode / count_mode attributes
+# Listings sorted by an annotation (search relevance) always use page numbers:
+# a float rank written into a cursor doesn't reliably compare equal to the
+# rank recomputed by the next query, so rows at page boundaries could be
+# skipped or repeated.
+class ProductPagination(BasePagination):
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def get_mode(self, request, view):
+        if KeysetPagination.cursor_query_param in request.query_params:
+            return 'cursor'
+        return request.query_params.get(self.mode_query_param) or getattr(view, 'pagination_mode', 'page')
+
+    def get_count_mode(self, request, view):
+        return request.query_params.get(self.count_query_param) or getattr(view, 'count_mode', 'exact')
+
+    @staticmethod
+    def sorts_by_annotation(queryset):
+        annotations = queryset.query.annotations
+        return any(field.lstrip('-').split('__')[0] in annotations for field in KeysetPagination.get_ordering(queryset))
+
+    def get_paginator(self, request, view, queryset=None):
+        estimated = self.get_count_mode(request, view) == 'estimated'
+        keyset_safe = queryset is None or not self.sorts_by_annotation(queryset)
+        if self.get_mode(request, view) == 'cursor' and keyset_safe:
+            paginator = KeysetPagination()
+            paginator.include_estimated_count = estimated
+            return paginator
+        if estimated:
+            return EstimatedCountPagination()
+        return StandardResultsSetPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request, view, queryset)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return StandardResultsSetPagination().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return StandardResultsSetPagination().get_schema_operation_parameters(view)
@@ -0,0 +1,132 @@
+import random
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Product
+
+
+# Default sampling configuration
+# Any key can be overridden through settings.FEATURED_PRODUCTS
+DEFAULT_FEATURED_SETTINGS = {
+    # How many products the homepage shows
+    'SAMPLE_SIZE': 12,
+    # 'pool' keeps a cached list of featured IDs and samples from it
+    # 'window' picks a random point in the ID range and reads the next rows
+    'STRATEGY': 'pool',
+    # Maximum number of IDs kept in the pool (None keeps every featured ID)
+    'POOL_SIZE': 5000,
+    # How long the pool lives in the cache before it is rebuilt
+    'POOL_REFRESH_SECONDS': 300,
+}
+
+
+def get_featured_settings():
+    """Return the sampling configuration merged with the defaults"""
+    config = dict(DEFAULT_FEATURED_SETTINGS)
+    config.update(getattr(settings, 'FEATURED_PRODUCTS', {}))
+    return config
+
+
+# Picks a handful of featured products without loading the whole featured catalog
+# Only the chosen IDs are fetched with their serializer dependencies
+class FeaturedProductSampler:
+    POOL_CACHE_KEY = 'products:featured:pool'
+    BOUNDS_CACHE_KEY = 'products:featured:bounds'
+
+    def __init__(self, config=None):
+        self.config = config or get_featured_settings()
+        self.sample_size = self.config['SAMPLE_SIZE']
+
+    def featured_queryset(self):
+        return Product.objects.filter(is_featured=True)
+
+    # Pool strategy
+    def get_pool(self):
+        """Cached list of featured product IDs, rebuilt when it expires"""
+        pool = cache.get(self.POOL_CACHE_KEY)
+        if pool is None:
+            pool = self.build_pool()
+            cache.set(self.POOL_CACHE_KEY, pool, self.config['POOL_REFRESH_SECONDS'])
+        return pool
+
+    def build_pool(self):
+        # values_list only reads the ID column, so no model instances are created
+        ids = self.featured_queryset().order_by('-rating').values_list('id', flat=True)
+        if self.config['POOL_SIZE']:
+            ids = ids[:self.config['POOL_SIZE']]
+        return list(ids)
+
+    def sample_from_pool(self):
+        pool = self.get_pool()
+        if len(pool) <= self.sample_size:
+            return pool
+        return random.sample(pool, self.sample_size)
+
+    # Window strategy
+    def get_bounds(self):
+        """Cached (min_id, max_id) of featured products"""
+        bounds = cache.get(self.BOUNDS_CACHE_KEY)
+        if bounds is None:
+            ids = self.featured_queryset().order_by('id').values_list('id', flat=True)
+            first = ids.first()
+            bounds = (first, ids.last()) if first is not None else None
+            cache.set(self.BOUNDS_CACHE_KEY, bounds, self.config['POOL_REFRESH_SECONDS'])
+        return bounds
+
+    def sample_from_window(self):
+        bounds = self.get_bounds()
+        if bounds is None:
+            return []
+        # Read the rows that follow a random pivot, wrapping to the start if needed
+        # Both reads walk the primary key index, so the cost does not grow with the catalog
+        pivot = random.randint(bounds[0], bounds[1])
+        ids = self.featured_queryset().order_by('id').values_list('id', flat=True)
+        chosen = list(ids.filter(id__gte=pivot)[:self.sample_size])
+        if len(chosen) < self.sample_size:
+            chosen += list(ids.filter(id__lt=pivot)[:self.sample_size - len(chosen)])
+        return chosen
+
+    def sample_ids(self):
+        if self.config['STRATEGY'] == 'window':
+            return self.sample_from_window()
+        return self.sample_from_pool()
+
+    # Async versions used by the ASGI featured view (see async_views.py)
+    async def aget_pool(self):
+        pool = await cache.aget(self.POOL_CACHE_KEY)
+        if pool is None:
+            ids = self.featured_queryset().order_by('-rating').values_list('id', flat=True)
+            if self.config['POOL_SIZE']:
+                ids = ids[:self.config['POOL_SIZE']]
+            pool = [product_id async for product_id in ids]
+            await cache.aset(self.POOL_CACHE_KEY, pool, self.config['POOL_REFRESH_SECONDS'])
+        return pool
+
+    async def asample_ids(self):
+        if self.config['STRATEGY'] == 'window':
+            # Two short primary key reads, left on the sync path
+            return await sync_to_async(self.sample_from_window)()
+        pool = await self.aget_pool()
+        if len(pool) <= self.sample_size:
+            return pool
+        return random.sample(pool, self.sample_size)
+
+    async def asample_queryset(self):
+        """Unevaluated queryset of the sampled products, for async serialization"""
+        return self.featured_queryset().filter(id__in=await self.asample_ids()).order_by('-rating')
+
+    def sample(self, queryset=None):
+        """Fetch the sampled products ready for ProductSerializer
+
+        queryset narrows what is loaded for them (default: Product.objects.for_listing())
+        """
+        if queryset is None:
+            queryset = Product.objects.for_listing()
+        # is_featured is checked again so IDs from a stale pool drop out
+        return list(
+            queryset
+            .filter(is_featured=True, id__in=self.sample_ids())
+            .order_by('-rating')
+        )
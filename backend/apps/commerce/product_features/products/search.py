@@ -0,0 +1,163 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import BaseFilterBackend
+
+# Only word characters are kept from the user's input
+# This makes the terms safe to place inside tsquery and FTS5 MATCH syntax
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+MAX_TERMS = 10
+
+
+def parse_terms(query):
+    """Split a raw search string into lowercase search terms"""
+    return TERM_PATTERN.findall((query or '').lower())[:MAX_TERMS]
+
+
+# Base class for all search backends
+# A backend takes a Product queryset and a search string and returns the
+# matching products annotated with search_rank and ordered by relevance
+class BaseSearchBackend:
+    def search(self, queryset, query):
+        terms = parse_terms(query)
+        if not terms:
+            return queryset.none()
+        return self.search_terms(queryset, terms)
+
+    def search_terms(self, queryset, terms):
+        raise NotImplementedError
+
+    # Called after every migrate so backends can create their own database objects
+    def install(self, connection):
+        pass
+
+
+# Fallback used when the database has no full-text engine
+# Same ILIKE matching the views used before, so results are unranked
+class BasicSearchBackend(BaseSearchBackend):
+    def search_terms(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(
+                Q(name__icontains=term) |
+                Q(description__icontains=term) |
+                Q(short_description__icontains=term)
+            )
+        return queryset
+
+
+# PostgreSQL backend
+# Product.search_vector is kept current by a trigger (see migration 0006)
+# and indexed with GIN, so matching never scans the table
+class PostgresSearchBackend(BaseSearchBackend):
+    config = 'english'
+
+    def search_terms(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        # Every term must match, and each term also matches as a prefix ("lapt" finds "laptop")
+        raw_query = ' & '.join(f"'{term}':*" for term in terms)
+        search_query = SearchQuery(raw_query, config=self.config, search_type='raw')
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-search_rank', '-created_at')
+
+
+# SQLite backend for local development and tests
+# Uses an FTS5 shadow table that mirrors the text columns of products_product
+class SqliteSearchBackend(BaseSearchBackend):
+    table = 'products_product_fts'
+
+    # Column weights for bm25(): name, short_description, description
+    weights = (10.0, 4.0, 1.0)
+
+    def search_terms(self, queryset, terms):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in self.weights)
+
+        # bm25() returns lower numbers for better matches, so it is negated
+        rank = RawSQL(
+            f"SELECT -bm25({self.table}, {weights}) FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid = products_product.id",
+            (match,),
+            output_field=FloatField()
+        )
+        matching_ids = RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", (match,))
+        return queryset.filter(id__in=matching_ids).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-created_at')
+
+    # The shadow table and its triggers are created after every migrate
+    # Django rebuilds SQLite tables on some schema changes, which drops triggers,
+    # so installing here (instead of in a migration) keeps them in place
+    def install(self, connection):
+        columns = 'name, short_description, description'
+        old_values = 'old.id, old.name, old.short_description, old.description'
+        new_values = 'new.id, new.name, new.short_description, new.description'
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"{columns}, content='products_product', content_rowid='id')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_ai AFTER INSERT ON products_product BEGIN "
+            f"INSERT INTO {self.table}(rowid, {columns}) VALUES ({new_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_ad AFTER DELETE ON products_product BEGIN "
+            f"INSERT INTO {self.table}({self.table}, rowid, {columns}) VALUES ('delete', {old_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_au AFTER UPDATE ON products_product BEGIN "
+            f"INSERT INTO {self.table}({self.table}, rowid, {columns}) VALUES ('delete', {old_values}); "
+            f"INSERT INTO {self.table}(rowid, {columns}) VALUES ({new_values}); END",
+            # Re-index everything in case rows changed while the triggers were missing
+            f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')",
+        ]
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+# Remembers per database alias whether SQLite was built with FTS5
+_fts5_support = {}
+
+
+def sqlite_has_fts5(connection):
+    if connection.alias not in _fts5_support:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            _fts5_support[connection.alias] = bool(cursor.fetchone()[0])
+    return _fts5_support[connection.alias]
+
+
+def get_search_backend(using='default'):
+    """Return the search backend for a database alias
+
+    settings.PRODUCT_SEARCH_BACKEND can name a backend class by dotted path,
+    otherwise the backend is chosen from the database vendor
+    """
+    backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite' and sqlite_has_fts5(connection):
+        return SqliteSearchBackend()
+    return BasicSearchBackend()
+
+
+# post_migrate receiver registered in ProductsConfig.ready()
+def install_search_backend(using='default', **kwargs):
+    get_search_backend(using).install(connections[using])
+
+
+# DRF filter backend that replaces SearchFilter on product views
+# Reads the search string from ?q= (or ?search=) and hands it to the search backend
+class ProductSearchFilter(BaseFilterBackend):
+    search_params = ['q', 'search']
+
+    def filter_queryset(self, request, queryset, view):
+        for param in self.search_params:
+            query = request.query_params.get(param)
+            if query:
+                return get_search_backend(queryset.db).search(queryset, query)
+        return queryset
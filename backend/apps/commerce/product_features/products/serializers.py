@@ -2,6 +2,13 @@ from rest_framework import serializers
 from .models import Product, ProductImage
 # In products/serializers.py
 from apps.commerce.product_features.subcategories.serializers import SubcategorySerializer
+from .diagnostics import get_logger
+from .media import get_media_resolver
+from .variants import build_srcset
+
+# Structured, sampled diagnostics (see diagnostics.py)
+# These methods run once per row, so nothing is printed or formatted unless enabled
+logger = get_logger(__name__)
 
 # This class handles the serialization of ProductImage model instances into JSON format
 # It inherits from ModelSerializer which provides default serialization behavior
@@ -9,6 +16,8 @@ class ProductImageSerializer(serializers.ModelSerializer):
     # Define a custom field that will be populated by the get_image_url method
     # SerializerMethodField() is used when we need custom logic to generate the field value
     image_url = serializers.SerializerMethodField()
+    # Resized WebP/JPEG URLs in srcset syntax, per format (see variants.py)
+    image_srcset = serializers.SerializerMethodField()
 
     # Meta class defines metadata for the serializer
     class Meta:
@@ -18,8 +27,9 @@ class ProductImageSerializer(serializers.ModelSerializer):
         # 'id': The primary key of the image
         # 'image_url': The computed URL for the image
         # 'is_primary': Boolean indicating if this is the main product image
+        # 'image_srcset': Resized variants of the image, None until they are generated
         # 'alt_text': Alternative text for the image (for accessibility)
-        fields = ['id', 'image_url', 'is_primary', 'alt_text']
+        fields = ['id', 'image_url', 'image_srcset', 'is_primary', 'alt_text']
 
     # Custom method to generate the full URL for the image
     # The method name must be 'get_<field_name>' for SerializerMethodField
@@ -33,24 +43,36 @@ class ProductImageSerializer(serializers.ModelSerializer):
             # After: Building absolute URLs
             # Check if both request and image exist
             if request and obj.image:
-                # build_absolute_uri() creates a full URL including domain
+                # The resolver builds the full URL including domain from a prefix
+                # computed once per request (see media.py)
                 # Example: http://yourdomain.com/media/products/image.jpg
-                url = request.build_absolute_uri(obj.image.url) # This gives full URL with domain
-                print(f"Generated image URL: {url}")  # Debug logging
+                url = get_media_resolver(self.context).url(obj.image.name)
+                logger.debug('product_image.image_url', image_id=obj.id, url=url)
                 return url
             
             # Return None if either request or image is missing
             return None
             
-        except Exception as e:
+        except Exception:
             # Error handling with logging
-            print(f"Error getting image URL for product image {obj.id}: {e}")
+            logger.exception('product_image.image_url_failed', image_id=obj.id)
+            return None
+
+    # Same rules as image_url: absolute URLs, only with a request
+    def get_image_srcset(self, obj):
+        try:
+            if self.context.get('request') is None:
+                return None
+            return build_srcset(obj.image_variants, obj.image.name, get_media_resolver(self.context).url)
+        except Exception:
+            logger.exception('product_image.image_srcset_failed', image_id=obj.id)
             return None
 
 # Main product serializer
 class ProductSerializer(serializers.ModelSerializer):
     # Custom fields that require special handling
     image_url = serializers.SerializerMethodField()  # For main product image
+    image_srcset = serializers.SerializerMethodField()  # Resized variants of the main image
     additional_images = serializers.SerializerMethodField()  # For additional product images
     is_in_stock = serializers.SerializerMethodField()  # For stock status
     subcategory_details = SubcategorySerializer(source='subcategory', read_only=True)
@@ -68,6 +90,7 @@ class ProductSerializer(serializers.ModelSerializer):
             'short_description',       # Brief product description
             'meta_description',        # SEO description
             'image_url',              # Main product image URL
+            'image_srcset',           # Main image variants, per format
             'additional_images',       # Additional product images
             'rating',                 # Product rating
             'is_featured',            # Featured status
@@ -76,24 +99,36 @@ class ProductSerializer(serializers.ModelSerializer):
             'is_in_stock'             # Stock availability
         ]
 
+    # Drop the fields left out of the sparse fieldset chosen by the view
+    # (?fields= / ?exclude=, see products/fieldsets.py)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get('fieldset')
+        if fieldset is not None:
+            for name in set(self.fields) - set(fieldset):
+                self.fields.pop(name)
+
     # Method to get the main product image URL
     # In serializers.py, modify get_image_url
     def get_image_url(self, obj):
         try:
             if obj.image:
-                request = self.context.get('request')
-                if request:
-                    url = request.build_absolute_uri(obj.image.url)
-                    print(f"Image URL details: path={obj.image.path}, url={obj.image.url}, absolute={url}")
-                    return url
-                print("No request in context, using relative URL")
-                return obj.image.url
-            print("No image for product", obj.id)
+                # Absolute when there is a request (or a CDN origin), else relative
+                url = get_media_resolver(self.context).url(obj.image.name)
+                logger.debug('product.image_url', product_id=obj.id, name=obj.image.name, url=url)
+                return url
+            logger.debug('product.image_missing', product_id=obj.id)
+            return None
+        except Exception:
+            logger.exception('product.image_url_failed', product_id=obj.id)
             return None
-        except Exception as e:
-            print(f"Error getting image URL: {str(e)}")
-            import traceback
-            traceback.print_exc()
+
+    # Method to get the srcset of the main image variants
+    def get_image_srcset(self, obj):
+        try:
+            return build_srcset(obj.image_variants, obj.image.name, get_media_resolver(self.context).url)
+        except Exception:
+            logger.exception('product.image_srcset_failed', product_id=obj.id)
             return None
 
     # Method to get all additional product images
@@ -108,14 +143,26 @@ class ProductSerializer(serializers.ModelSerializer):
                 context=self.context  # Pass the context (contains request object)
             )
             return serializer.data
-        except Exception as e:
-            print(f"Error getting additional images for product {obj.id}: {e}")
+        except Exception:
+            logger.exception('product.additional_images_failed', product_id=obj.id)
             return []
 
     # Method to check product stock status
     def get_is_in_stock(self, obj):
         try:
             return obj.is_in_stock()  # Calls the model method to check stock
-        except Exception as e:
-            print(f"Error checking stock for product {obj.id}: {e}")
-            return False
\ No newline at end of file
+        except Exception:
+            logger.exception('product.stock_check_failed', product_id=obj.id)
+            return False
+
+
+# ProductSerializer for the ?images=primary listing mode
+# primary_image (or null) takes the place of the additional_images array
+class PrimaryImageProductSerializer(ProductSerializer):
+    primary_image = ProductImageSerializer(read_only=True)
+
+    class Meta(ProductSerializer.Meta):
+        fields = [
+            'primary_image' if field == 'additional_images' else field
+            for field in ProductSerializer.Meta.fields
+        ]
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate
+from .models import Product, ProductImage
+from .variants import schedule_variants
+
+
+# Remember which subcategory a product belonged to before it is saved
+# Moving a product changes the product count of both subcategories
+@receiver(pre_save, sender=Product)
+def remember_previous_subcategory(sender, instance, **kwargs):
+    instance._previous_subcategory_id = None
+    if instance.pk:
+        instance._previous_subcategory_id = (
+            Product.objects.filter(pk=instance.pk).values_list('subcategory_id', flat=True).first()
+        )
+
+
+# Any product change invalidates product listings, its own detail page
+# and the subcategories whose product counts may have changed
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    subcategory_ids = {instance.subcategory_id, getattr(instance, '_previous_subcategory_id', None)}
+    invalidate(
+        'products',
+        f'product:{instance.pk}',
+        'subcategories',
+        *(f'subcategory:{subcategory_id}' for subcategory_id in subcategory_ids if subcategory_id)
+    )
+
+
+# Images are embedded in product responses
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_image(sender, instance, **kwargs):
+    invalidate('products', f'product:{instance.product_id}')
+
+
+# New uploads get their resized variants once the save commits
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductImage)
+def generate_image_variants(sender, instance, **kwargs):
+    schedule_variants(instance)
@@ -0,0 +1,1063 @@
+import io
+import json
+import logging
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from unittest import mock, skipUnless
+from urllib.parse import unquote
+from decimal import Decimal
+
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.commerce.payment.payments.pricing import PriceResolver
+from apps.commerce.product_features.subcategories.models import Subcategory
+from .models import Product, ProductImage
+from .sampling import FeaturedProductSampler, get_featured_settings
+from .search import get_search_backend, parse_terms
+from .pagination import KeysetPagination
+from .cache import ResponseCache, metrics
+from .fast_serializers import FastPrimaryImageSerializer, FastProductSerializer
+from .serializers import PrimaryImageProductSerializer, ProductSerializer
+from .diagnostics import StructuredFormatter, get_logger
+from .media import MediaURLResolver, get_storage_base
+from .variants import variant_name
+from .export import iter_export
+from rest_framework.renderers import JSONRenderer
+
+
+# Helper for building a small catalog that every product test can reuse
+def create_catalog(count, featured=False):
+    subcategories = [
+        Subcategory.objects.create(name=f"Sub {i}", slug=f"sub-{i}", category='ELEC')
+        for i in range(3)
+    ]
+    products = []
+    for i in range(count):
+        product = Product.objects.create(
+            name=f"Product {i}",
+            category='ELEC',
+            subcategory=subcategories[i % len(subcategories)],
+            price=Decimal('10.00') + i,
+            description=f"Description for product number {i}",
+            image=f"products/2025/01/product-{i}.jpg",
+            is_featured=featured,
+        )
+        ProductImage.objects.create(product=product, image=f"products/additional/2025/01/extra-{i}.jpg")
+        ProductImage.objects.create(product=product, image=f"products/additional/2025/01/main-{i}.jpg", is_primary=True)
+        products.append(product)
+    return products
+
+
+# Mixin that checks an endpoint runs the same number of queries for any page size
+class QueryBudgetMixin:
+    def assertQueryBudget(self, url, budget, params=None):
+        # secure=True because settings force an HTTPS redirect
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, params or {}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+# The response cache is off so every request measures the real query cost
+@override_settings(PRODUCT_CACHE={'ENABLED': False})
+class ProductQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(30, featured=True)
+
+    def setUp(self):
+        cache.clear()
+
+    # COUNT for pagination + products + subcategories + images
+    def test_list_budget_is_independent_of_page_size(self):
+        for page_size in (5, 30):
+            response = self.assertQueryBudget(reverse('product-list'), 4, {'page_size': page_size})
+            self.assertEqual(len(response.data['results']), page_size)
+
+    def test_search_budget(self):
+        self.assertQueryBudget(reverse('product-search'), 4, {'q': 'Product', 'page_size': 30})
+
+    def test_category_budget(self):
+        url = reverse('products-by-category', kwargs={'category': 'ELEC'})
+        self.assertQueryBudget(url, 4, {'page_size': 30})
+
+    # product + subcategory + images (no validator lookup with the response cache off)
+    def test_detail_budget(self):
+        url = reverse('product-detail', kwargs={'pk': self.products[0].pk})
+        response = self.assertQueryBudget(url, 3)
+        self.assertEqual(len(response.data['additional_images']), 2)
+        self.assertEqual(response.data['subcategory_details']['products_count'], 10)
+
+    # COUNT + products joined to their primary image + subcategories
+    def test_primary_image_listing_budget(self):
+        for name, kwargs in (('product-list', None), ('products-by-category', {'category': 'ELEC'})):
+            response = self.assertQueryBudget(reverse(name, kwargs=kwargs), 3, {'images': 'primary', 'page_size': 30})
+            self.assertNotIn('additional_images', response.data['results'][0])
+        self.assertQueryBudget(reverse('product-search'), 3, {'q': 'Product', 'images': 'primary'})
+
+    # ID pool + products + subcategories + images, then the pool is cached
+    def test_featured_budget(self):
+        self.assertQueryBudget(reverse('featured-products'), 4)
+        self.assertQueryBudget(reverse('featured-products'), 3)
+
+
+class FeaturedProductSamplerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(30, featured=True)
+        Product.objects.create(name="Not featured", price=Decimal('5.00'))
+
+    def setUp(self):
+        cache.clear()
+
+    def assertValidSample(self, sample, size):
+        ids = [product.id for product in sample]
+        self.assertEqual(len(ids), size)
+        self.assertEqual(len(set(ids)), size)
+        self.assertTrue(all(product.is_featured for product in sample))
+
+    def test_pool_strategy(self):
+        self.assertValidSample(FeaturedProductSampler().sample(), 12)
+
+    def test_window_strategy(self):
+        config = dict(get_featured_settings(), STRATEGY='window')
+        for _ in range(10):
+            self.assertValidSample(FeaturedProductSampler(config).sample(), 12)
+
+    def test_pool_size_limits_candidates(self):
+        config = dict(get_featured_settings(), POOL_SIZE=5)
+        self.assertEqual(len(FeaturedProductSampler(config).get_pool()), 5)
+        self.assertValidSample(FeaturedProductSampler(config).sample(), 5)
+
+    @override_settings(FEATURED_PRODUCTS={'SAMPLE_SIZE': 3})
+    def test_settings_override_defaults(self):
+        self.assertValidSample(FeaturedProductSampler().sample(), 3)
+
+    def test_stale_pool_ids_are_dropped(self):
+        FeaturedProductSampler().get_pool()
+        Product.objects.filter(is_featured=True).update(is_featured=False)
+        self.assertEqual(FeaturedProductSampler().sample(), [])
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.in_name = Product.objects.create(
+            name="Gaming Laptop", price=Decimal('999.00'),
+            description="Fast machine with a large screen"
+        )
+        cls.in_description = Product.objects.create(
+            name="Laptop Sleeve", price=Decimal('19.00'),
+            description="Padded sleeve for a gaming laptop"
+        )
+        cls.unrelated = Product.objects.create(
+            name="Coffee Beans", price=Decimal('12.00'),
+            description="Dark roast from Colombia"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, **params):
+        response = self.client.get(reverse('product-search'), params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_results_are_ordered_by_relevance(self):
+        self.assertEqual(self.search(q='gaming'), [self.in_name.id, self.in_description.id])
+
+    def test_terms_match_as_prefixes(self):
+        self.assertEqual(self.search(q='lapt sleev'), [self.in_description.id])
+
+    def test_ordering_param_overrides_relevance(self):
+        self.assertEqual(self.search(q='gaming', ordering='price'), [self.in_description.id, self.in_name.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.unrelated.name = "Gaming Coffee"
+        self.unrelated.save()
+        self.assertIn(self.unrelated.id, self.search(q='gaming'))
+        self.in_name.delete()
+        self.assertNotIn(self.in_name.id, self.search(q='gaming'))
+
+    def test_list_view_search_param(self):
+        response = self.client.get(reverse('product-list'), {'search': 'colombia'}, secure=True)
+        self.assertEqual([item['id'] for item in response.data['results']], [self.unrelated.id])
+
+    def test_query_without_terms_matches_nothing(self):
+        self.assertEqual(parse_terms('?!*'), [])
+        self.assertEqual(self.search(q='"*'), [])
+
+    @override_settings(PRODUCT_SEARCH_BACKEND='apps.commerce.product_features.products.search.BasicSearchBackend')
+    def test_basic_backend_fallback(self):
+        queryset = get_search_backend().search(Product.objects.all(), 'laptop')
+        self.assertEqual(set(queryset.values_list('id', flat=True)), {self.in_name.id, self.in_description.id})
+
+
+class KeysetPaginationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(25)
+        # Duplicate prices so the id tie-breaker is exercised
+        Product.objects.filter(id__in=[p.id for p in cls.products[:6]]).update(price=Decimal('50.00'))
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url, params):
+        """Follow next links until the end and return the ids in order"""
+        ids = []
+        response = self.client.get(url, params, secure=True)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids += [item['id'] for item in response.data['results']]
+            if not response.data['next']:
+                return ids
+            response = self.client.get(response.data['next'], secure=True)
+
+    def test_default_ordering_walk_matches_full_listing(self):
+        expected = list(Product.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids = self.walk(reverse('product-list'), {'pagination': 'cursor', 'page_size': 4})
+        self.assertEqual(ids, expected)
+
+    def test_ordering_filter_fields(self):
+        for ordering in ('price', '-price', 'rating', '-created_at'):
+            expected = list(Product.objects.order_by(ordering, 'id' if ordering[0] != '-' else '-id')
+                            .values_list('id', flat=True))
+            ids = self.walk(reverse('product-list'), {'pagination': 'cursor', 'page_size': 4, 'ordering': ordering})
+            self.assertEqual(ids, expected, ordering)
+
+    def test_deep_pages_skip_count_query(self):
+        first = self.client.get(reverse('product-list'), {'pagination': 'cursor', 'page_size': 5}, secure=True)
+        # products + subcategories + images, no COUNT
+        with self.assertNumQueries(3):
+            self.client.get(first.data['next'], secure=True)
+
+    def test_cursor_from_other_ordering_is_rejected(self):
+        first = self.client.get(reverse('product-list'), {'pagination': 'cursor', 'page_size': 5}, secure=True)
+        cursor = first.data['next'].split('cursor=')[1]
+        response = self.client.get(reverse('product-list'), {'cursor': cursor, 'ordering': 'price'}, secure=True)
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_is_rejected(self):
+        pagination = KeysetPagination()
+        cursor = pagination.encode_cursor(['price', 'id'], ['not-a-price', '1'])
+        response = self.client.get(reverse('product-list'), {'cursor': cursor, 'ordering': 'price'}, secure=True)
+        self.assertEqual(response.status_code, 404)
+
+    def test_estimated_count_mode(self):
+        response = self.client.get(
+            reverse('product-list'), {'pagination': 'cursor', 'count': 'estimated'}, secure=True
+        )
+        self.assertEqual(response.data['count'], 25)
+        response = self.client.get(reverse('product-list'), {'count': 'estimated'}, secure=True)
+        self.assertEqual(response.data['count'], 25)
+
+    def test_relevance_ordering_falls_back_to_page_numbers(self):
+        # Tied ranks (identical text) and near-tied ranks (slightly longer text)
+        tied = Product.objects.filter(id__in=[p.id for p in self.products[:12]])
+        tied.update(name='Walnut desk', description='Solid walnut desk for the office')
+        Product.objects.filter(id__in=[p.id for p in self.products[12:18]]).update(
+            name='Walnut desk', description='Solid walnut desk for the home office'
+        )
+        expected = set(Product.objects.filter(name='Walnut desk').values_list('id', flat=True))
+        for fast in (False, True):
+            with override_settings(PRODUCT_FAST_SERIALIZER=fast):
+                response = self.client.get(
+                    reverse('product-search'), {'q': 'walnut', 'pagination': 'cursor', 'page_size': 5}, secure=True
+                )
+                ids = []
+                while True:
+                    self.assertEqual(response.data['count'], 18)
+                    ids += [item['id'] for item in response.data['results']]
+                    if not response.data['next']:
+                        break
+                    self.assertNotIn('cursor=', response.data['next'])
+                    response = self.client.get(response.data['next'], secure=True)
+            self.assertEqual(len(ids), len(expected))
+            self.assertEqual(set(ids), expected)
+            cache.clear()
+
+    def test_keyset_filter_shape(self):
+        condition = KeysetPagination.keyset_filter(['-price', '-id'], ['10.00', '7'])
+        self.assertEqual(
+            condition,
+            Q(price__lt='10.00') | (Q(price='10.00') & Q(id__lt='7'))
+        )
+
+
+@override_settings(PRODUCT_CACHE={'ENABLED': True})
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(4, featured=True)
+        cls.subcategory = cls.products[0].subcategory
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params or {}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_repeat_request_is_served_from_cache(self):
+        self.assertEqual(self.get(reverse('product-list'))['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.get(reverse('product-list'))
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(metrics.snapshot()['ProductListView'], {'hits': 1, 'misses': 1})
+
+    def test_query_params_are_normalized(self):
+        self.get(reverse('product-list'), {'ordering': 'price', 'page_size': 2})
+        response = self.client.get(reverse('product-list') + '?page_size=2&ordering=price', secure=True)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(self.get(reverse('product-list'), {'page_size': 3})['X-Cache'], 'MISS')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'shop.example.com'])
+    def test_each_host_gets_its_own_entry(self):
+        self.get(reverse('product-list'))
+        response = self.client.get(reverse('product-list'), secure=True, HTTP_HOST='shop.example.com')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertTrue(response.data['results'][0]['image_url'].startswith('https://shop.example.com/'))
+
+    def test_product_edit_invalidates_listing_and_its_detail_only(self):
+        edited, other = self.products[0], self.products[1]
+        for url in (reverse('product-list'), reverse('product-detail', kwargs={'pk': edited.pk}),
+                    reverse('product-detail', kwargs={'pk': other.pk})):
+            self.get(url)
+
+        edited.name = "Renamed product"
+        edited.save()
+
+        self.assertEqual(self.get(reverse('product-list'))['X-Cache'], 'MISS')
+        response = self.get(reverse('product-detail', kwargs={'pk': edited.pk}))
+        self.assertEqual((response['X-Cache'], response.data['name']), ('MISS', "Renamed product"))
+        self.assertEqual(self.get(reverse('product-detail', kwargs={'pk': other.pk}))['X-Cache'], 'HIT')
+
+    def test_image_and_subcategory_changes_invalidate(self):
+        url = reverse('product-detail', kwargs={'pk': self.products[0].pk})
+        self.get(url)
+        ProductImage.objects.filter(product=self.products[0]).first().delete()
+        self.assertEqual(len(self.get(url).data['additional_images']), 1)
+
+        self.subcategory.name = "Renamed subcategory"
+        self.subcategory.save()
+        response = self.get(url)
+        self.assertEqual(response.data['subcategory_details']['name'], "Renamed subcategory")
+
+    def test_evicted_tag_does_not_revive_old_entries(self):
+        response_cache = ResponseCache()
+        response_cache.set('entry', {'value': 1}, ['products'])
+        cache.delete(response_cache.tag_key('products'))
+        self.assertIsNone(response_cache.get('entry'))
+
+    @override_settings(PRODUCT_CACHE={'ENABLED': False})
+    def test_cache_can_be_disabled(self):
+        self.get(reverse('product-list'))
+        self.assertNotIn('X-Cache', self.get(reverse('product-list')))
+
+
+@override_settings(PRODUCT_CACHE={'ENABLED': True})
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(3)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, **headers):
+        return self.client.get(url, secure=True, **headers)
+
+    def test_list_returns_304_without_queries(self):
+        url = reverse('product-list')
+        first = self.get(url)
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(0):
+            response = self.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'shop.example.com'])
+    def test_etag_depends_on_the_host(self):
+        url = reverse('product-list')
+        etag = self.get(url)['ETag']
+        response = self.get(url, HTTP_HOST='shop.example.com', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_when_a_product_changes(self):
+        url = reverse('product-list')
+        etag = self.get(url)['ETag']
+        self.products[0].rating = Decimal('4.50')
+        self.products[0].save()
+        response = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detail_validators(self):
+        product, other = self.products[0], self.products[1]
+        url = reverse('product-detail', kwargs={'pk': product.pk})
+        first = self.get(url)
+        # Only the primary key lookup for the validators runs
+        with self.assertNumQueries(1):
+            response = self.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304)
+
+        # A product in another subcategory does not change this ETag
+        other.name = "Other product renamed"
+        other.save()
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        ProductImage.objects.create(product=product, image="products/additional/2025/01/new.jpg")
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    # Per-process tag versions would give each worker its own ETags
+    @override_settings(PRODUCT_CACHE={'ENABLED': False})
+    def test_no_validators_without_the_response_cache(self):
+        response = self.get(reverse('product-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_missing_product_has_no_validators(self):
+        response = self.get(reverse('product-detail', kwargs={'pk': 999999}))
+        self.assertNotEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_subcategory_detail_validators(self):
+        subcategory = self.products[0].subcategory
+        url = reverse('subcategories:subcategory-detail', kwargs={'slug': subcategory.slug})
+        etag = self.get(url)['ETag']
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        subcategory.description = "Updated description"
+        subcategory.save()
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# Golden-output tests: FastProductSerializer must render the same bytes as ProductSerializer
+@override_settings(PRODUCT_CACHE={'ENABLED': False})
+class FastProductSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(6, featured=True)
+        # Products with missing optional data
+        Product.objects.create(name="Bare product", price=Decimal('0.50'), description=None,
+                               short_description=None, meta_description=None)
+        Product.objects.create(name="Inactive product", price=Decimal('1234.5'), is_active=False,
+                               subcategory=cls.products[0].subcategory, rating=Decimal('4.25'))
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/api/products/', HTTP_HOST='localhost')
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def assertSameOutput(self, products, context):
+        expected = self.render(ProductSerializer(list(products), many=True, context=context).data)
+        self.assertEqual(self.render(FastProductSerializer(products, many=True, context=context).data), expected)
+
+    def test_queryset_rows(self):
+        self.assertSameOutput(Product.objects.for_listing(), {'request': self.request})
+
+    def test_prefetched_instances(self):
+        self.assertSameOutput(list(Product.objects.for_listing()), {'request': self.request})
+
+    def test_plain_instances_without_prefetch(self):
+        self.assertSameOutput(list(Product.objects.all()), {'request': self.request})
+
+    def test_without_request(self):
+        self.assertSameOutput(Product.objects.for_listing(), {})
+
+    def test_single_object(self):
+        product = Product.objects.for_listing().get(pk=self.products[0].pk)
+        context = {'request': self.request}
+        self.assertEqual(
+            self.render(FastProductSerializer(product, context=context).data),
+            self.render(ProductSerializer(product, context=context).data)
+        )
+
+    def test_views_render_identical_bytes(self):
+        urls = [
+            (reverse('product-list'), {'page_size': 50}),
+            (reverse('product-list'), {'pagination': 'cursor', 'ordering': '-price'}),
+            (reverse('product-search'), {'q': 'product'}),
+            (reverse('products-by-category', kwargs={'category': 'ELEC'}), {}),
+            (reverse('product-detail', kwargs={'pk': self.products[1].pk}), {}),
+        ]
+        for url, params in urls:
+            with override_settings(PRODUCT_FAST_SERIALIZER=False):
+                expected = self.client.get(url, params, secure=True).content
+            with override_settings(PRODUCT_FAST_SERIALIZER=True):
+                fast = self.client.get(url, params, secure=True).content
+            self.assertEqual(fast, expected, url)
+
+    @override_settings(PRODUCT_FAST_SERIALIZER=True)
+    def test_fast_list_query_budget(self):
+        # COUNT + product rows + images + subcategories
+        with self.assertNumQueries(4):
+            self.client.get(reverse('product-list'), {'page_size': 50}, secure=True)
+
+
+class DiagnosticsTests(TestCase):
+    name = 'apps.commerce.product_features.products.tests.diagnostics'
+
+    def setUp(self):
+        self.logger = get_logger(self.name)
+        self.records = []
+        handler = logging.Handler()
+        handler.emit = self.records.append
+        std_logger = logging.getLogger(self.name)
+        std_logger.addHandler(handler)
+        self.addCleanup(std_logger.removeHandler, handler)
+        std_logger.setLevel(logging.DEBUG)
+        self.addCleanup(std_logger.setLevel, logging.NOTSET)
+        std_logger.propagate = False
+        self.addCleanup(setattr, std_logger, 'propagate', True)
+
+    def test_disabled_level_skips_lazy_fields(self):
+        logging.getLogger(self.name).setLevel(logging.WARNING)
+        calls = []
+        self.logger.debug('event', value=lambda: calls.append(1))
+        self.assertEqual((calls, self.records), ([], []))
+
+    def test_lazy_fields_are_evaluated_when_emitted(self):
+        self.logger.debug('event', value=lambda: 42, plain='x')
+        self.assertEqual(self.records[0].fields, {'value': 42, 'plain': 'x'})
+
+    def test_sampling_drops_debug_but_keeps_errors(self):
+        with override_settings(PRODUCT_DIAGNOSTICS={'SAMPLE_RATES': {self.name: 0.0}}):
+            self.logger.debug('dropped')
+            self.logger.warning('kept')
+        self.assertEqual([record.getMessage() for record in self.records], ['kept'])
+
+    def test_structured_formatter(self):
+        self.logger.info('product.image_url', product_id=7)
+        payload = json.loads(StructuredFormatter().format(self.records[0]))
+        self.assertEqual(
+            (payload['event'], payload['product_id'], payload['level']),
+            ('product.image_url', 7, 'INFO')
+        )
+
+    @override_settings(PRODUCT_CACHE={'ENABLED': False})
+    def test_serializers_do_not_print(self):
+        create_catalog(2)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.client.get(reverse('product-list'), secure=True)
+        self.assertEqual(output.getvalue(), '')
+
+
+try:
+    from storages.backends.s3 import S3Storage
+except ImportError:
+    S3Storage = None
+
+
+# Storage that counts url() calls
+class CountingStorage(FileSystemStorage):
+    calls = 0
+
+    def url(self, name):
+        CountingStorage.calls += 1
+        return super().url(name)
+
+
+class MediaURLResolverTests(TestCase):
+    names = ['products/2025/01/product-1.jpg', 'products/a b/é (1).jpg']
+
+    def setUp(self):
+        self.request = RequestFactory().get('/api/products/', HTTP_HOST='localhost', secure=True)
+
+    def test_matches_storage_urls(self):
+        resolver = MediaURLResolver(self.request)
+        relative = MediaURLResolver()
+        for name in self.names:
+            self.assertEqual(resolver.url(name), self.request.build_absolute_uri(default_storage.url(name)))
+            self.assertEqual(relative.url(name), default_storage.url(name))
+        self.assertIsNone(resolver.url(''))
+
+    def test_storage_prefix_is_computed_once_per_process(self):
+        storage = CountingStorage()
+        CountingStorage.calls = 0
+        for _ in range(3):
+            resolver = MediaURLResolver(self.request, storage=storage)
+            for name in self.names:
+                resolver.url(name)
+        self.assertEqual(CountingStorage.calls, 1)
+
+    @override_settings(MEDIA_CDN_URL='https://cdn.example.com/media')
+    def test_cdn_origin(self):
+        for resolver in (MediaURLResolver(self.request), MediaURLResolver()):
+            self.assertEqual(resolver.url(self.names[0]), 'https://cdn.example.com/media/' + self.names[0])
+
+    @override_settings(MEDIA_CDN_URL='https://cdn.example.com/media/')
+    def test_serializers_use_cdn_origin(self):
+        product = create_catalog(1)[0]
+        data = ProductSerializer(product, context={'request': self.request}).data
+        self.assertEqual(data['image_url'], 'https://cdn.example.com/media/' + product.image.name)
+        self.assertTrue(all(
+            image['image_url'].startswith('https://cdn.example.com/media/') for image in data['additional_images']
+        ))
+        fast = FastProductSerializer(product, context={'request': self.request}).data
+        self.assertEqual(fast['image_url'], data['image_url'])
+
+    @skipUnless(S3Storage, 'django-storages is not installed')
+    def test_s3_storage(self):
+        storages = [
+            S3Storage(bucket_name='shop', custom_domain='cdn.shop.com', location='media', querystring_auth=False),
+            S3Storage(bucket_name='shop', querystring_auth=False),
+        ]
+        for storage in storages:
+            resolver = MediaURLResolver(self.request, storage=storage)
+            self.assertIsNotNone(resolver.base)
+            for name in self.names:
+                # boto3 also escapes characters such as "(", which is equivalent
+                self.assertEqual(unquote(resolver.url(name)), unquote(storage.url(name)))
+
+    @skipUnless(S3Storage, 'django-storages is not installed')
+    def test_signed_s3_urls_fall_back_to_storage(self):
+        storage = S3Storage(bucket_name='shop', access_key='key', secret_key='secret', querystring_auth=True)
+        self.assertIsNone(get_storage_base(storage))
+        self.assertIn('Signature=', MediaURLResolver(self.request, storage=storage).url(self.names[0]))
+
+
+class QueryPlanTests(TestCase):
+    def test_endpoints_use_indexes(self):
+        output = io.StringIO()
+        call_command('check_product_query_plans', products=2000, subcategories=50, stdout=output)
+        self.assertIn('No sequential scans', output.getvalue())
+        # The synthetic rows are rolled back
+        self.assertFalse(Product.objects.exists())
+
+    def test_unindexed_filter_is_reported(self):
+        from .management.commands.check_product_query_plans import find_seq_scans
+        sql, params = Product.objects.filter(short_description='x').order_by().query.sql_with_params()
+        self.assertEqual(find_seq_scans(sql.replace('%s', "'x'")), ['SCAN products_product'])
+
+
+def make_upload(name, width, height, mode='RGB'):
+    output = io.BytesIO()
+    Image.new(mode, (width, height), 'red').save(output, 'PNG')
+    return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+
+@override_settings(PRODUCT_IMAGE_VARIANTS={'ASYNC': False, 'WIDTHS': [320, 640]})
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.request = RequestFactory().get('/api/products/', HTTP_HOST='localhost', secure=True)
+
+    def create_product(self, width=1200, height=800):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='Camera', price=Decimal('10.00'), description='A product with an image',
+                image=make_upload('camera.png', width, height, mode='RGBA'),
+            )
+        product.refresh_from_db()
+        return product
+
+    def test_variants_are_written_next_to_the_original(self):
+        product = self.create_product()
+        name = product.image.name
+        self.assertEqual(product.image_variants, {'source': name, 'widths': [320, 640], 'formats': ['webp', 'jpeg']})
+        for width in (320, 640):
+            for fmt in ('webp', 'jpeg'):
+                with default_storage.open(variant_name(name, width, fmt)) as variant:
+                    image = Image.open(variant)
+                    self.assertEqual(image.size, (width, round(800 * width / 1200)))
+                    self.assertEqual(image.format, fmt.upper())
+
+    def test_small_images_are_not_upscaled(self):
+        product = self.create_product(width=200, height=100)
+        self.assertEqual(product.image_variants['widths'], [200])
+
+    def test_serializers_expose_srcset(self):
+        product = self.create_product()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=product, image=make_upload('side.png', 800, 800))
+        product = Product.objects.prefetch_related('images').get(pk=product.pk)
+        context = {'request': self.request}
+        data = ProductSerializer(product, context=context).data
+        resolver = MediaURLResolver(self.request)
+        name = product.image.name
+        self.assertEqual(data['image_srcset']['webp'], ', '.join(
+            f"{resolver.url(variant_name(name, width, 'webp'))} {width}w" for width in (320, 640)
+        ))
+        self.assertIn('640w', data['additional_images'][0]['image_srcset']['jpeg'])
+        self.assertEqual(FastProductSerializer(product, context=context).data, data)
+
+    def test_srcset_errors_are_logged_not_raised(self):
+        product = self.create_product()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=product, image=make_upload('side.png', 800, 800))
+        product = Product.objects.prefetch_related('images').get(pk=product.pk)
+        context = {'request': self.request}
+        with mock.patch.object(MediaURLResolver, 'url', side_effect=OSError('storage is down')):
+            with self.assertLogs('apps.commerce.product_features.products.serializers', 'ERROR') as logs:
+                data = ProductSerializer(product, context=context).data
+            self.assertIsNone(data['image_srcset'])
+            self.assertIsNone(data['additional_images'][0]['image_srcset'])
+            self.assertIn('product.image_srcset_failed', [record.getMessage() for record in logs.records])
+            self.assertEqual(FastProductSerializer(product, context=context).data, data)
+
+    def test_replaced_image_is_processed_again(self):
+        product = self.create_product()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = make_upload('new.png', 400, 400)
+            product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['source'], product.image.name)
+        self.assertEqual(product.image_variants['widths'], [320])
+        # Stale variants are never served for the new file
+        product.image_variants = {'source': 'products/old.png', 'widths': [320], 'formats': ['webp']}
+        self.assertIsNone(ProductSerializer(product, context={'request': self.request}).data['image_srcset'])
+
+
+# The async views must answer exactly like the sync views with the fast serializer
+@override_settings(PRODUCT_CACHE={'ENABLED': False}, PRODUCT_FAST_SERIALIZER=True)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(15, featured=True)
+
+    def setUp(self):
+        cache.clear()
+
+    async def compare(self, sync_name, async_name, params=None, kwargs=None):
+        sync_response = await self.async_client.get(reverse(sync_name, kwargs=kwargs), params or {}, secure=True)
+        async_response = await self.async_client.get(reverse(async_name, kwargs=kwargs), params or {}, secure=True)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        sync_data, async_data = json.loads(sync_response.content), json.loads(async_response.content)
+        # Page links point at each view's own URL
+        for data in (sync_data, async_data):
+            if isinstance(data, dict):
+                for link in ('next', 'previous'):
+                    if data.get(link):
+                        data[link] = data[link].split('?')[1]
+        self.assertEqual(async_data, sync_data)
+        return async_data
+
+    async def test_list_matches_sync_view(self):
+        data = await self.compare('product-list', 'async-product-list')
+        self.assertEqual(data['count'], 15)
+        await self.compare('product-list', 'async-product-list', {'page': 2, 'ordering': 'price'})
+        await self.compare('product-list', 'async-product-list', {
+            'subcategory': self.products[0].subcategory_id, 'min_price': '12', 'ordering': '-rating,price',
+        })
+        await self.compare('product-list', 'async-product-list', {'page': 9})
+
+    async def test_search_matches_sync_view(self):
+        data = await self.compare('product-search', 'async-product-search', {'q': 'number 7'})
+        self.assertEqual([row['id'] for row in data['results']], [self.products[7].id])
+        await self.compare('product-search', 'async-product-search', {'category': 'ELEC', 'max_price': '15'})
+
+    async def test_detail_matches_sync_view(self):
+        await self.compare('product-detail', 'async-product-detail', kwargs={'pk': self.products[3].pk})
+        response = await self.async_client.get(reverse('async-product-detail', kwargs={'pk': 999999}), secure=True)
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(FEATURED_PRODUCTS={'SAMPLE_SIZE': 20})
+    async def test_featured_returns_the_same_products(self):
+        response = await self.async_client.get(reverse('async-featured-products'), secure=True)
+        data = json.loads(response.content)['data']
+        self.assertEqual(data['count'], 15)
+        self.assertEqual({row['id'] for row in data['results']}, {product.id for product in self.products})
+
+    async def test_invalid_parameters(self):
+        data = await self.compare('product-list', 'async-product-list', {'min_price': 'cheap'})
+        self.assertEqual(data, {'min_price': ['A valid number is required.']})
+        await self.compare('product-search', 'async-product-search', {'max_price': 'cheap'})
+        await self.compare('product-list', 'async-product-list', {'category': 'NOPE'})
+        await self.compare('product-list', 'async-product-list', {'page_size': 'all', 'is_featured': 'yes'})
+
+
+class ProductExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(10)
+        cls.staff = get_user_model().objects.create_user('staff', password='x', is_staff=True)
+
+    def export(self, **params):
+        response = self.client.get(reverse('product-export'), params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_staff_only_unless_public(self):
+        response = self.client.get(reverse('product-export'), secure=True)
+        self.assertIn(response.status_code, (401, 403))
+        with override_settings(PRODUCT_EXPORT={'PUBLIC': True}):
+            self.export()
+
+    def test_ndjson_matches_serializer(self):
+        self.client.force_login(self.staff)
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        request = response.wsgi_request
+        expected = ProductSerializer(Product.objects.order_by('pk'), many=True, context={'request': request}).data
+        self.assertEqual(rows, json.loads(JSONRenderer().render(expected)))
+
+    def test_json_array_and_filters(self):
+        self.client.force_login(self.staff)
+        _, body = self.export(format='json', max_price='14')
+        self.assertEqual([row['id'] for row in json.loads(body)], [p.id for p in self.products[:5]])
+        _, body = self.export(format='json', category='FOOD')
+        self.assertEqual(json.loads(body), [])
+        response = self.client.get(reverse('product-export'), {'format': 'xml'}, secure=True)
+        self.assertEqual(response.status_code, 400)
+
+    def test_queries_per_chunk(self):
+        # One query for the rows, then images and subcategories per chunk of 4
+        with self.assertNumQueries(1 + 3 * 2):
+            body = ''.join(iter_export(Product.objects.all(), chunk_size=4))
+        self.assertEqual(len(body.splitlines()), 10)
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command('export_products', '--chunk-size', '3', stdout=stdout)
+        self.assertEqual([json.loads(line)['id'] for line in stdout.getvalue().splitlines()],
+                         [p.id for p in self.products])
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=f'{self.tmp}/media')
+        override.enable()
+        self.addCleanup(override.disable)
+        self.subcategory = Subcategory.objects.create(name='TVs', slug='tvs', category='ELEC')
+
+    def write(self, name, content):
+        path = f'{self.tmp}/{name}'
+        with open(path, 'w', encoding='utf-8') as catalog:
+            catalog.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        stdout = io.StringIO()
+        call_command('import_products', path, *args, stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def test_ndjson_upsert(self):
+        rows = [
+            {'sku': 'TV-1', 'name': 'Television', 'subcategory': 'tvs', 'price': '499.00', 'is_featured': True},
+            {'sku': 'TV-2', 'name': 'Small television', 'price': 199},
+            {'sku': 'TV-3', 'name': 'Unknown', 'subcategory': 'radios'},
+            {'name': 'No sku'},
+            {'sku': 'TV-4', 'name': 'x' * 101},
+            {'sku': 'TV-5', 'name': 'Expensive', 'price': '12345678.00'},
+            {'sku': 'TV-6', 'name': 'Precise', 'rating': '4.125'},
+        ]
+        path = self.write('catalog.ndjson', '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n')
+        output = self.run_import(path, '--batch-size', '2')
+        self.assertIn('Imported 2 products', output)
+        self.assertIn('skipped 6 rows', output)
+        first = Product.objects.get(sku='TV-1')
+        self.assertEqual((first.subcategory_id, first.price, first.is_featured), (self.subcategory.id, Decimal('499.00'), True))
+
+        # Importing again updates in place
+        path = self.write('update.ndjson', json.dumps({'sku': 'TV-1', 'name': 'Television', 'price': '449.00'}))
+        self.run_import(path)
+        updated = Product.objects.get(sku='TV-1')
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual((updated.pk, updated.price, updated.created_at), (first.pk, Decimal('449.00'), first.created_at))
+
+    @override_settings(ORDER_PRICING={'CACHE_ENABLED': True})
+    def test_import_invalidates_cached_prices(self):
+        cache.clear()
+        path = self.write('catalog.csv', 'sku,name,price\nTV-1,Television,499.00\nTV-2,Radio,20.00\n')
+        self.run_import(path)
+        ids = list(Product.objects.order_by('sku').values_list('id', flat=True))
+        self.assertEqual(PriceResolver().get_prices(ids), {ids[0]: 49900, ids[1]: 2000})
+
+        path = self.write('update.csv', 'sku,name,price,is_active\nTV-1,Television,449.00,true\nTV-2,Radio,20.00,false\n')
+        self.run_import(path)
+        self.assertEqual(PriceResolver().get_prices(ids), {ids[0]: 44900})
+
+    def test_one_upsert_per_batch(self):
+        path = self.write('catalog.csv', 'sku,name,price\n' + ''.join(f'SKU-{i},Product {i},{i + 1}\n' for i in range(10)))
+        # Subcategory map, then per batch of 5: previous subcategories, upsert, ids
+        with self.assertNumQueries(1 + 2 * 3):
+            self.run_import(path, '--batch-size', '5')
+        self.assertEqual(Product.objects.count(), 10)
+
+    def test_images_are_stored_once(self):
+        source = f'{self.tmp}/tv.png'
+        Image.new('RGB', (640, 480), 'red').save(source)
+        path = self.write('catalog.csv', f'sku,name,image\nTV-1,Television,{source}\n')
+        # Variants are resized by generate_image_variants in pool threads
+        self.run_import(path, '--skip-variants')
+        product = Product.objects.get(sku='TV-1')
+        self.assertTrue(product.image.name.startswith('products/import/TV-1-'))
+        self.assertTrue(default_storage.exists(product.image.name))
+
+        output = self.run_import(path, '--skip-variants')
+        self.assertIn('and 0 images', output)
+        self.assertEqual(Product.objects.get(sku='TV-1').image.name, product.image.name)
+
+        # Rows without an image, or whose image can't be read, keep the stored one
+        path = self.write('update.csv', 'sku,name,image\nTV-1,Television,\n')
+        self.run_import(path, '--skip-variants')
+        self.assertEqual(Product.objects.get(sku='TV-1').image.name, product.image.name)
+        path = self.write('broken.csv', f'sku,name,image\nTV-1,Renamed,{self.tmp}/missing.png\n')
+        self.run_import(path, '--skip-variants')
+        self.assertEqual(Product.objects.values_list('name', 'image').get(sku='TV-1'), ('Renamed', product.image.name))
+
+
+class PrimaryImageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = create_catalog(1)[0]
+        self.main, = self.product.images.filter(is_primary=True)
+        self.extra, = self.product.images.filter(is_primary=False)
+
+    def primary_image_id(self):
+        return Product.objects.values_list('primary_image_id', flat=True).get(pk=self.product.pk)
+
+    def test_pointer_follows_the_primary_flag(self):
+        self.assertEqual(self.primary_image_id(), self.main.pk)
+        self.extra.is_primary = True
+        self.extra.save()
+        self.assertEqual(self.primary_image_id(), self.extra.pk)
+        self.assertEqual(list(self.product.images.filter(is_primary=True)), [self.extra])
+
+        self.extra.is_primary = False
+        self.extra.save()
+        self.assertIsNone(self.primary_image_id())
+
+        self.main.is_primary = True
+        self.main.save()
+        self.main.delete()
+        self.assertIsNone(self.primary_image_id())
+
+    def test_one_primary_per_product(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ProductImage.objects.filter(pk=self.extra.pk).update(is_primary=True)
+
+    def test_primary_image_listing(self):
+        request = RequestFactory().get('/api/products/', HTTP_HOST='localhost', secure=True)
+        for fast in (False, True):
+            with override_settings(PRODUCT_FAST_SERIALIZER=fast):
+                response = self.client.get(reverse('product-list'), {'images': 'primary'}, secure=True)
+            cache.clear()
+            row = response.data['results'][0]
+            self.assertNotIn('additional_images', row)
+            self.assertEqual(row['primary_image']['id'], self.main.pk)
+            self.assertTrue(row['primary_image']['image_url'].endswith(self.main.image.name))
+        # Instances take the same path in both serializers
+        products = Product.objects.for_listing(primary_image_only=True)
+        self.assertEqual(
+            FastPrimaryImageSerializer(products, many=True, context={'request': request}).data,
+            json.loads(JSONRenderer().render(
+                PrimaryImageProductSerializer(products, many=True, context={'request': request}).data
+            )),
+        )
+
+
+@override_settings(PRODUCT_CACHE={'ENABLED': False})
+class SparseFieldsetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(12)
+
+    def get(self, name, params, kwargs=None, status=200):
+        response = self.client.get(reverse(name, kwargs=kwargs), params, secure=True)
+        self.assertEqual(response.status_code, status)
+        return json.loads(response.content)
+
+    def test_fields_and_exclude(self):
+        for fast in (False, True):
+            with override_settings(PRODUCT_FAST_SERIALIZER=fast):
+                data = self.get('product-list', {'fields': 'name,price,image_url'})
+                self.assertEqual(list(data['results'][0]), ['id', 'name', 'price', 'image_url'])
+                data = self.get('product-list', {'exclude': 'description,additional_images,subcategory_details'})
+                self.assertNotIn('description', data['results'][0])
+                self.assertIn('meta_description', data['results'][0])
+                data = self.get('product-detail', {'fields': 'subcategory_details'}, {'pk': self.products[0].pk})
+                self.assertEqual(list(data), ['id', 'subcategory_details'])
+                data = self.get('product-list', {'fields': 'primary_image', 'images': 'primary'})
+                self.assertIn('image_url', data['results'][0]['primary_image'])
+
+    def test_projected_values_match_full_response(self):
+        full = self.get('product-list', {'ordering': 'price'})['results']
+        fields = 'name,price,rating,image_srcset,additional_images,created_at'
+        for fast in (False, True):
+            with override_settings(PRODUCT_FAST_SERIALIZER=fast):
+                sparse = self.get('product-list', {'ordering': 'price', 'fields': fields})['results']
+            self.assertEqual(sparse, [{name: row[name] for name in ['id'] + fields.split(',')} for row in full])
+
+    def test_cursor_pagination_with_fields(self):
+        for fast in (False, True):
+            for ordering in (None, 'price', '-rating'):
+                params = {'pagination': 'cursor', 'fields': 'name', 'page_size': 5}
+                if ordering:
+                    params['ordering'] = ordering
+                with override_settings(PRODUCT_FAST_SERIALIZER=fast):
+                    seen = []
+                    data = self.get('product-list', params)
+                    while True:
+                        self.assertEqual({tuple(row) for row in data['results']}, {('id', 'name')})
+                        seen += [row['id'] for row in data['results']]
+                        if not data['next']:
+                            break
+                        response = self.client.get(data['next'], secure=True)
+                        self.assertEqual(response.status_code, 200)
+                        data = json.loads(response.content)
+                self.assertEqual(sorted(seen), sorted(product.id for product in self.products))
+
+    def test_unknown_field_is_rejected(self):
+        data = self.get('product-list', {'fields': 'name,secret'}, status=400)
+        self.assertEqual(data, {'fields': ['Unknown field: secret']})
+        self.get('product-detail', {'exclude': 'nope'}, {'pk': self.products[0].pk}, status=400)
+        self.get('async-product-list', {'fields': 'nope'}, status=400)
+
+    # Card grids skip the subcategory and images queries and most columns
+    def test_card_fields_query_budget(self):
+        params = {'fields': 'name,price,image_url,rating', 'page_size': 12}
+        for fast in (False, True):
+            with override_settings(PRODUCT_FAST_SERIALIZER=fast), CaptureQueriesContext(connection) as queries:
+                self.assertQueryBudget(reverse('product-list'), 2, params)
+            select = queries.captured_queries[-1]['sql']
+            self.assertNotIn('"description"', select)
+            self.assertIn('"price"', select)
+
+    @override_settings(PRODUCT_CACHE={'ENABLED': False})
+    def test_featured_selects_only_the_chosen_columns(self):
+        Product.objects.update(is_featured=True)
+        for fast in (False, True):
+            cache.clear()
+            with override_settings(PRODUCT_FAST_SERIALIZER=fast), CaptureQueriesContext(connection) as queries:
+                data = self.get('featured-products', {'fields': 'name,price'})
+            self.assertEqual({tuple(row) for row in data['data']['results']}, {('id', 'name', 'price')})
+            # Pool of ids + the sampled products; no images or subcategory queries
+            self.assertEqual(len(queries), 2)
+            self.assertNotIn('"description"', queries.captured_queries[-1]['sql'])
+
+    async def test_async_views(self):
+        response = await self.async_client.get(reverse('async-product-list'), {'fields': 'name'}, secure=True)
+        self.assertEqual(list(json.loads(response.content)['results'][0]), ['id', 'name'])
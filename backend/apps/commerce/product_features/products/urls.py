@@ -6,6 +6,14 @@ from .views import (
     ProductSearchView,
     ProductsByCategoryView
 )
+from .cache import CacheMetricsView
+from .export import ProductExportView
+from .async_views import (
+    AsyncFeaturedProductsView,
+    AsyncProductDetailView,
+    AsyncProductListView,
+    AsyncProductSearchView
+)
 
 # urls.py
 
@@ -40,6 +48,21 @@ urlpatterns = [
     # - category: Parameter name that will be passed to the view
     # - Allows dynamic category names in the URL
     path('category/<str:category>/', ProductsByCategoryView.as_view(), name='products-by-category'),
+
+    # Response cache hit/miss counters (admin users only)
+    # URL: /api/products/cache/metrics/
+    path('cache/metrics/', CacheMetricsView.as_view(), name='product-cache-metrics'),
+
+    # Streaming export of the whole catalog (staff users unless PRODUCT_EXPORT['PUBLIC'])
+    # URL: /api/products/export/?format=ndjson or ?format=json
+    path('export/', ProductExportView.as_view(), name='product-export'),
+
+    # Native async versions of the read endpoints, for ASGI deployments
+    # URL: /api/products/async/, /api/products/async/42/, ...
+    path('async/featured/', AsyncFeaturedProductsView.as_view(), name='async-featured-products'),
+    path('async/', AsyncProductListView.as_view(), name='async-product-list'),
+    path('async/search/', AsyncProductSearchView.as_view(), name='async-product-search'),
+    path('async/<int:pk>/', AsyncProductDetailView.as_view(), name='async-product-detail'),
 ]
 
 """
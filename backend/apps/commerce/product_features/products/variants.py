@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+# Default image variant configuration
+# Any key can be overridden through settings.PRODUCT_IMAGE_VARIANTS
+DEFAULT_VARIANT_SETTINGS = {
+    'ENABLED': True,
+    # Widths in pixels; widths above the original's are skipped
+    'WIDTHS': [320, 640, 1024],
+    # Encoded formats, in the order clients should prefer them
+    'FORMATS': ['webp', 'jpeg'],
+    'QUALITY': 80,
+    # Threads resizing uploads in the background
+    'MAX_WORKERS': 2,
+    # False generates the variants inside the request (tests, management commands)
+    'ASYNC': True,
+}
+
+
+def get_variant_settings():
+    """Return the image variant configuration merged with the defaults"""
+    config = dict(DEFAULT_VARIANT_SETTINGS)
+    config.update(getattr(settings, 'PRODUCT_IMAGE_VARIANTS', {}))
+    return config
+
+
+# Pillow format and file extension of each variant format
+FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+
+def variant_name(name, width, fmt):
+    """Storage name of a variant, stored next to the original
+
+    products/2025/01/tv.png -> products/2025/01/tv@640w.webp
+    """
+    root, _ = os.path.splitext(name)
+    return f"{root}@{width}w.{FORMATS[fmt][1]}"
+
+
+def has_variants(variants, name):
+    """True when the stored variants were made from this image file"""
+    return bool(name) and bool(variants) and variants.get('source') == name
+
+
+def build_srcset(variants, name, url):
+    """srcset strings per format, e.g. {'webp': '.../tv@320w.webp 320w, ...'}
+
+    url turns a storage name into a URL (MediaURLResolver.url). None when the
+    variants don't exist yet, so clients fall back to the original image.
+    """
+    if not has_variants(variants, name):
+        return None
+    return {
+        fmt: ', '.join(f"{url(variant_name(name, width, fmt))} {width}w" for width in variants['widths'])
+        for fmt in variants['formats']
+    }
+
+
+def smallest_variant(variants, name):
+    """Name of the smallest variant, or the original when there is none"""
+    if not has_variants(variants, name):
+        return name
+    return variant_name(name, variants['widths'][0], variants['formats'][0])
+
+
+def encode(image, fmt, quality):
+    pillow_format = FORMATS[fmt][0]
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, pillow_format, quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def generate_variants(name, storage=None, config=None):
+    """Write the variants of one stored image and return their description"""
+    storage = storage or default_storage
+    config = config or get_variant_settings()
+    with storage.open(name, 'rb') as source:
+        original = Image.open(source)
+        # Apply the camera orientation before resizing
+        original = ImageOps.exif_transpose(original)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+    widths = sorted(width for width in config['WIDTHS'] if width < original.width) or [original.width]
+    for width in widths:
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.LANCZOS)
+        for fmt in config['FORMATS']:
+            target = variant_name(name, width, fmt)
+            # Names are deterministic, so replace instead of getting a suffixed copy
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(encode(resized, fmt, config['QUALITY'])))
+    return {'source': name, 'widths': widths, 'formats': list(config['FORMATS'])}
+
+
+def store_variants(model_label, pk, name, product_id):
+    """Generate the variants of one row's image and record them on the row"""
+    from .cache import invalidate
+
+    model = apps.get_model(model_label)
+    variants = generate_variants(name)
+    # Only if the image wasn't replaced in the meantime; update() skips
+    # post_save, so this doesn't schedule the same work again
+    if model.objects.filter(pk=pk, image=name).update(image_variants=variants):
+        # Product responses now carry the srcset
+        invalidate('products', f'product:{product_id}')
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(config):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config['MAX_WORKERS'], thread_name_prefix='image-variants')
+    return _executor
+
+
+def safe_store_variants(*args):
+    # A broken upload must not fail the save that scheduled it
+    try:
+        store_variants(*args)
+    except Exception:
+        logger.exception('Could not generate image variants for %s %s (%s)', *args[:3])
+
+
+def run_in_worker(*args):
+    # Pool threads get their own database connections
+    close_old_connections()
+    try:
+        safe_store_variants(*args)
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(instance):
+    """Generate variants for a saved Product or ProductImage once the save commits"""
+    config = get_variant_settings()
+    name = instance.image.name if instance.image else None
+    if not config['ENABLED'] or not name or has_variants(instance.image_variants, name):
+        return
+
+    # ProductImage rows belong to a product; a Product is its own
+    args = (instance._meta.label, instance.pk, name, getattr(instance, 'product_id', instance.pk))
+    if config['ASYNC']:
+        transaction.on_commit(lambda: get_executor(config).submit(run_in_worker, *args))
+    else:
+        transaction.on_commit(lambda: safe_store_variants(*args))
@@ -2,13 +2,17 @@ from rest_framework import generics, permissions, filters, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
 from .models import Product
 from .serializers import ProductSerializer
 import traceback
 import logging
-from .pagination import StandardResultsSetPagination
-import random
+from .pagination import ProductPagination
+from .cache import CachedResponseMixin
+from .conditional import ConditionalGetMixin, build_validators
+from .fast_serializers import FastSerializerMixin
+from .filters import filter_price_range
+from .search import ProductSearchFilter
+from .sampling import FeaturedProductSampler
 
 # Set up logging for the module
 logger = logging.getLogger(__name__)
@@ -16,38 +20,40 @@ logger = logging.getLogger(__name__)
 # View for featured products - uses basic APIView as it has custom logic
 # This view handles featured products display using APIView instead of generic views
 # because it implements custom logic for random selection
-class FeaturedProductsView(APIView):
+# Responses are cached (see products/cache.py) and invalidated when products change
+# Repeat requests with a matching ETag get a 304 (see products/conditional.py)
+# FastSerializerMixin switches to FastProductSerializer when enabled (see products/fast_serializers.py)
+# ?fields= / ?exclude= pick the fields returned (see products/fieldsets.py)
+class FeaturedProductsView(ConditionalGetMixin, CachedResponseMixin, FastSerializerMixin, APIView):
     # Allows anyone to access this endpoint without authentication
     # This means both logged-in and anonymous users can view featured products
     permission_classes = [permissions.AllowAny]
+
+    # Serializer used unless the fast serializer is enabled
+    serializer_class = ProductSerializer
     
     # Handles GET requests to this endpoint
     def get(self, request):
+        # Fields chosen with ?fields= / ?exclude= (an invalid choice is a 400)
+        fieldset = self.get_fieldset()
         try:
-            # Query the database for all products marked as featured
-            # '-rating' means order by rating in descending order (highest first)
-            all_featured_products = Product.objects.filter(
-                is_featured=True
-            ).order_by('-rating')
-            
-            # Limit the number of featured products to 12 maximum
-            # If more than 12 exist, randomly select 12 to show
+            # Pick up to 12 featured products at random
+            # The sampler only fetches the chosen rows, so the cost stays flat
+            # no matter how many products are marked as featured
             # This helps keep the featured section fresh and dynamic
-            if all_featured_products.count() > 12:
-                # random.sample ensures we get unique items (no duplicates)
-                featured_products = random.sample(list(all_featured_products), 12)
-            else:
-                # If 12 or fewer products, use all of them
-                featured_products = all_featured_products
+            # Only the columns and related rows of the chosen fields are loaded
+            queryset = self.select_fieldset_columns(Product.objects.for_listing(**self.listing_options()))
+            featured_products = FeaturedProductSampler().sample(queryset)
             
             # Convert the product objects to JSON format using ProductSerializer
             # many=True because we're serializing multiple products
             # context={'request': request} is included to help with generating 
             # absolute URLs for any hyperlinked fields in the serializer
-            serializer = ProductSerializer(
+            serializer_class = self.get_serializer_class()
+            serializer = serializer_class(
                 featured_products, 
                 many=True, 
-                context={'request': request} # This line provides request context # Passing the request
+                context={'request': request, 'fieldset': fieldset} # This line provides request context # Passing the request
             )
             
             # Return the serialized data in a structured format
@@ -75,9 +81,10 @@ class FeaturedProductsView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 # Main product listing view with filtering and pagination
-class ProductListView(generics.ListAPIView):
+class ProductListView(ConditionalGetMixin, CachedResponseMixin, FastSerializerMixin, generics.ListAPIView):
     # Gets all products from database as base queryset
-    queryset = Product.objects.all()
+    # for_listing() loads subcategories and images in bulk
+    queryset = Product.objects.for_listing()
     
     # Uses ProductSerializer to convert products to JSON
     serializer_class = ProductSerializer
@@ -86,12 +93,16 @@ class ProductListView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
     
     # Uses pagination (e.g., 12 products per page)
-    pagination_class = StandardResultsSetPagination
+    # Page numbers by default, keyset pages with ?pagination=cursor
+    pagination_class = ProductPagination
+
+    # ?images=primary returns primary_image instead of additional_images
+    allow_primary_image_only = True
 
     # Sets up three types of filtering:
     filter_backends = [
         DjangoFilterBackend,     # For exact field matching (category='ELEC')
-        filters.SearchFilter,     # For text search across fields
+        ProductSearchFilter,     # For ranked full-text search (?search= or ?q=)
         filters.OrderingFilter   # For sorting results
     ]
 
@@ -103,13 +114,8 @@ class ProductListView(generics.ListAPIView):
         'subcategory'    # Filter by subcategory
     ]
 
-    # Defines which fields can be searched with text
+    # Text search covers name, short_description and description
     # Example URL: /api/products/?search=wireless+headphones
-    search_fields = [
-        'name',
-        'description',
-        'short_description'
-    ]
 
     # Defines which fields can be used for sorting
     # Example URL: /api/products/?ordering=-price (descending price)
@@ -121,28 +127,19 @@ class ProductListView(generics.ListAPIView):
 
     # Custom method for price range filtering
     def get_queryset(self):
-        queryset = Product.objects.all()
-        
-        # Get min and max price from URL parameters
-        # Example URL: /api/products/?min_price=10&max_price=100
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
+        queryset = Product.objects.for_listing(**self.listing_options())
         
         # Apply price filters if provided
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        return queryset
+        # Example URL: /api/products/?min_price=10&max_price=100
+        return filter_price_range(queryset, self.request.query_params)
 
 # Detail view for single product
 # This view handles requests for individual product details
 # It inherits from RetrieveAPIView which is specifically designed for getting single objects
-class ProductDetailView(generics.RetrieveAPIView):
+class ProductDetailView(ConditionalGetMixin, CachedResponseMixin, FastSerializerMixin, generics.RetrieveAPIView):
     # Get all products as the base queryset
     # The specific product will be filtered using the URL parameter (usually ID)
-    queryset = Product.objects.all()
+    queryset = Product.objects.for_listing()
     
     # Use ProductSerializer to convert the product object to JSON
     serializer_class = ProductSerializer
@@ -150,8 +147,36 @@ class ProductDetailView(generics.RetrieveAPIView):
     # Allow any user to access this endpoint (no authentication required)
     permission_classes = [permissions.AllowAny]
     
+    # Subcategory and images are only loaded when the fieldset shows them
+    def get_queryset(self):
+        return Product.objects.for_listing(**self.listing_options())
+
+    # The cached response only depends on this product and its subcategory,
+    # so editing other products does not invalidate it
+    def get_cache_tags(self, request, data):
+        tags = [f"product:{data['id']}"]
+        # A sparse fieldset may leave out either subcategory field
+        subcategory_id = data.get('subcategory') or (data.get('subcategory_details') or {}).get('id')
+        if subcategory_id:
+            tags.append(f"subcategory:{subcategory_id}")
+        return tags
+
+    # Validators come from the product's updated_at and the same tags as the cache
+    # One primary key lookup, no serialization
+    def get_validators(self, request):
+        row = Product.objects.filter(pk=self.kwargs['pk']).values_list('subcategory_id', 'updated_at').first()
+        if row is None:
+            return None  # Let retrieve() produce the 404
+        subcategory_id, updated_at = row
+        tags = [f"product:{self.kwargs['pk']}"]
+        if subcategory_id:
+            tags.append(f"subcategory:{subcategory_id}")
+        return build_validators(request, tags, last_modified=updated_at)
+
     # Override the retrieve method to add custom error handling
     def retrieve(self, request, *args, **kwargs):
+        # An invalid ?fields= / ?exclude= is a 400, not an unexpected error
+        self.get_fieldset()
         try:
             # get_object() is provided by RetrieveAPIView
             # It automatically gets the product based on the URL parameter
@@ -159,8 +184,9 @@ class ProductDetailView(generics.RetrieveAPIView):
             instance = self.get_object()
             
             # Serialize the product instance to JSON
-            # context={'request': request} is needed for generating absolute URLs
-            serializer = self.get_serializer(instance, context={'request': request})
+            # The default context carries the request (for absolute URLs)
+            # and the sparse fieldset
+            serializer = self.get_serializer(instance)
             
             # Return the serialized product data
             return Response(serializer.data)
@@ -190,9 +216,9 @@ class ProductDetailView(generics.RetrieveAPIView):
 
 # This class handles advanced product searches with multiple filter options
 # It inherits from ListAPIView which provides built-in functionality for listing objects
-class ProductSearchView(generics.ListAPIView):
+class ProductSearchView(ConditionalGetMixin, CachedResponseMixin, FastSerializerMixin, generics.ListAPIView):
     # Get all products initially (this will be filtered later)
-    queryset = Product.objects.all()
+    queryset = Product.objects.for_listing()
     
     # Use ProductSerializer to convert product objects to JSON
     serializer_class = ProductSerializer
@@ -201,20 +227,18 @@ class ProductSearchView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
     
     # Use pagination to limit number of results per page
-    pagination_class = StandardResultsSetPagination
+    # Page numbers by default, keyset pages with ?pagination=cursor
+    pagination_class = ProductPagination
+
+    # ?images=primary returns primary_image instead of additional_images
+    allow_primary_image_only = True
     
     # Set up the filtering and ordering capabilities
+    # ProductSearchFilter reads ?q= and uses the database's full-text engine
+    # (see products/search.py), returning the best matches first
     filter_backends = [
-        filters.SearchFilter,      # Enables text-based search
-        filters.OrderingFilter    # Enables sorting of results
-    ]
-    
-    # Define which fields can be searched
-    search_fields = [
-        'name',                  # Search in product names
-        'description',           # Search in full descriptions
-        'short_description',     # Search in short descriptions
-        'category'              # Search in category names
+        ProductSearchFilter,       # Enables ranked full-text search
+        filters.OrderingFilter    # Enables sorting of results (overrides relevance)
     ]
     
     # Define which fields can be used for sorting
@@ -226,33 +250,13 @@ class ProductSearchView(generics.ListAPIView):
     
     # Override get_queryset to implement custom filtering logic
     def get_queryset(self):
-        # Start with all products
-        queryset = Product.objects.all()
-        
-        # Get search query from URL parameters (e.g., ?q=laptop)
-        query = self.request.query_params.get('q', None)
+        # Start with all products, with related rows loaded in bulk
+        queryset = Product.objects.for_listing(**self.listing_options())
         
-        # If there's a search query, filter products
-        if query:
-            # Use Q objects to search across multiple fields with OR condition
-            # This means the search term can match any of these fields
-            queryset = queryset.filter(
-                Q(name__icontains=query) |          # Match in name
-                Q(description__icontains=query) |    # OR match in description
-                Q(short_description__icontains=query) # OR match in short description
-            )
-        
-        # Get price range parameters from URL
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        
-        # Apply minimum price filter if provided
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)  # Greater than or equal to
+        # The search query itself (e.g., ?q=laptop) is applied by ProductSearchFilter
         
-        # Apply maximum price filter if provided
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)  # Less than or equal to
+        # Apply the price range from URL parameters if provided
+        queryset = filter_price_range(queryset, self.request.query_params)
         
         # Get category parameter from URL
         category = self.request.query_params.get('category')
@@ -266,7 +270,7 @@ class ProductSearchView(generics.ListAPIView):
     
 # This view handles listing products by category and supports filtering
 # Inherits from ListAPIView which provides default GET method implementation
-class ProductsByCategoryView(generics.ListAPIView):
+class ProductsByCategoryView(ConditionalGetMixin, CachedResponseMixin, FastSerializerMixin, generics.ListAPIView):
    # Specifies which serializer to use for converting products to JSON
    serializer_class = ProductSerializer
    
@@ -274,7 +278,11 @@ class ProductsByCategoryView(generics.ListAPIView):
    permission_classes = [permissions.AllowAny]
    
    # Use pagination to limit number of results per page
-   pagination_class = StandardResultsSetPagination
+   # Page numbers by default, keyset pages with ?pagination=cursor
+   pagination_class = ProductPagination
+
+   # ?images=primary returns primary_image instead of additional_images
+   allow_primary_image_only = True
    
    # Override get_queryset to implement custom filtering logic
    def get_queryset(self):
@@ -283,7 +291,7 @@ class ProductsByCategoryView(generics.ListAPIView):
        category = self.kwargs.get('category')
        
        # Start with base queryset filtered by category
-       queryset = Product.objects.filter(category=category)
+       queryset = Product.objects.for_listing(**self.listing_options()).filter(category=category)
        
        # Get subcategory slug from query parameters (?slug=tv-home-theater)
        # self.request.query_params contains query string parameters
@@ -294,21 +302,7 @@ class ProductsByCategoryView(generics.ListAPIView):
        if subcategory_slug:
            queryset = queryset.filter(subcategory__slug=subcategory_slug)
        
-       # Get price range parameters from query string
+       # Apply the price range from the query string if provided
        # e.g., ?min_price=10&max_price=100
-       min_price = self.request.query_params.get('min_price')
-       max_price = self.request.query_params.get('max_price')
-       
-       # Apply minimum price filter if provided
-       # price__gte means price Greater Than or Equal to
-       if min_price:
-           queryset = queryset.filter(price__gte=min_price)
-           
-       # Apply maximum price filter if provided
-       # price__lte means price Less Than or Equal to
-       if max_price:
-           queryset = queryset.filter(price__lte=max_price)
-       
-       # Return the filtered queryset
        # Django will execute the actual database query when needed
-       return queryset
\ No newline at end of file
+       return filter_price_range(queryset, self.request.query_params)
\ No newline at end of file
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class SubcategoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.commerce.product_features.subcategories'
-    verbose_name = 'Product Subcategories'
\ No newline at end of file
+    verbose_name = 'Product Subcategories'
+
+    def ready(self):
+        # Connect the response cache invalidation receivers
+        from . import signals  # noqa: F401
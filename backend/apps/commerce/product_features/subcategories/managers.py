@@ -0,0 +1,21 @@
+from django.db import models
+from django.db.models import Count, Q
+
+
+# Custom QuerySet for subcategories
+class SubcategoryQuerySet(models.QuerySet):
+
+    def with_products_count(self):
+        """Annotate each subcategory with its number of active products"""
+        # The COUNT runs once inside the same SELECT instead of once per row
+        # SubcategorySerializer.get_products_count reads this attribute when present
+        return self.annotate(
+            active_products_count=Count(
+                'products',
+                filter=Q(products__is_active=True)
+            )
+        )
+
+
+# Manager built from the QuerySet so the methods are available on Subcategory.objects
+SubcategoryManager = models.Manager.from_queryset(SubcategoryQuerySet)
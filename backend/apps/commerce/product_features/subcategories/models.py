@@ -1,6 +1,7 @@
 # Import necessary models
 from django.db import models
 from apps.commerce.product_features.products.models import Product
+from .managers import SubcategoryManager
 
 class Subcategory(models.Model):
     # Name of the subcategory (e.g., "TV & Home Theater")
@@ -37,6 +38,9 @@ class Subcategory(models.Model):
     # auto_now=True updates the time each time the record is saved
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Custom manager that adds helpers like Subcategory.objects.with_products_count()
+    objects = SubcategoryManager()
+
     # Meta class for model-specific options
     class Meta:
         # Correct plural name in admin interface
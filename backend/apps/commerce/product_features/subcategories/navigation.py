@@ -0,0 +1,125 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views import View
+
+from apps.commerce.product_features.products.cache import ResponseCache
+from apps.commerce.product_features.products.models import Product
+from .models import Subcategory
+
+# Cache tag bumped by the Product and Subcategory signal receivers
+NAVIGATION_TAG = 'subcategories'
+
+
+# Default navigation tree configuration
+# Any key can be overridden through settings.SUBCATEGORY_NAVIGATION
+DEFAULT_NAVIGATION_SETTINGS = {
+    # Seconds a process keeps its tree before rebuilding it anyway; bounds how
+    # stale it gets when the version key isn't shared (LocMemCache)
+    'MAX_AGE': 60,
+}
+
+
+def get_navigation_settings():
+    """Return the navigation configuration merged with the defaults"""
+    config = dict(DEFAULT_NAVIGATION_SETTINGS)
+    config.update(getattr(settings, 'SUBCATEGORY_NAVIGATION', {}))
+    return config
+
+
+# Category → subcategory → product count tree for the navigation menu
+#
+# Built with one query and never modified afterwards: `categories` is made of
+# tuples and `payload` holds the JSON response body, encoded once, so serving
+# the tree does no serialization work at all.
+class NavigationTree:
+    def __init__(self, version, previous=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.categories = self.build()
+        self.payload = json.dumps({'categories': [
+            {
+                'code': code,
+                'name': name,
+                'products_count': products_count,
+                'subcategories': [dict(subcategory) for subcategory in subcategories],
+            }
+            for code, name, products_count, subcategories in self.categories
+        ]}, separators=(',', ':')).encode()
+        self.etag = quote_etag(hashlib.md5(self.payload).hexdigest())
+        # Tag versions are change times in nanoseconds
+        self.last_modified = version // 1_000_000_000
+        if previous is not None and previous.version == version:
+            # Rebuilt because of its age: the version doesn't show whether
+            # anything changed, the body does
+            if previous.etag == self.etag:
+                self.last_modified = previous.last_modified
+            else:
+                self.last_modified = max(int(time.time()), previous.last_modified)
+
+    def is_current(self, version, max_age):
+        return self.version == version and time.monotonic() - self.built_at < max_age
+
+    def build(self):
+        rows = (
+            Subcategory.objects.filter(is_active=True)
+            .with_products_count()
+            .order_by('name')
+            .values_list('id', 'name', 'slug', 'category', 'active_products_count')
+        )
+        by_category = {code: [] for code in Product.CategoryChoices.values}
+        for subcategory_id, name, slug, category, products_count in rows:
+            by_category.setdefault(category, []).append((
+                ('id', subcategory_id),
+                ('name', name),
+                ('slug', slug),
+                ('products_count', products_count),
+            ))
+        labels = dict(Product.CategoryChoices.choices)
+        return tuple(
+            (code, labels.get(code, code), sum(dict(row)['products_count'] for row in subcategories), tuple(subcategories))
+            for code, subcategories in by_category.items()
+        )
+
+
+_tree = None
+_tree_lock = threading.Lock()
+
+
+def get_navigation_tree():
+    """Return this process's navigation tree, rebuilt when its version changes
+
+    The version is the 'subcategories' tag of the response cache. With a shared
+    cache (REDIS_URL), a change made in any process is picked up by every
+    process on its next read. With the default per-process LocMemCache only the
+    process that made the change sees the new version; the others serve their
+    tree for at most MAX_AGE seconds before rebuilding it.
+    """
+    global _tree
+    version = ResponseCache().get_tag_versions([NAVIGATION_TAG])[NAVIGATION_TAG]
+    max_age = get_navigation_settings()['MAX_AGE']
+    tree = _tree
+    if tree is not None and tree.is_current(version, max_age):
+        return tree
+    with _tree_lock:
+        if _tree is None or not _tree.is_current(version, max_age):
+            _tree = NavigationTree(version, previous=_tree)
+        return _tree
+
+
+# Navigation menu endpoint: the prebuilt JSON body, with ETag / Last-Modified
+class NavigationTreeView(View):
+    def get(self, request):
+        tree = get_navigation_tree()
+        response = get_conditional_response(request, etag=tree.etag, last_modified=tree.last_modified)
+        if response is None:
+            response = HttpResponse(tree.payload, content_type='application/json')
+        response['ETag'] = tree.etag
+        response['Last-Modified'] = http_date(tree.last_modified)
+        return response
@@ -26,6 +26,11 @@ class SubcategorySerializer(serializers.ModelSerializer):
     # Custom method to get the count of products in this subcategory
     # The method name must start with 'get_' followed by the field name
     def get_products_count(self, obj):
+        # Querysets built with Subcategory.objects.with_products_count()
+        # already carry the count, so no extra query is needed
+        if hasattr(obj, 'active_products_count'):
+            return obj.active_products_count
+
         # obj is the Subcategory instance
         # Uses the related_name='products' we defined earlier
         # Filters only active products in this subcategory
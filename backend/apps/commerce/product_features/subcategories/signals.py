@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.commerce.product_features.products.cache import invalidate
+from .models import Subcategory
+
+
+# Subcategory details are embedded in every product response,
+# so a change invalidates product listings as well as subcategory responses
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+def invalidate_subcategory(sender, instance, **kwargs):
+    invalidate('subcategories', f'subcategory:{instance.pk}', 'products')
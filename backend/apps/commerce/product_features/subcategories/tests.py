@@ -1,3 +1,109 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.commerce.product_features.products.models import Product
+from .models import Subcategory
+from .navigation import get_navigation_tree
+
+
+class SubcategoryListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        subcategories = Subcategory.objects.bulk_create([
+            Subcategory(name=f'Elec {i}', slug=f'elec-{i}', category='ELEC') for i in range(5)
+        ] + [
+            Subcategory(name='Food', slug='food', category='FOOD'),
+            Subcategory(name='Hidden', slug='hidden', category='ELEC', is_active=False),
+        ])
+        cls.elec = subcategories[0]
+        Product.objects.bulk_create([
+            Product(name=f'Product {i}', price=Decimal('1.00'), description='x',
+                    subcategory=cls.elec, is_active=i % 3 != 0)
+            for i in range(6)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        # secure=True because settings force an HTTPS redirect
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def results(self, data):
+        return data['results'] if isinstance(data, dict) else data
+
+    def test_counts_come_from_the_list_query(self):
+        # COUNT for pagination + subcategories with their product counts
+        with self.assertNumQueries(2):
+            data = self.results(self.get(reverse('subcategories:subcategory-list')))
+        self.assertEqual(len(data), 6)
+        counts = {row['slug']: row['products_count'] for row in data}
+        self.assertEqual(counts['elec-0'], 4)
+        self.assertEqual(counts['food'], 0)
+
+    def test_category_kwarg_filters(self):
+        data = self.results(self.get(reverse('subcategories:category-subcategories', kwargs={'category': 'FOOD'})))
+        self.assertEqual([row['slug'] for row in data], ['food'])
+
+    def test_inactive_subcategories_are_hidden(self):
+        data = self.results(self.get(reverse('subcategories:category-subcategories', kwargs={'category': 'ELEC'})))
+        self.assertEqual(len(data), 5)
+        self.assertNotIn('hidden', [row['slug'] for row in data])
+
+
+class NavigationTreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tv = Subcategory.objects.create(name='TV', slug='tv', category='ELEC')
+        Subcategory.objects.create(name='Fruit', slug='fruit', category='FOOD')
+        Subcategory.objects.create(name='Hidden', slug='hidden', category='ELEC', is_active=False)
+        Product.objects.create(name='Television', price=Decimal('100.00'), description='x', subcategory=cls.tv)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **headers):
+        return self.client.get(reverse('subcategories:navigation-tree'), secure=True, **headers)
+
+    def test_tree_is_built_once(self):
+        with self.assertNumQueries(1):
+            response = self.get()
+        data = json.loads(response.content)
+        self.assertEqual(data['categories'][0], {
+            'code': 'ELEC', 'name': 'Electronics', 'products_count': 1,
+            'subcategories': [{'id': self.tv.id, 'name': 'TV', 'slug': 'tv', 'products_count': 1}],
+        })
+        self.assertEqual([c['code'] for c in data['categories']], ['ELEC', 'FOOD'])
+        # Served from memory afterwards
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get().content, response.content)
+
+    def test_changes_rebuild_the_tree(self):
+        tree = get_navigation_tree()
+        Product.objects.create(name='Radio', price=Decimal('10.00'), description='x', subcategory=self.tv)
+        rebuilt = get_navigation_tree()
+        self.assertIsNot(rebuilt, tree)
+        self.assertEqual(rebuilt.categories[0][2], 2)
+        Subcategory.objects.filter(pk=self.tv.pk).get().save()
+        self.assertIsNot(get_navigation_tree(), rebuilt)
+
+    def test_tree_is_rebuilt_after_max_age(self):
+        tree = get_navigation_tree()
+        # A change this process's cache never hears about, e.g. from another worker
+        Product.objects.filter(subcategory=self.tv).update(is_active=False)
+        self.assertIs(get_navigation_tree(), tree)
+        with override_settings(SUBCATEGORY_NAVIGATION={'MAX_AGE': 0}):
+            rebuilt = get_navigation_tree()
+        self.assertEqual(rebuilt.categories[0][2], 0)
+        self.assertNotEqual(rebuilt.etag, tree.etag)
+        self.assertGreaterEqual(rebuilt.last_modified, tree.last_modified)
+
+    def test_etag(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
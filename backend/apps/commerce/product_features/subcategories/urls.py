@@ -2,6 +2,7 @@
 from django.urls import path
 # Import the view classes that will handle different URL patterns
 from .views import SubcategoryListView, SubcategoryDetailView
+from .navigation import NavigationTreeView
 
 # Set the namespace for these URLs
 # Helps avoid naming conflicts in larger projects
@@ -13,6 +14,10 @@ urlpatterns = [
     # Matches: /api/subcategories/
     path('', SubcategoryListView.as_view(), name='subcategory-list'),
     
+    # Navigation menu tree, served from memory
+    # Matches: /api/subcategories/navigation/ (listed before <str:category>)
+    path('navigation/', NavigationTreeView.as_view(), name='navigation-tree'),
+    
     # URL pattern for listing subcategories by category
     # Matches: /api/subcategories/ELEC/
     # <str:category> captures the category as a string parameter
@@ -11,9 +11,14 @@ from .serializers import SubcategorySerializer
 # Import for search and filtering functionality
 from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
+# Response cache shared with the product endpoints
+from apps.commerce.product_features.products.cache import CachedResponseMixin
+# ETag / Last-Modified support shared with the product endpoints
+from apps.commerce.product_features.products.conditional import ConditionalGetMixin, build_validators
 
 # View for listing and creating subcategories
-class SubcategoryListView(generics.ListCreateAPIView):
+# GET responses are cached until a subcategory or product changes
+class SubcategoryListView(ConditionalGetMixin, CachedResponseMixin, generics.ListCreateAPIView):
     # Use SubcategorySerializer to convert model data to JSON
     serializer_class = SubcategorySerializer
     
@@ -34,8 +39,30 @@ class SubcategoryListView(generics.ListCreateAPIView):
     # Fields that can be filtered
     filterset_fields = ['category']
 
+    # Active subcategories with their active product counts in one query
+    def get_queryset(self):
+        # with_products_count() adds the COUNT that SubcategorySerializer reads,
+        # so the list is a single SELECT instead of one COUNT per row
+        # Explicit order_by: GROUP BY queries don't use Meta.ordering
+        queryset = Subcategory.objects.filter(is_active=True).with_products_count().order_by('name')
+        
+        # Get category from URL parameter (e.g., 'ELEC' from /api/subcategories/ELEC/)
+        category = self.kwargs.get('category')
+        if category:
+            queryset = queryset.filter(category=category)
+        return queryset
+
+    # Cache tag bumped whenever any subcategory or product changes
+    def get_cache_tags(self, request, data):
+        return ['subcategories']
+
+    # ETag / Last-Modified from the same tag, without touching the database
+    def get_validators(self, request):
+        return build_validators(request, ['subcategories'])
+
 # View for detailed operations on a single subcategory
-class SubcategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+# GET responses are cached until this subcategory or one of its products changes
+class SubcategoryDetailView(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     # Only show active subcategories
     queryset = Subcategory.objects.filter(is_active=True)
     
@@ -48,6 +75,18 @@ class SubcategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     # Use 'slug' instead of default 'pk' for lookup
     lookup_field = 'slug'
 
+    # Cache tag bumped when this subcategory or one of its products changes
+    def get_cache_tags(self, request, data):
+        return [f"subcategory:{data['id']}"]
+
+    # ETag / Last-Modified from the subcategory's updated_at and cache tag
+    def get_validators(self, request):
+        row = self.get_queryset().filter(slug=self.kwargs['slug']).values_list('id', 'updated_at').first()
+        if row is None:
+            return None  # Let the normal lookup produce the 404
+        subcategory_id, updated_at = row
+        return build_validators(request, [f"subcategory:{subcategory_id}"], last_modified=updated_at)
+
     # Custom method for delete operation
     def perform_destroy(self, instance):
         # Instead of hard deleting, mark as inactive
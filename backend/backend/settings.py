@@ -44,6 +44,26 @@ MEDIA_ROOT = BASE_DIR / 'media'  # Using pathlib is preferred
 SERVE_MEDIA_FILES = True
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
+# Media on S3 (django-storages) when a bucket is configured
+if os.getenv('AWS_STORAGE_BUCKET_NAME'):
+    DEFAULT_FILE_STORAGE = 'storages.backends.s3.S3Storage'
+    AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME')
+    AWS_S3_REGION_NAME = os.getenv('AWS_S3_REGION_NAME')
+    AWS_S3_CUSTOM_DOMAIN = os.getenv('AWS_S3_CUSTOM_DOMAIN')
+    AWS_LOCATION = os.getenv('AWS_LOCATION', '')
+    # Signed URLs are built per file; unsigned ones share one precomputed prefix
+    AWS_QUERYSTRING_AUTH = os.getenv('AWS_QUERYSTRING_AUTH', 'False') == 'True'
+
+# Absolute origin that serves media files, e.g. https://cdn.example.com/media/
+# When set, API image URLs use it instead of the storage URL (see products/media.py)
+MEDIA_CDN_URL = os.getenv('MEDIA_CDN_URL')
+
+# Resized WebP/JPEG copies of product uploads (see products/variants.py)
+PRODUCT_IMAGE_VARIANTS = {
+    'ENABLED': os.getenv('PRODUCT_IMAGE_VARIANTS_ENABLED', 'True') == 'True',
+    'MAX_WORKERS': int(os.getenv('PRODUCT_IMAGE_VARIANT_WORKERS', 2)),
+}
+
 
 # Add Ngrok URL to trusted origins for CSRF protection
 CSRF_TRUSTED_ORIGINS = [
@@ -82,6 +102,63 @@ REST_FRAMEWORK = {
     ]
 }
 
+# Cache configuration
+# Local memory by default; set REDIS_URL to share the cache between workers
+# LocMemCache is private to each worker process, so a change invalidated in
+# one worker is never seen by the others
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+SHARED_CACHE = bool(os.getenv('REDIS_URL'))
+if SHARED_CACHE:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Response cache for the read-only product and subcategory endpoints (see products/cache.py)
+# It also provides the ETags of those endpoints (see products/conditional.py)
+# Off by default without a shared cache, where other workers would keep
+# serving stale responses and each worker would send different ETags
+PRODUCT_CACHE = {
+    'ENABLED': os.getenv('PRODUCT_CACHE_ENABLED', str(SHARED_CACHE)) == 'True',
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('PRODUCT_CACHE_TIMEOUT', 300)),
+}
+
+# Checkout pricing (see payments/pricing.py)
+# Prices are only cached with a shared cache, so a price change reaches every worker
+ORDER_PRICING = {
+    'CACHE_ENABLED': os.getenv('ORDER_PRICING_CACHE_ENABLED', str(SHARED_CACHE)) == 'True',
+}
+
+# Serve product endpoints with FastProductSerializer (see products/fast_serializers.py)
+# Views can override this with their use_fast_serializer attribute
+PRODUCT_FAST_SERIALIZER = os.getenv('PRODUCT_FAST_SERIALIZER', 'False') == 'True'
+
+# Catalog export (see products/export.py and `manage.py export_products`)
+PRODUCT_EXPORT = {
+    'CHUNK_SIZE': int(os.getenv('PRODUCT_EXPORT_CHUNK_SIZE', 2000)),
+    'PUBLIC': os.getenv('PRODUCT_EXPORT_PUBLIC', 'False') == 'True',
+}
+
+# Catalog import (see products/importer.py and `manage.py import_products`)
+PRODUCT_IMPORT = {
+    'BATCH_SIZE': int(os.getenv('PRODUCT_IMPORT_BATCH_SIZE', 1000)),
+    'IMAGE_WORKERS': int(os.getenv('PRODUCT_IMPORT_IMAGE_WORKERS', 8)),
+}
+
+# Featured products sampling (see products/sampling.py)
+# STRATEGY is 'pool' (cached ID pool) or 'window' (random ID window)
+FEATURED_PRODUCTS = {
+    'SAMPLE_SIZE': 12,
+    'STRATEGY': os.getenv('FEATURED_PRODUCTS_STRATEGY', 'pool'),
+    'POOL_SIZE': int(os.getenv('FEATURED_PRODUCTS_POOL_SIZE', 5000)),
+    'POOL_REFRESH_SECONDS': int(os.getenv('FEATURED_PRODUCTS_POOL_REFRESH_SECONDS', 300)),
+}
+
 # Application definition
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -184,18 +261,62 @@ USE_TZ = True
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        # One JSON object per line (see products/diagnostics.py)
+        'structured': {
+            '()': 'apps.commerce.product_features.products.diagnostics.StructuredFormatter',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
         },
+        'structured_console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+        },
     },
     'root': {
         'handlers': ['console'],
         'level': 'INFO',
     },
+    'loggers': {
+        # Product catalog diagnostics; set PRODUCTS_LOG_LEVEL=DEBUG to see per-row events
+        'apps.commerce.product_features': {
+            'handlers': ['structured_console'],
+            'level': os.getenv('PRODUCTS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Sampling for enabled debug/info diagnostics, keyed by logger name (1.0 keeps everything)
+PRODUCT_DIAGNOSTICS = {
+    'SAMPLE_RATES': {
+        'apps.commerce.product_features.products.serializers': float(
+            os.getenv('PRODUCTS_SERIALIZER_LOG_SAMPLE_RATE', 0.01)
+        ),
+    },
 }
 
 # Stripe settings
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY')
 STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY')
-STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
\ No newline at end of file
+STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
+
+# All Stripe calls go through payments/gateway.py (pooled connections, deadlines, retries)
+# Set STRIPE_GATEWAY_CLASS=apps.commerce.payment.payments.fake_stripe.FakeStripe to work offline
+STRIPE_GATEWAY_CLASS = os.getenv('STRIPE_GATEWAY_CLASS')
+
+# Stripe calls made by `manage.py process_stripe_outbox` instead of the request thread
+# (see payments/outbox.py); orders then return 202 and clients poll the order status
+STRIPE_OUTBOX = {
+    'ENABLED': os.getenv('STRIPE_OUTBOX_ENABLED', 'False') == 'True',
+    'MAX_WORKERS': int(os.getenv('STRIPE_OUTBOX_WORKERS', 8)),
+}
+
+# Stripe webhook ingestion (see apps/commerce/payment/payments/webhooks.py)
+# Set STRIPE_WEBHOOK_PROCESS_INLINE=False when `manage.py process_webhook_events` runs
+STRIPE_WEBHOOKS = {
+    'PROCESS_INLINE': os.getenv('STRIPE_WEBHOOK_PROCESS_INLINE', 'True') == 'True',
+}
@@ -19,6 +19,7 @@ def api_root(request):
             'subcategories': {
                 'list': '/api/subcategories/',
                 'by_category': '/api/subcategories/<category>/',
+                'navigation': '/api/subcategories/navigation/',
                 'detail': '/api/subcategories/detail/<slug>/'
             },
             'newsletter': {